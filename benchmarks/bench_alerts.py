@@ -0,0 +1,71 @@
+"""Batch alert evaluation over a large device table
+
+Compares the per-dict generator expression the dashboard used to run with a full
+AlertRules.evaluate() pass over the mirrored columns, with and without NumPy, and
+reports the cost of keeping the columns current on updates.
+
+    python benchmarks/bench_alerts.py --devices 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from server import AlertRules, KeyedStore, load_alert_rules  # noqa: E402
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    devices = [{"deviceId": f"DEV-{i}", "cpuLoad": rng.uniform(0, 100), "memoryUtil": rng.uniform(0, 100),
+                "isOverheating": rng.random() < 0.02, "deviceClass": rng.choice(["laptop", "server", None])}
+               for i in range(args.devices)]
+    store = KeyedStore("deviceId", devices)
+    rules = AlertRules(store, load_alert_rules(None)["hardware"])
+
+    baseline, expected = timed(lambda: sum(1 for d in devices if d["cpuLoad"] > 85 or d["isOverheating"]))
+    print(f"devices            {args.devices:,} ({expected:,} in alert)")
+    print(f"per-dict count     {baseline * 1000:8.1f} ms")
+
+    def full_pass():
+        rules._cached = (None, None)
+        return rules.evaluate()
+
+    numpy = server.numpy
+    server.numpy = None
+    elapsed, alerts = timed(full_pass)
+    assert len(alerts) == expected
+    print(f"columns, python    {elapsed * 1000:8.1f} ms")
+    server.numpy = numpy
+    if numpy is not None:
+        elapsed, alerts = timed(full_pass)
+        assert len(alerts) == expected
+        print(f"columns, numpy     {elapsed * 1000:8.1f} ms")
+    else:
+        print("columns, numpy     (NumPy not installed)")
+
+    keys = [d["deviceId"] for d in devices[:10000]]
+    start = time.perf_counter()
+    for key in keys:
+        store.update(key, {"cpuLoad": rng.uniform(0, 100)})
+    print(f"update + columns   {(time.perf_counter() - start) / len(keys) * 1e6:8.2f} us per update")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare memory per asset row for plain dicts against compact AssetRecord rows
+
+Rows are decoded from JSON lines, as bulk import and the API receive them, so each dict
+carries its own copies of the repeated strings. Each representation is built in its own
+tracemalloc pass; the JSON encoding time of the whole table is reported alongside.
+
+    python benchmarks/bench_records.py --records 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import AssetRecord, json_default  # noqa: E402
+
+TYPES = ["Laptop", "Desktop", "Monitor", "Printer", "Server", "Phone"]
+STATUSES = ["Active", "In Repair", "Retired"]
+DEPARTMENTS = ["Engineering", "Sales", "Finance", "HR", "IT", "Marketing"]
+
+
+def make_lines(records, seed=5):
+    rng = random.Random(seed)
+    start = date(2018, 1, 1)
+    for i in range(records):
+        purchased = start + timedelta(days=rng.randrange(2500))
+        yield json.dumps({
+            "assetId": f"AST-{i:07d}",
+            "assetType": rng.choice(TYPES),
+            "assignedUser": f"User{rng.randrange(records // 2 or 1)} Surname",
+            "purchaseDate": purchased.isoformat(),
+            "warrantyExpiryDate": (purchased + timedelta(days=1095)).isoformat(),
+            "status": rng.choice(STATUSES),
+            "department": rng.choice(DEPARTMENTS)
+        })
+
+
+def measure(records, build):
+    gc.collect()
+    tracemalloc.start()
+    rows = [build(json.loads(line)) for line in make_lines(records)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    json.dumps(rows, default=json_default)
+    encode = time.perf_counter() - start
+    return size, encode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in (("dict", lambda row: row), ("AssetRecord", AssetRecord)):
+        size, encode = measure(args.records, build)
+        results[name] = size
+        print(f"{name:12} {size / args.records:8.1f} bytes/record  {size / 2 ** 20:9.1f} MiB total  "
+              f"json.dumps {encode:6.2f} s")
+    print(f"saving       {1 - results['AssetRecord'] / results['dict']:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
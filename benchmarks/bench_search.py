@@ -0,0 +1,56 @@
+"""Search latency over a large synthetic inventory
+
+Indexes N asset-like records into a SearchIndex, then times exact, multi-word and
+type-ahead prefix queries (best of several runs each).
+
+    python benchmarks/bench_search.py --records 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import KeyedStore, SearchIndex  # noqa: E402
+
+FIRST = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Mallory", "Oscar",
+         "Peggy", "Rupert", "Sybil", "Trent", "Victor", "Walter"]
+TYPES = ["Laptop", "Desktop", "Monitor", "Server", "Printer", "Tablet", "Phone", "Switch"]
+DEPARTMENTS = ["Engineering", "Finance", "HR", "IT", "Marketing", "Sales", "Legal", "Support"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    records = [{"assetId": f"AST-{i:07d}", "assignedUser": f"{rng.choice(FIRST)} Surname{rng.randrange(20000)}",
+                "assetType": rng.choice(TYPES), "department": rng.choice(DEPARTMENTS), "status": "Active"}
+               for i in range(args.records)]
+    store = KeyedStore("assetId", records)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.track("asset", store, {"assetId": 3, "assignedUser": 2, "assetType": 1, "department": 1, "status": 1})
+    print(f"indexed            {args.records:,} records in {time.perf_counter() - start:.1f}s")
+
+    for query in ("ast 0123456", "surname1234", "surname1234 lapt", "alice surname12", "mallory printer fin"):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            results = index.search(query, limit=10)
+            best = min(best, time.perf_counter() - start)
+        print(f"{query!r:22} {best * 1000:8.2f} ms  ({len(results)} results)")
+
+    updates = 1000
+    start = time.perf_counter()
+    for i in range(updates):
+        store.update(f"AST-{i:07d}", {"assignedUser": f"Renamed Person{i}"})
+    elapsed = time.perf_counter() - start
+    print(f"re-index on update {elapsed / updates * 1000:.3f} ms per update")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Time GET /api/assets at 100k assets: jsonify against cached per-record encodings
+
+Loads synthetic assets into ASSET_DB, logs in through the test client and reports the
+best of several full-list requests for each path:
+
+    jsonify        the list is encoded from scratch on every request
+    cache cold     every record is encoded, then kept (orjson, or json without it)
+    cache warm     the response is joined from cached fragments
+
+    python benchmarks/bench_serialize.py --records 100000
+"""
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+def best_of(client, repeats, before=None):
+    best, size = float("inf"), 0
+    for _ in range(repeats):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        response = client.get('/api/assets')
+        best = min(best, time.perf_counter() - start)
+        size = len(response.data)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    server.ASSET_DB.insert_many(server.build_asset({
+        "assetId": f"BENCH-{i:07d}", "assetType": "Laptop", "assignedUser": f"User {i}",
+        "purchaseDate": "2023-01-15", "warrantyExpiryDate": "2026-01-15", "department": "Engineering"
+    }) for i in range(args.records))
+    client = server.app.test_client()
+    client.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+    cache = server.JSON_CACHES["assets"]
+
+    runs = []
+    with mock.patch.dict(server.JSON_CACHES, {"assets": None}):
+        runs.append(("jsonify", best_of(client, args.repeats)))
+    if server.orjson is not None:
+        runs.append(("cache cold (orjson)", best_of(client, args.repeats, cache._clear)))
+    with mock.patch.object(server, "orjson", None):
+        runs.append(("cache cold (json)", best_of(client, args.repeats, cache._clear)))
+    runs.append(("cache warm", best_of(client, args.repeats)))
+
+    baseline = runs[0][1][0]
+    print(f"{len(server.ASSET_DB):,} assets")
+    for name, (elapsed, size) in runs:
+        print(f"{name:20} {elapsed * 1000:8.1f} ms  {size / 2 ** 20:6.1f} MiB  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Sustained telemetry ingestion throughput on a single process
+
+Posts batches of hardware and network samples to /api/telemetry/ingest through the
+Flask test client for a fixed duration while the background flushers upsert into
+HEALTH_DB/NETWORK_DB, then reports samples/second accepted and device states written.
+
+    python benchmarks/bench_telemetry.py --devices 5000 --batch 1000 --seconds 10
+    IIMS_STORAGE=sqlite IIMS_SQLITE_PATH=/tmp/bench.db python benchmarks/bench_telemetry.py
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("IIMS_TELEMETRY_TOKEN", "bench")
+
+import server  # noqa: E402
+
+
+def make_batch(rng, devices, size):
+    hardware, network = [], []
+    for _ in range(size // 2):
+        hardware.append({"deviceId": f"BENCH-DEV-{rng.randrange(devices)}", "cpuLoad": rng.uniform(0, 100),
+                         "memoryUtil": rng.uniform(0, 100), "isOverheating": rng.random() < 0.01})
+        network.append({"deviceId": f"BENCH-NET-{rng.randrange(devices)}", "bandwidthMB": rng.uniform(0, 1000),
+                        "isDowntime": rng.random() < 0.01, "abnormalTraffic": False})
+    return {"hardware": hardware, "network": network}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=5000, help="distinct devices per table")
+    parser.add_argument("--batch", type=int, default=1000, help="samples per request")
+    parser.add_argument("--seconds", type=float, default=10, help="benchmark duration")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    batches = [make_batch(rng, args.devices, args.batch) for _ in range(20)]
+    client = server.app.test_client()
+    headers = {"X-Telemetry-Token": os.environ["IIMS_TELEMETRY_TOKEN"]}
+
+    requests = samples = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        response = client.post("/api/telemetry/ingest", json=batches[requests % len(batches)], headers=headers)
+        assert response.status_code == 202, response.data
+        requests += 1
+        samples += args.batch
+    elapsed = time.perf_counter() - start
+
+    flush_start = time.perf_counter()
+    drained = sum(buffer.flush() for buffer in server.TELEMETRY_BUFFERS.values())
+    drain = time.perf_counter() - flush_start
+    flushed = sum(buffer.flushed for buffer in server.TELEMETRY_BUFFERS.values())
+
+    print(f"storage engine     {server.STORAGE_ENGINE}")
+    print(f"requests           {requests} x {args.batch} samples in {elapsed:.2f}s")
+    print(f"ingest rate        {samples / elapsed:,.0f} samples/s")
+    print(f"device states      {flushed:,} written ({drained:,} in final drain, {drain * 1000:.1f} ms)")
+    print(f"coalescing ratio   {samples / max(flushed, 1):.1f} samples per write")
+
+
+if __name__ == "__main__":
+    main()
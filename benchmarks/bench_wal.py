@@ -0,0 +1,97 @@
+"""Measure write-ahead log throughput under group commit and recovery time
+
+Throughput: writer threads update a journaled asset table and commit after every
+mutation, as each request does; with more writers, more commits share an fsync.
+Recovery: a snapshot of --records assets plus --wal-entries logged updates is loaded
+back, first into plain rows and then into a KeyedStore of compact records.
+
+    python benchmarks/bench_wal.py --records 1000000 --wal-entries 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import AssetRecord, KeyedStore, StoreJournal  # noqa: E402
+
+
+def asset(i):
+    return {"assetId": f"AST-{i:07d}", "assetType": "Laptop", "assignedUser": f"User {i}",
+            "purchaseDate": "2023-01-15", "warrantyExpiryDate": "2026-01-15", "status": "Active",
+            "department": "Engineering"}
+
+
+def open_journal(directory, seed=()):
+    journal = StoreJournal(directory, compact_every=10 ** 9, sync_interval=3600)
+    store = KeyedStore("assetId", journal.restored("assets", seed), indexes=("status",), record_type=AssetRecord)
+    journal.attach("assets", store)
+    return journal, store
+
+
+def throughput(writers, mutations):
+    with tempfile.TemporaryDirectory() as directory:
+        journal, store = open_journal(directory, [asset(i) for i in range(1000)])
+        journal.start()
+
+        def write(n):
+            for i in range(mutations // writers):
+                store.update(f"AST-{(n * 7919 + i) % 1000:07d}", {"assignedUser": f"Writer {n}-{i}"})
+                journal.commit()
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        syncs = journal._wal.syncs
+        journal.close()
+    return mutations / elapsed, mutations / max(syncs, 1)
+
+
+def recovery(records, wal_entries):
+    with tempfile.TemporaryDirectory() as directory:
+        journal, store = open_journal(directory, (asset(i) for i in range(records)))
+        start = time.perf_counter()
+        journal.start()  # first start writes the snapshot
+        snapshot = time.perf_counter() - start
+        for i in range(wal_entries):
+            store.update(f"AST-{i * 7 % records:07d}", {"status": "Retired"})
+        journal.close()
+        del journal, store
+        size = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+
+        start = time.perf_counter()
+        journal = StoreJournal(directory, compact_every=10 ** 9)
+        loaded = time.perf_counter() - start
+        rows = journal.restored("assets")
+        start = time.perf_counter()
+        store = KeyedStore("assetId", rows, indexes=("status",), record_type=AssetRecord)
+        built = time.perf_counter() - start
+        journal.close()
+        return snapshot, size, loaded, built, len(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--wal-entries", type=int, default=100000)
+    parser.add_argument("--mutations", type=int, default=8000)
+    args = parser.parse_args()
+
+    for writers in (1, 4, 16, 64):
+        rate, per_sync = throughput(writers, args.mutations)
+        print(f"{writers:3} writers  {rate:10,.0f} mutations/s  {per_sync:6.1f} commits per fsync")
+
+    snapshot, size, loaded, built, count = recovery(args.records, args.wal_entries)
+    print(f"snapshot of {args.records:,} records written in {snapshot:.2f} s ({size / 2 ** 20:.1f} MiB on disk)")
+    print(f"recovery: snapshot + {args.wal_entries:,} log entries read in {loaded:.2f} s, "
+          f"store of {count:,} rows rebuilt in {built:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,2676 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from datetime import date, datetime, timedelta
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import base64
+import csv
+import functools
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import json
+import math
+import operator
+import pickle
+import queue
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
 import uuid
 import os
+import zlib
+
+try:
+    import numpy
+except ImportError:  # optional: batch alert evaluation falls back to pure Python
+    numpy = None
+
+try:
+    import orjson
+except ImportError:  # optional: cached list encodings fall back to the json module
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: the journal directory is then not locked
+    fcntl = None
 
 app = Flask(__name__)
-CORS(app)
+# Sessions are signed with this key; set IIMS_SECRET_KEY so every worker process shares it
+app.config['SECRET_KEY'] = os.environ.get("IIMS_SECRET_KEY") or os.urandom(32).hex()
+# The UI is served from this app, so only the listed front-end origins (comma-separated
+# IIMS_CORS_ORIGINS) may make credentialed cross-origin requests with the session cookie
+CORS(app, origins=os.environ.get("IIMS_CORS_ORIGINS", "http://localhost:5000").split(","),
+     supports_credentials=True)
+
+# ==================== STORAGE ====================
+
+class VersionConflict(Exception):
+    """A conditional write named a record version that is no longer current"""
+
+    def __init__(self, key, expected, current):
+        super().__init__(f"{key}: expected version {expected}, current version is {current}")
+        self.key = key
+        self.expected = expected
+        self.current = current
+
+
+class KeyedStore:
+    """In-memory table keyed by primary key, iterated in insertion order
+
+    With a record_type (a CompactRecord subclass), inserted dicts are converted to it
+    so each row is stored in its compact form. With a version_field, every record
+    carries a version starting at 1 and bumped by each update, and update/delete can
+    be made conditional on it.
+
+    Writes to one record are serialized by that key's lock stripe, so a version check
+    cannot race the write it guards. The store-wide lock covers only the swap, the order
+    and index bookkeeping and queueing the change for listeners. Listeners are run after
+    the stripe is released, by whichever writer holds the dispatch lock, in queue order
+    and one change at a time, since they are not thread-safe. A write returns once its
+    change has been delivered; writers to any records only wait on each other there.
+    """
+
+    def __init__(self, key_field, records=(), indexes=(), record_type=None, version_field=None, stripes=64):
+        self.key_field = key_field
+        self.record_type = record_type
+        self.version_field = version_field
+        self._lock = threading.RLock()
+        self._dispatch = threading.RLock()
+        self._stripes = [threading.RLock() for _ in range(stripes)]
+        self._rows = {}
+        self._seq = {}
+        self._next_seq = 0
+        # Insertion order as parallel seq/key lists for cursor seeks; deleted keys are
+        # tombstoned with None and compacted once they outnumber live entries
+        self._order_seqs = []
+        self._order_keys = []
+        self._tombstones = 0
+        # Secondary indexes: field -> value -> {key: None} (dict used as an ordered set)
+        self._indexes = {field: {} for field in indexes}
+        self._listeners = []  # replaced, never mutated, so each queued change keeps its own list
+        self._pending = deque()  # (listeners, old, new) awaiting dispatch, in mutation order
+        # Bumped once listeners have seen a mutation, so an ETag never names derived state
+        # that is still catching up; exposed to clients as an ETag
+        self.version = 0
+        for record in records:
+            self.insert(record)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows.values())
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def get(self, key, default=None):
+        """Return the record stored under key, or default"""
+        return self._rows.get(key, default)
+
+    def all(self):
+        """Return all records as a list in insertion order"""
+        return list(self._rows.values())
+
+    def find(self, criteria):
+        """Return records matching all field=value criteria, in insertion order"""
+        indexed = [field for field in criteria if field in self._indexes]
+        if not indexed:
+            return [r for r in self._rows.values() if all(r.get(f) == v for f, v in criteria.items())]
+        field = min(indexed, key=lambda f: len(self._indexes[f].get(criteria[f], ())))
+        bucket = self._indexes[field].get(criteria[field], {})
+        rest = [(f, v) for f, v in criteria.items() if f != field]
+        keys = sorted(bucket, key=self._seq.__getitem__)
+        # Reads take no lock, so skip keys deleted since the bucket was read
+        rows = [row for row in map(self._rows.get, keys) if row is not None]
+        return [r for r in rows if all(r.get(f) == v for f, v in rest)]
+
+    def page(self, after=None, limit=None, criteria=None):
+        """Return (records, last_seq) for up to limit records with seq > after
+
+        last_seq is the seq of the final record returned when more records follow,
+        otherwise None, and can be passed back as after to fetch the next page.
+        """
+        if criteria:
+            found = [(self._seq.get(r[self.key_field]), r[self.key_field]) for r in self.find(criteria)]
+            found = [(seq, key) for seq, key in found if seq is not None]
+            seqs = [seq for seq, _ in found]
+            keys = [key for _, key in found]
+        else:
+            keys, seqs = self._order_keys, self._order_seqs
+        start = bisect_right(seqs, after) if after is not None else 0
+        records = []
+        last_seq = None
+        rows = self._rows
+        for i in range(start, len(keys)):
+            key = keys[i]
+            record = rows.get(key) if key is not None else None
+            if record is None:
+                continue  # tombstone, or deleted while this page was being read
+            if limit is not None and len(records) == limit:
+                return records, last_seq
+            records.append(record)
+            last_seq = seqs[i]
+        return records, None
+
+    def count_by(self, field):
+        """Return {value: record count} for an indexed field"""
+        return {value: len(keys) for value, keys in self._indexes[field].items()}
+
+    def _index_add(self, key, record):
+        for field, index in self._indexes.items():
+            index.setdefault(record.get(field), {})[key] = None
+
+    def _index_remove(self, key, record):
+        for field, index in self._indexes.items():
+            value = record.get(field)
+            bucket = index[value]
+            del bucket[key]
+            if not bucket:
+                del index[value]
+
+    def _compact_order(self):
+        live = [(seq, key) for seq, key in zip(self._order_seqs, self._order_keys) if key is not None]
+        self._order_seqs = [seq for seq, _ in live]
+        self._order_keys = [key for _, key in live]
+        self._tombstones = 0
+
+    def subscribe(self, listener, reset=None):
+        """Register listener(old, new) for every mutation, replaying existing records as inserts
+
+        reset() is called before a full replay when a shared backend was changed by another
+        process, and only listeners that pass one are replayed; the in-memory store never
+        needs it.
+        """
+        with self._dispatch:
+            # Changes queued before this point are already in the replayed rows and carry
+            # the old listener list; every later one is delivered after the replay
+            with self._lock:
+                self._listeners = self._listeners + [listener]
+                records = list(self._rows.values())
+            for record in records:
+                listener(None, record)
+
+    def refresh(self):
+        """Bring subscribed listeners up to date with external writes (none in memory)"""
+
+    def _queue(self, old, new):
+        # Called under _lock, so the queue is in the same order as the mutations
+        self._pending.append((self._listeners, old, new))
+
+    def _notify(self):
+        """Deliver queued changes, including the caller's own, before returning"""
+        with self._dispatch:
+            while True:
+                try:
+                    listeners, old, new = self._pending.popleft()
+                except IndexError:
+                    return
+                for listener in listeners:
+                    listener(old, new)
+                self.version += 1
+
+    def insert(self, record):
+        """Add a new record; raises KeyError if the key is already taken"""
+        key = record[self.key_field]
+        if key in self._rows:
+            raise KeyError(key)
+        if self.record_type is not None and type(record) is not self.record_type:
+            record = self.record_type(record)
+        if self.version_field is not None and self.version_field not in record:
+            record[self.version_field] = 1
+        with self._stripe(key):
+            with self._lock:
+                if key in self._rows:
+                    raise KeyError(key)
+                self._rows[key] = record
+                self._seq[key] = self._next_seq
+                self._order_seqs.append(self._next_seq)
+                self._order_keys.append(key)
+                self._next_seq += 1
+                self._index_add(key, record)
+                self._queue(None, record)
+        self._notify()
+        return record
+
+    def insert_many(self, records):
+        """Insert a batch of records; returns the keys skipped because they were taken"""
+        skipped = []
+        for record in records:
+            try:
+                self.insert(record)
+            except KeyError:
+                skipped.append(record[self.key_field])
+        return skipped
+
+    def upsert_many(self, records):
+        """Merge each record into the existing one with its key, inserting it if there is none"""
+        for record in records:
+            key = record[self.key_field]
+            if key in self._rows:
+                self.update(key, record)
+            else:
+                self.insert(record)
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _check_version(self, key, record, expected_version):
+        current = record.get(self.version_field, 0)
+        if current != expected_version:
+            raise VersionConflict(key, expected_version, current)
+
+    def update(self, key, changes, expected_version=None):
+        """Replace an existing record with a copy that has changes applied
+
+        The copy, new version included, is built before it is swapped in, so lock-free
+        readers always see either the old or the new record and never a mix of both.
+        Raises VersionConflict if expected_version is given and is not the record's current
+        version (requires a version_field).
+        """
+        with self._stripe(key):
+            old = self._rows[key]
+            if expected_version is not None:
+                self._check_version(key, old, expected_version)
+            record = old.copy()
+            record.update(changes)
+            if self.version_field is not None:
+                record[self.version_field] = old.get(self.version_field, 0) + 1
+            with self._lock:
+                self._rows[key] = record
+                if self._indexes:
+                    self._index_remove(key, old)
+                    self._index_add(key, record)
+                self._queue(old, record)
+        self._notify()
+        return record
+
+    def delete(self, key, expected_version=None):
+        """Remove and return the record stored under key, optionally only at expected_version"""
+        with self._stripe(key):
+            if expected_version is not None:
+                self._check_version(key, self._rows[key], expected_version)
+            with self._lock:
+                record = self._rows.pop(key)
+                seq = self._seq.pop(key)
+                self._order_keys[bisect_left(self._order_seqs, seq)] = None
+                self._tombstones += 1
+                if self._tombstones > len(self._rows):
+                    self._compact_order()
+                self._index_remove(key, record)
+                self._queue(record, None)
+        self._notify()
+        return record
+
+
+_MISSING = object()
+_TIMESTAMP_EPOCH = datetime(1, 1, 1)
+
+
+def _encode_date(value):
+    """YYYY-MM-DD string -> day ordinal; _MISSING if it would not round-trip"""
+    if value is None:
+        return None
+    return _date_ordinal(value) if type(value) is str else _MISSING
+
+
+@functools.lru_cache(maxsize=65536)
+def _date_ordinal(value):
+    try:
+        parsed = date.fromisoformat(value)
+    except ValueError:
+        return _MISSING
+    return parsed.toordinal() if parsed.isoformat() == value else _MISSING
+
+
+@functools.lru_cache(maxsize=65536)
+def _decode_date(value):
+    # Cached: a table holds far fewer distinct dates than rows
+    return None if value is None else date.fromordinal(value).isoformat()
+
+
+def _encode_timestamp(value):
+    """YYYY-MM-DD HH:MM:SS string -> seconds since 0001-01-01; _MISSING if it would not round-trip"""
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return _MISSING
+    if parsed.tzinfo is not None or parsed.isoformat(" ") != value:
+        return _MISSING
+    return (parsed - _TIMESTAMP_EPOCH) // timedelta(seconds=1)
+
+
+def _decode_timestamp(value):
+    return None if value is None else (_TIMESTAMP_EPOCH + timedelta(seconds=value)).isoformat(" ")
+
+
+def _encode_enum(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class CompactRecord(MutableMapping):
+    """Slotted table row that behaves like the dict it replaces
+
+    Subclasses set __slots__ = FIELDS. Values of DATE_FIELDS are held as day ordinals,
+    TIMESTAMP_FIELDS as whole seconds, and ENUM_FIELDS are interned so every record
+    shares one copy of each distinct value. A value that cannot be stored compactly
+    (an unparseable date, say) and any field outside FIELDS go to a per-record overflow
+    dict, so reads always return exactly what was written.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    DATE_FIELDS = ()
+    TIMESTAMP_FIELDS = ()
+    ENUM_FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # field -> (encode, decode), None meaning the value is stored as is
+        cls._CODECS = {field: (None, None) for field in cls.FIELDS}
+        cls._CODECS.update({field: (_encode_date, _decode_date) for field in cls.DATE_FIELDS})
+        cls._CODECS.update({field: (_encode_timestamp, _decode_timestamp) for field in cls.TIMESTAMP_FIELDS})
+        cls._CODECS.update({field: (_encode_enum, None) for field in cls.ENUM_FIELDS})
+        cls._DECODERS = tuple((field, cls._CODECS[field][1]) for field in cls.FIELDS)
+
+    def __init__(self, values=(), **kwargs):
+        self._extra = None
+        if type(values) is not dict or kwargs:
+            self.update(values, **kwargs)
+            return
+        # Inlined __setitem__ for the common case of converting a plain dict
+        codecs = self._CODECS
+        for field, value in values.items():
+            codec = codecs.get(field)
+            stored = _MISSING if codec is None else value if codec[0] is None else codec[0](value)
+            if stored is _MISSING:
+                self[field] = value
+            else:
+                setattr(self, field, stored)
+
+    def __getitem__(self, field):
+        codec = self._CODECS.get(field)
+        if codec is not None:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                return value if codec[1] is None else codec[1](value)
+        if self._extra is not None and field in self._extra:
+            return self._extra[field]
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __setitem__(self, field, value):
+        codec = self._CODECS.get(field)
+        if codec is not None:
+            stored = value if codec[0] is None else codec[0](value)
+            if stored is not _MISSING:
+                setattr(self, field, stored)
+                if self._extra is not None:
+                    self._extra.pop(field, None)
+                return
+            if hasattr(self, field):
+                delattr(self, field)
+        if self._extra is None:
+            self._extra = {}
+        self._extra[field] = value
+
+    def __delitem__(self, field):
+        if field in self._CODECS and hasattr(self, field):
+            delattr(self, field)
+        elif self._extra is not None and field in self._extra:
+            del self._extra[field]
+        else:
+            raise KeyError(field)
+
+    def __contains__(self, field):
+        return (field in self._CODECS and hasattr(self, field)) or (self._extra is not None and field in self._extra)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for field in self.FIELDS if hasattr(self, field)) + len(self._extra or ())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+    def copy(self):
+        """Shallow copy that keeps the compact encoding (no decode/re-encode)"""
+        clone = object.__new__(type(self))
+        for field in self.FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                setattr(clone, field, value)
+        clone._extra = dict(self._extra) if self._extra is not None else None
+        return clone
+
+    def as_dict(self):
+        """Decode into a plain dict; the fast path used for JSON output"""
+        out = {}
+        for field, decode in self._DECODERS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                out[field] = value if decode is None else decode(value)
+        if self._extra is not None:
+            out.update(self._extra)
+        return out
+
+
+def json_default(value):
+    """json.dumps default= hook for compact records"""
+    if isinstance(value, CompactRecord):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that also serializes compact records"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, CompactRecord):
+            return o.as_dict()
+        return DefaultJSONProvider.default(o)
+
+
+app.json = RecordJSONProvider(app)
+
+
+def encode_json(value):
+    """Compact, key-sorted JSON bytes as jsonify would produce, via orjson when installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=json_default, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass  # non-string keys, integers beyond 64 bits, ...
+    return json.dumps(value, default=json_default, sort_keys=True, separators=(",", ":")).encode()
+
+
+class EncodedRecordCache:
+    """JSON encoding of each record in a store, built on first read and dropped on mutation
+
+    An encoding is only kept if no write reached the store between reading the records
+    and encoding them, so a concurrent update can never leave stale bytes behind.
+    """
+
+    def __init__(self, store):
+        self.key_field = store.key_field
+        # Key fields have no codec, so on compact rows the key is the slot attribute itself
+        self._key = (operator.attrgetter if getattr(store, "record_type", None) else operator.itemgetter)(self.key_field)
+        self._encoded = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        store.subscribe(self._invalidate, reset=self._clear)
+
+    def __len__(self):
+        return len(self._encoded)
+
+    def _invalidate(self, old, new):
+        with self._lock:
+            self._generation += 1
+            if old is not None:
+                self._encoded.pop(old[self.key_field], None)
+            if new is not None:
+                self._encoded.pop(new[self.key_field], None)
+
+    def _clear(self):
+        with self._lock:
+            self._generation += 1
+            self._encoded.clear()
+
+    def encode(self, records, generation=None):
+        """Return the encoded bytes of each record; generation is read before fetching them"""
+        encoded = self._encoded
+        result, misses = [], {}
+        for record, key in zip(records, map(self._key, records)):
+            data = encoded.get(key)
+            if data is None:
+                data = misses[key] = encode_json(record)
+            result.append(data)
+        if misses and generation is not None:
+            with self._lock:
+                if generation == self._generation:
+                    encoded.update(misses)
+        return result
+
+    def pager(self, page_fn):
+        """Wrap page_fn(after, limit) to return encoded records instead of records"""
+        def encoded_page(after, limit):
+            generation = self._generation
+            records, last_position = page_fn(after, limit)
+            return self.encode(records, generation), last_position
+        return encoded_page
+
+
+def take_page(items, limit):
+    """Collect up to limit (position, record) pairs into (records, last_position)
+
+    last_position is only returned when at least one more item follows.
+    """
+    records = []
+    last_position = None
+    for position, record in items:
+        if limit is not None and len(records) == limit:
+            return records, last_position
+        records.append(record)
+        last_position = position
+    return records, None
+
+
+class AuditSegment:
+    """Metadata for one append-only JSON-lines audit segment file"""
+
+    def __init__(self, path, first_seq):
+        self.path = path
+        self.first_seq = first_seq
+        self.last_seq = first_seq - 1
+        self.last_ts = None
+        self.count = 0
+        # Sparse index over every AUDIT_SPARSE_EVERY-th line: seq, timestamp, byte offset
+        self.sparse_seqs = []
+        self.sparse_ts = []
+        self.sparse_offsets = []
+
+    def add(self, seq, timestamp, offset, sparse_every):
+        if self.count % sparse_every == 0:
+            self.sparse_seqs.append(seq)
+            self.sparse_ts.append(timestamp)
+            self.sparse_offsets.append(offset)
+        self.count += 1
+        self.last_seq = seq
+        self.last_ts = timestamp
+
+    def seek_offset(self, start_seq, since):
+        """Byte offset of the last indexed line at or before the first possible match"""
+        i = bisect_right(self.sparse_seqs, start_seq) - 1
+        if since is not None:
+            i = max(i, bisect_left(self.sparse_ts, since) - 1)
+        return self.sparse_offsets[i] if i >= 0 else 0
+
+
+class AuditLog:
+    """Bounded audit log: a fixed-size ring buffer in memory, optionally backed by
+    rolling append-only JSON-lines segment files on disk"""
+
+    def __init__(self, capacity=10000, segment_dir=None, segment_size=100000,
+                 fsync_batch=256, fsync_interval=1.0, sparse_every=64):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self.segment_dir = segment_dir
+        self.segment_size = segment_size
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.sparse_every = sparse_every
+        self._segments = []
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if segment_dir:
+            os.makedirs(segment_dir, exist_ok=True)
+            self._load_segments()
+
+    def __len__(self):
+        return min(self._next_seq, self.capacity)
+
+    @property
+    def version(self):
+        """Number of entries ever appended"""
+        return self._next_seq
+
+    def __iter__(self):
+        return (entry for _, entry in self._iter_ring(self._first_buffered_seq()))
+
+    def _first_buffered_seq(self):
+        return max(0, self._next_seq - self.capacity)
+
+    def _load_segments(self):
+        """Rebuild segment metadata and the ring buffer from files left by a previous run"""
+        names = sorted(n for n in os.listdir(self.segment_dir) if n.startswith("audit-") and n.endswith(".jsonl"))
+        for name in names:
+            path = os.path.join(self.segment_dir, name)
+            segment = AuditSegment(path, int(name[6:-6]))
+            with open(path, 'rb+') as f:
+                offset = 0
+                for line in iter(f.readline, b''):
+                    try:
+                        row = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        row = None
+                    if row is None:
+                        # Torn write at the tail of a crashed segment: cut it off so readers
+                        # never reach it
+                        f.truncate(offset)
+                        break
+                    seq = row.pop("seq")
+                    segment.add(seq, row["timestamp"], offset, self.sparse_every)
+                    self._ring[seq % self.capacity] = row
+                    self._next_seq = seq + 1
+                    offset += len(line)
+            self._segments.append(segment)
+
+    def restore(self, entries):
+        """Load entries recovered by a StoreJournal into the ring buffer (not the segments)"""
+        with self._lock:
+            for entry in entries:
+                self._ring[self._next_seq % self.capacity] = entry
+                self._next_seq += 1
+
+    def append(self, entry):
+        """Append an entry, writing it through to the current segment if enabled"""
+        with self._lock:
+            seq = self._next_seq
+            self._ring[seq % self.capacity] = entry
+            self._next_seq += 1
+            if self.segment_dir:
+                self._write(seq, entry)
+        return entry
+
+    def _write(self, seq, entry):
+        if self._file is None or self._segments[-1].count >= self.segment_size:
+            self._roll(seq)
+        segment = self._segments[-1]
+        offset = self._file.tell()
+        self._file.write(json.dumps({"seq": seq, **entry}).encode() + b"\n")
+        self._file.flush()
+        segment.add(seq, entry["timestamp"], offset, self.sparse_every)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _roll(self, first_seq):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        path = os.path.join(self.segment_dir, f"audit-{first_seq:012d}.jsonl")
+        self._segments.append(AuditSegment(path, first_seq))
+        self._file = open(path, 'ab')
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Flush pending writes to disk and close the current segment"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _iter_ring(self, start_seq):
+        for seq in range(max(start_seq, self._first_buffered_seq()), self._next_seq):
+            yield seq, self._ring[seq % self.capacity]
+
+    def _ring_seek(self, since):
+        """First buffered seq whose timestamp is >= since (timestamps are append-ordered)"""
+        lo, hi = self._first_buffered_seq(), self._next_seq
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ring[mid % self.capacity]["timestamp"] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _iter_segments(self, start_seq, since):
+        for segment in self._segments:
+            if segment.last_seq < start_seq or (since is not None and segment.last_ts < since):
+                continue
+            with open(segment.path, 'rb') as f:
+                f.seek(segment.seek_offset(start_seq, since))
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        break  # a torn line can only be the last one written
+                    seq = row.pop("seq")
+                    if seq >= start_seq and (since is None or row["timestamp"] >= since):
+                        yield seq, row
+
+    def query(self, after=None, limit=None, since=None, until=None, action=None):
+        """Return (entries, last_seq) in append order, filtered by timestamp range and action
+
+        Reads come from the ring buffer when it still holds the requested range, otherwise
+        from the segment files, seeking to the nearest sparse index point.
+        """
+        start_seq = after + 1 if after is not None else 0
+
+        def matching(items):
+            for seq, entry in items:
+                if until is not None and entry["timestamp"] > until:
+                    return
+                if action is None or entry["action"] == action:
+                    yield seq, entry
+
+        with self._lock:
+            first_buffered = self._first_buffered_seq()
+            on_disk = bool(self._segments) and (
+                start_seq < first_buffered
+                or (since is not None and self._next_seq > first_buffered
+                    and since < self._ring[first_buffered % self.capacity]["timestamp"])
+            )
+            if not on_disk:
+                if since is not None:
+                    start_seq = max(start_seq, self._ring_seek(since))
+                return take_page(matching(self._iter_ring(start_seq)), limit)
+            if self._file is not None:
+                self._file.flush()
+        # Segment files are append-only, so they can be read without holding the lock
+        return take_page(matching(self._iter_segments(start_seq, since)), limit)
+
+
+class SQLiteDatabase:
+    """SQLite database file in WAL mode, with one connection per thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS store_generations (tbl TEXT PRIMARY KEY, gen INTEGER NOT NULL)")
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement writes use explicit transactions. The module's
+            # statement cache keeps each distinct SQL string prepared on the connection.
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=256, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a write transaction, taking the write lock up front"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+class SQLiteStore:
+    """SQLite-backed table with the same interface as KeyedStore
+
+    Each record is stored as a JSON document, with its key and every indexed field
+    copied into indexed columns. A per-table generation counter, bumped by every write,
+    lets refresh() detect writes made by other processes and replay listeners. Version
+    checks run inside the write transaction, so they hold across processes too.
+
+    Like KeyedStore, listeners see one mutation at a time: a dispatch lock is held from
+    before each write transaction until its listeners have run, and across a replay, so
+    they get this process's writes in commit order and never a replay mid-notification.
+    """
+
+    def __init__(self, db, table, key_field, records=(), indexes=(), version_field=None):
+        self.db = db
+        self.table = table
+        self.key_field = key_field
+        self.version_field = version_field
+        self.indexes = tuple(indexes)
+        self._columns = {field: f"ix_{field}" for field in self.indexes}
+        self._listeners = []
+        self._gen_lock = threading.Lock()
+        self._dispatch = threading.RLock()
+        column_defs = "".join(f", {col}" for col in self._columns.values())
+        placeholders = "".join(", ?" for _ in self._columns)
+        assignments = "".join(f", {col} = ?" for col in self._columns.values())
+        self._sql_insert = f"INSERT INTO {table} (key, doc{column_defs}) VALUES (?, ?{placeholders})"
+        self._sql_update = f"UPDATE {table} SET doc = ?{assignments} WHERE key = ?"
+        self._sql_get = f"SELECT doc FROM {table} WHERE key = ?"
+        self._sql_bump = "UPDATE store_generations SET gen = gen + 1 WHERE tbl = ?"
+        self._sql_gen = "SELECT gen FROM store_generations WHERE tbl = ?"
+        with db.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                         f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, doc TEXT NOT NULL{column_defs})")
+            for field, col in self._columns.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{col} ON {table} ({col}, seq)")
+            conn.execute("INSERT OR IGNORE INTO store_generations (tbl, gen) VALUES (?, 0)", (table,))
+            seed = conn.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table})").fetchone()[0]
+            if seed:
+                for record in records:
+                    self._insert_row(conn, record)
+            self._seen_gen = conn.execute(self._sql_gen, (table,)).fetchone()[0]
+
+    def __len__(self):
+        return self.db.connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    @property
+    def version(self):
+        """Table generation, bumped by every write from any process"""
+        return self.db.connection().execute(self._sql_gen, (self.table,)).fetchone()[0]
+
+    def __iter__(self):
+        cursor = self.db.connection().execute(f"SELECT doc FROM {self.table} ORDER BY seq")
+        return (json.loads(doc) for doc, in cursor)
+
+    def __contains__(self, key):
+        return self.db.connection().execute(self._sql_get, (key,)).fetchone() is not None
+
+    def get(self, key, default=None):
+        """Return the record stored under key, or default"""
+        row = self.db.connection().execute(self._sql_get, (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def all(self):
+        """Return all records as a list in insertion order"""
+        return list(self)
+
+    def _where(self, criteria):
+        clauses, params = [], []
+        for field, value in criteria.items():
+            column = self._columns.get(field, f"json_extract(doc, '$.{field}')")
+            clauses.append(f"{column} IS ?")
+            params.append(value)
+        return clauses, params
+
+    def find(self, criteria):
+        """Return records matching all field=value criteria, in insertion order"""
+        return self.page(None, None, criteria)[0]
+
+    def page(self, after=None, limit=None, criteria=None):
+        """Return (records, last_seq) for up to limit records with seq > after"""
+        clauses, params = self._where(criteria or {})
+        if after is not None:
+            clauses.append("seq > ?")
+            params.append(after)
+        sql = f"SELECT seq, doc FROM {self.table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self.db.connection().execute(sql, params).fetchall()
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            return [json.loads(doc) for _, doc in rows], rows[-1][0]
+        return [json.loads(doc) for _, doc in rows], None
+
+    def count_by(self, field):
+        """Return {value: record count} for an indexed field"""
+        column = self._columns[field]
+        rows = self.db.connection().execute(f"SELECT {column}, COUNT(*) FROM {self.table} GROUP BY {column}")
+        return dict(rows.fetchall())
+
+    def subscribe(self, listener, reset=None):
+        """Register listener(old, new) for every mutation, replaying existing records as inserts"""
+        with self._dispatch:
+            self._listeners.append((listener, reset))
+            for record in self:
+                listener(None, record)
+
+    def refresh(self):
+        """Replay all records to listeners if another process wrote since our last write"""
+        if self.version == self._seen_gen:
+            return
+        with self._dispatch:
+            # Checked again under the lock: a concurrent refresh may have replayed already
+            gen = self.version
+            with self._gen_lock:
+                if gen == self._seen_gen:
+                    return
+                self._seen_gen = gen
+            # Only listeners that can reset take part in the replay
+            replayed = [(listener, reset) for listener, reset in self._listeners if reset is not None]
+            for _, reset in replayed:
+                reset()
+            for record in self:
+                for listener, _ in replayed:
+                    listener(None, record)
+
+    def _bump(self, conn):
+        conn.execute(self._sql_bump, (self.table,))
+        gen = conn.execute(self._sql_gen, (self.table,)).fetchone()[0]
+        with self._gen_lock:
+            # A gap means some other writer committed in between; leave it for refresh()
+            if gen == self._seen_gen + 1:
+                self._seen_gen = gen
+
+    def _notify(self, old, new):
+        for listener, _ in self._listeners:
+            listener(old, new)
+
+    def _insert_row(self, conn, record):
+        if self.version_field is not None and self.version_field not in record:
+            record[self.version_field] = 1
+        values = [record.get(field) for field in self._columns]
+        try:
+            conn.execute(self._sql_insert, [record[self.key_field], json.dumps(record), *values])
+        except sqlite3.IntegrityError:
+            raise KeyError(record[self.key_field])
+
+    def insert(self, record):
+        """Add a new record; raises KeyError if the key is already taken"""
+        with self._dispatch:
+            with self.db.transaction() as conn:
+                self._insert_row(conn, record)
+                self._bump(conn)
+            self._notify(None, record)
+            return record
+
+    def insert_many(self, records):
+        """Insert a batch of records in one transaction; returns the keys skipped because they were taken"""
+        inserted, skipped = [], []
+        with self._dispatch:
+            with self.db.transaction() as conn:
+                for record in records:
+                    try:
+                        self._insert_row(conn, record)
+                        inserted.append(record)
+                    except KeyError:
+                        skipped.append(record[self.key_field])
+                if inserted:
+                    self._bump(conn)
+            for record in inserted:
+                self._notify(None, record)
+            return skipped
+
+    def upsert_many(self, records):
+        """Merge a batch of records into existing rows in one transaction, inserting missing keys"""
+        changed = []
+        with self._dispatch:
+            with self.db.transaction() as conn:
+                for record in records:
+                    row = conn.execute(self._sql_get, (record[self.key_field],)).fetchone()
+                    if row is None:
+                        self._insert_row(conn, record)
+                        changed.append((None, record))
+                        continue
+                    old = json.loads(row[0])
+                    merged = {**old, **record}
+                    if self.version_field is not None:
+                        merged[self.version_field] = old.get(self.version_field, 0) + 1
+                    values = [merged.get(field) for field in self._columns]
+                    conn.execute(self._sql_update, [json.dumps(merged), *values, record[self.key_field]])
+                    changed.append((old, merged))
+                if changed:
+                    self._bump(conn)
+            for old, new in changed:
+                self._notify(old, new)
+
+    def _check_version(self, key, record, expected_version):
+        current = record.get(self.version_field, 0)
+        if current != expected_version:
+            raise VersionConflict(key, expected_version, current)
+
+    def update(self, key, changes, expected_version=None):
+        """Apply changes to an existing record, optionally only at expected_version"""
+        with self._dispatch:
+            with self.db.transaction() as conn:
+                row = conn.execute(self._sql_get, (key,)).fetchone()
+                if row is None:
+                    raise KeyError(key)
+                old = json.loads(row[0])
+                if expected_version is not None:
+                    self._check_version(key, old, expected_version)
+                record = {**old, **changes}
+                if self.version_field is not None:
+                    record[self.version_field] = old.get(self.version_field, 0) + 1
+                values = [record.get(field) for field in self._columns]
+                conn.execute(self._sql_update, [json.dumps(record), *values, key])
+                self._bump(conn)
+            self._notify(old, record)
+            return record
+
+    def delete(self, key, expected_version=None):
+        """Remove and return the record stored under key, optionally only at expected_version"""
+        with self._dispatch:
+            with self.db.transaction() as conn:
+                row = conn.execute(self._sql_get, (key,)).fetchone()
+                if row is None:
+                    raise KeyError(key)
+                if expected_version is not None:
+                    self._check_version(key, json.loads(row[0]), expected_version)
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._bump(conn)
+            record = json.loads(row[0])
+            self._notify(record, None)
+            return record
+
+
+class SQLiteAuditLog:
+    """Audit log stored in SQLite, with the same query interface as AuditLog"""
+
+    def __init__(self, db, table="audit_log"):
+        self.db = db
+        self.table = table
+        with db.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "timestamp TEXT NOT NULL, userRole TEXT, action TEXT NOT NULL, details TEXT)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_action ON {table} (action, seq)")
+
+    def __len__(self):
+        return self.db.connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.query()[0])
+
+    @property
+    def version(self):
+        """Highest seq appended so far"""
+        return self.db.connection().execute(f"SELECT COALESCE(MAX(seq), 0) FROM {self.table}").fetchone()[0]
+
+    def append(self, entry):
+        """Append an entry"""
+        self.db.connection().execute(
+            f"INSERT INTO {self.table} (timestamp, userRole, action, details) VALUES (?, ?, ?, ?)",
+            (entry["timestamp"], entry["userRole"], entry["action"], entry["details"]))
+        return entry
+
+    def query(self, after=None, limit=None, since=None, until=None, action=None):
+        """Return (entries, last_seq) in append order, filtered by timestamp range and action"""
+        clauses, params = [], []
+        for clause, value in (("seq > ?", after), ("timestamp >= ?", since),
+                              ("timestamp <= ?", until), ("action = ?", action)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = f"SELECT seq, timestamp, userRole, action, details FROM {self.table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self.db.connection().execute(sql, params).fetchall()
+        more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if more else rows
+        entries = [{"timestamp": ts, "userRole": role, "action": act, "details": details}
+                   for _, ts, role, act, details in rows]
+        return entries, rows[-1][0] if more else None
+
+
+class WriteAheadLog:
+    """Append-only file of checksummed, pickled entries with group commit
+
+    append() only buffers an entry and returns its log sequence number; commit(lsn)
+    blocks until that entry is on disk. Whichever committer gets there first writes and
+    fsyncs everything buffered so far, so concurrent writers share a single fsync.
+    """
+
+    HEADER = struct.Struct("<II")  # payload length, crc32
+
+    def __init__(self, path, start_lsn=0):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._syncing = False
+        # LSNs continue across files so a committer never waits on a rotated-out log
+        self.appended = self.durable = start_lsn
+        self.syncs = 0
+
+    def append(self, entry):
+        """Buffer an entry; returns its LSN"""
+        payload = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        data = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            self._buffer.append(data)
+            self.appended += 1
+            return self.appended
+
+    def commit(self, lsn=None):
+        """Block until every entry up to lsn (default: all appended) is durable"""
+        with self._cond:
+            target = self.appended if lsn is None else lsn
+            while self.durable < target:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                batch, self._buffer = self._buffer, []
+                end = self.appended
+                self._cond.release()
+                try:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except BaseException:
+                    with self._cond:
+                        self._buffer[:0] = batch
+                    raise
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self.durable = end
+                self.syncs += 1
+
+    def close(self):
+        """Commit everything appended and close the file"""
+        self.commit()
+        self._file.close()
+
+    @classmethod
+    def read(cls, path):
+        """Yield the entries of a log file, stopping at a torn or corrupt tail"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset, size = 0, cls.HEADER.size
+        while offset + size <= len(data):
+            length, crc = cls.HEADER.unpack_from(data, offset)
+            payload = data[offset + size:offset + size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break  # torn write from a crash mid-append
+            yield pickle.loads(payload)
+            offset += size + length
+
+
+class StoreJournal:
+    """Snapshot + write-ahead log persistence for in-memory tables
+
+    Every mutation of an attached store, and every audit entry, is logged as
+    (table, key, record or None). Records are logged whole, so replaying one is
+    idempotent; audit entries are copied at the rotation so they are replayed once.
+    After compact_every entries the log is rotated and the tables are written to a
+    binary snapshot that supersedes every older log; snapshot N covers wal-N and
+    before. Recovery loads the newest snapshot and replays the later logs.
+    """
+
+    AUDIT = "audit"
+
+    def __init__(self, directory, compact_every=100000, sync_interval=1.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock_file = self._lock_directory()
+        self.compact_every = compact_every
+        self.sync_interval = sync_interval
+        self.tables = {}
+        self.audit = None
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._local = threading.local()
+        self._thread = None
+        self._compactor = None
+        self._recovered, self._recovered_audit, self._generation, replayed = self._recover()
+        self.recovered = self._generation > 0
+        self._logged = replayed
+        self._generation += 1
+        self._wal = WriteAheadLog(self._path("wal", self._generation, "log"))
+
+    def _lock_directory(self):
+        """Hold an exclusive lock on the directory so a second process cannot replay and
+        compact the same logs; raises RuntimeError if another process holds it"""
+        lock_file = open(os.path.join(self.directory, "LOCK"), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"journal directory {self.directory} is in use by another process") from None
+        return lock_file
+
+    def _path(self, kind, generation, ext):
+        return os.path.join(self.directory, f"{kind}-{generation:08d}.{ext}")
+
+    def _files(self, kind, ext):
+        """{generation: path} of the snapshot or log files in the directory"""
+        found = {}
+        for name in os.listdir(self.directory):
+            if name.startswith(kind + "-") and name.endswith("." + ext):
+                found[int(name[len(kind) + 1:-len(ext) - 1])] = os.path.join(self.directory, name)
+        return found
+
+    def _recover(self):
+        """Rebuild {table: {key: record}} and audit entries from the snapshot and logs"""
+        tables, audit, base = {}, [], 0
+        snapshots = self._files("snapshot", "bin")
+        if snapshots:
+            base = max(snapshots)
+            with open(snapshots[base], 'rb') as f:
+                state = pickle.load(f)
+            tables = {name: {row[key_field]: row for row in rows}
+                      for name, (key_field, rows) in state["tables"].items()}
+            audit = state["audit"]
+        logs = {generation: path for generation, path in self._files("wal", "log").items() if generation > base}
+        replayed = 0
+        for generation in sorted(logs):
+            for table, key, value in WriteAheadLog.read(logs[generation]):
+                replayed += 1
+                if table == self.AUDIT:
+                    audit.append(value)
+                elif value is None:
+                    tables.get(table, {}).pop(key, None)
+                else:
+                    tables.setdefault(table, {})[key] = value
+        return tables, audit, max([base, *logs]), replayed
+
+    def restored(self, table, seed=()):
+        """Records recovered for table, or seed if the table was never persisted"""
+        rows = self._recovered.pop(table, None)
+        return seed if rows is None else rows.values()
+
+    def attach(self, table, store):
+        """Log every later mutation of store under table"""
+        self.tables[table] = store
+        attached = False
+
+        def listener(old, new):
+            if not attached:
+                return  # subscribe() replaying rows that are already persisted
+            if new is None:
+                self.log(table, old[store.key_field], None)
+            else:
+                self.log(table, new[store.key_field], new.as_dict() if isinstance(new, CompactRecord) else dict(new))
+        store.subscribe(listener)
+        attached = True
+
+    def attach_audit(self, audit_log):
+        """Restore recovered audit entries into audit_log and log later ones via log_audit()"""
+        audit_log.restore(self._recovered_audit[-audit_log.capacity:])
+        self._recovered_audit = []
+        self.audit = audit_log
+
+    def log_audit(self, entry):
+        """Append entry to the attached audit log and to the current log in one step
+
+        Both happen under the lock compact() rotates the log and copies the audit log
+        under, so every entry is either in the snapshot or in a later log, never both.
+        """
+        with self._lock:
+            self.audit.append(entry)
+            due = self._append(self.AUDIT, None, entry)
+        if due:
+            self._compactor.start()
+
+    def log(self, table, key, value):
+        """Append one mutation to the current log; durable after the caller's next commit()"""
+        with self._lock:
+            due = self._append(table, key, value)
+        if due:
+            self._compactor.start()
+
+    def _append(self, table, key, value):
+        """Append under self._lock; returns True if a compaction is due and should be started"""
+        self._local.lsn = self._wal.append((table, key, value))
+        self._logged += 1
+        if self._logged < self.compact_every or self._compactor is not None:
+            return False
+        self._compactor = threading.Thread(target=self._compact_in_background, daemon=True, name="journal-compact")
+        return True
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception:
+            app.logger.exception("Journal compaction failed")
+        finally:
+            self._compactor = None
+
+    def commit(self):
+        """Wait until everything this thread logged is on disk (shared fsync with other threads)"""
+        lsn = getattr(self._local, "lsn", None)
+        if lsn is not None:
+            self._wal.commit(lsn)
+
+    def compact(self):
+        """Rotate the log and write a snapshot that replaces it and everything before it"""
+        with self._compact_lock:
+            with self._lock:
+                old = self._wal
+                old.close()
+                generation = self._generation
+                self._generation += 1
+                self._wal = WriteAheadLog(self._path("wal", self._generation, "log"), old.appended)
+                self._logged = 0
+                # Audit entries are appended, not keyed, so replaying one the snapshot already
+                # holds would duplicate it: copy them at the rotation point (the ring is bounded)
+                audit = list(self.audit) if self.audit is not None else []
+            # Table writes landing from here on are in the new log and replay idempotently over
+            # the snapshot, whether or not the copy below already saw them
+            state = {
+                "tables": {name: (store.key_field, [r.as_dict() if isinstance(r, CompactRecord) else dict(r)
+                                                    for r in store.all()])
+                           for name, store in self.tables.items()},
+                "audit": audit
+            }
+            path = self._path("snapshot", generation, "bin")
+            with open(path + ".tmp", 'wb') as f:
+                pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            for kind, ext in (("snapshot", "bin"), ("wal", "log")):
+                for older, older_path in self._files(kind, ext).items():
+                    if older < generation or (kind == "wal" and older == generation):
+                        os.remove(older_path)
+
+    def start(self):
+        """Snapshot the seeded tables on first use and commit other threads' writes periodically"""
+        if not self.recovered:
+            self.compact()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="journal-sync")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self._wal.commit()
+            except Exception:
+                app.logger.exception("Journal sync failed")
+
+    def close(self):
+        """Commit and close the current log and release the directory lock"""
+        with self._lock:
+            self._wal.close()
+            self._lock_file.close()  # closing the file releases the flock
+
+
+class EventBus:
+    """In-process publish/subscribe bus with a bounded queue per subscriber
+
+    A subscriber that falls behind loses its oldest queued events and is sent a
+    "resync" event telling it to refetch instead.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics):
+        """Return a subscription receiving (topic, data) for the given topics"""
+        subscription = Subscription(topics, self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def has_subscribers(self, topic):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return any(topic in sub.topics for sub in subscribers)
+
+    def publish(self, topic, data):
+        with self._lock:
+            subscribers = [sub for sub in self._subscribers if topic in sub.topics]
+        for sub in subscribers:
+            sub.put(topic, data)
+
+
+class DebouncedPublisher:
+    """Publishes build() on a bus topic at most once per interval after changes are marked
+
+    mark() only sets a flag, so store listeners can call it on every mutation; a daemon
+    thread builds and publishes the payload outside any store lock, coalescing a burst
+    of changes into one event.
+    """
+
+    def __init__(self, bus, topic, build, interval=0.25):
+        self.bus = bus
+        self.topic = topic
+        self.build = build
+        self.interval = interval
+        self.published = 0
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def mark(self):
+        """Note a change; an event follows within interval seconds if anyone subscribes"""
+        if self.bus.has_subscribers(self.topic):
+            self._changed.set()
+            self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, daemon=True, name=f"publish-{self.topic}")
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._changed.wait()
+            time.sleep(self.interval)
+            self._changed.clear()
+            try:
+                self.bus.publish(self.topic, self.build())
+                self.published += 1
+            except Exception:
+                app.logger.exception("Publishing %s failed", self.topic)
+
+
+class Subscription:
+    """One subscriber's topic set and pending event queue"""
+
+    def __init__(self, topics, max_queue):
+        self.topics = frozenset(topics)
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def put(self, topic, data):
+        try:
+            self.queue.put_nowait((topic, data))
+        except queue.Full:
+            self._drain()
+            self.queue.put_nowait(("resync", {"reason": "subscriber queue overflowed"}))
+
+    def _drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def get(self, timeout):
+        """Return the next (topic, data), or None if nothing arrives within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def store_change_event(key_field, old, new):
+    """Describe a store mutation as an insert/update/delete diff"""
+    if old is None:
+        return {"op": "insert", "key": new[key_field], "record": new}
+    if new is None:
+        return {"op": "delete", "key": old[key_field]}
+    changes = {field: value for field, value in new.items() if old.get(field) != value}
+    return {"op": "update", "key": new[key_field], "changes": changes}
+
+
+class TelemetryBuffer:
+    """Write-behind buffer that coalesces telemetry samples per device
+
+    Only the latest state of each device is kept until the next flush, which upserts
+    the whole batch into the store at once. A daemon thread flushes every interval
+    seconds, or sooner once max_pending devices are waiting.
+    """
+
+    def __init__(self, store, interval=1.0, max_pending=10000):
+        self.store = store
+        self.interval = interval
+        self.max_pending = max_pending
+        self.samples = 0
+        self.flushed = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, samples):
+        """Queue samples, merging each into any pending state for the same device"""
+        key_field = self.store.key_field
+        with self._lock:
+            pending = self._pending
+            for sample in samples:
+                key = sample[key_field]
+                if key in pending:
+                    pending[key].update(sample)
+                else:
+                    pending[key] = dict(sample)
+            self.samples += len(samples)
+            full = len(pending) >= self.max_pending
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every pending device state to the store; returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                try:
+                    self.store.upsert_many(list(batch.values()))
+                except Exception:
+                    # Put the batch back under anything that arrived meanwhile so no sample is lost
+                    with self._lock:
+                        for key, state in batch.items():
+                            self._pending[key] = {**state, **self._pending.get(key, {})}
+                    raise
+                self.flushed += len(batch)
+            return len(batch)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, daemon=True,
+                                                    name=f"telemetry-flush-{self.store.key_field}")
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                app.logger.exception("Telemetry flush failed")
+
+
+class TimeSeriesTier:
+    """One resolution of a metric series, stored as chunked array columns
+
+    Step 0 keeps raw samples as (time, value) columns. Other steps keep closed buckets
+    as (start, min, max, sum, count) columns plus the bucket still being filled. Whole
+    chunks are dropped once their newest entry falls outside the retention window.
+    """
+
+    def __init__(self, step, retention, chunk_size=1024):
+        self.step = step
+        self.retention = retention
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.open = None
+
+    def __len__(self):
+        return sum(len(chunk[0]) for chunk in self.chunks) + (self.open is not None)
+
+    def _append(self, row):
+        if not self.chunks or len(self.chunks[-1][0]) >= self.chunk_size:
+            cutoff = row[0] - self.retention
+            while self.chunks and self.chunks[0][0][-1] < cutoff:
+                self.chunks.pop(0)
+            typecodes = "dd" if self.step == 0 else "ddddL"
+            self.chunks.append(tuple(array(code) for code in typecodes))
+        for column, value in zip(self.chunks[-1], row):
+            column.append(value)
+
+    def add(self, timestamp, value):
+        if self.step == 0:
+            self._append((timestamp, value))
+            return
+        start = timestamp - timestamp % self.step
+        bucket = self.open
+        if bucket is not None and bucket[0] == start:
+            bucket[1] = min(bucket[1], value)
+            bucket[2] = max(bucket[2], value)
+            bucket[3] += value
+            bucket[4] += 1
+            return
+        if bucket is not None:
+            self._append(bucket)
+        self.open = [start, value, value, value, 1]
+
+    def covers(self, since, now):
+        """Whether entries back to since are still retained"""
+        return now - since <= self.retention
+
+    def rows(self, start, end):
+        """Yield (time, min, max, sum, count) for entries with start <= time < end"""
+        for chunk in self.chunks:
+            times = chunk[0]
+            if times[-1] < start:
+                continue
+            if times[0] >= end:
+                break
+            lo, hi = bisect_left(times, start), bisect_left(times, end)
+            if self.step == 0:
+                for t, value in zip(times[lo:hi], chunk[1][lo:hi]):
+                    yield t, value, value, value, 1
+            else:
+                yield from zip(*(column[lo:hi] for column in chunk))
+        if self.open is not None and start <= self.open[0] < end:
+            yield tuple(self.open)
+
+
+class TimeSeriesStore:
+    """Per-device metric history with raw samples and min/max/avg rollup tiers
+
+    tiers is a sequence of (step seconds, retention seconds), finest first, with step 0
+    for raw samples. Samples older than the newest one already recorded for a series
+    are dropped, so every tier can append without reordering. Timestamps more than
+    max_skew seconds ahead of the server clock are clamped to it, so one sample from a
+    device with a fast clock cannot hold back every later sample of its series.
+    """
+
+    def __init__(self, tiers, chunk_size=1024, max_skew=60, clock=time.time):
+        self.tiers = tuple(sorted(tiers))
+        self.chunk_size = chunk_size
+        self.max_skew = max_skew
+        self.clock = clock
+        self.dropped = 0
+        self.clamped = 0
+        self._series = {}  # (device, metric) -> [last timestamp, [TimeSeriesTier, ...]]
+        self._devices = {}  # device -> {metric: None} of its series
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, device):
+        return device in self._devices
+
+    def record(self, device, timestamp, values):
+        """Add one sample per metric in values, all taken at timestamp (epoch seconds)"""
+        now = self.clock()
+        with self._lock:
+            if timestamp > now + self.max_skew:
+                self.clamped += 1
+                timestamp = now
+            for metric, value in values.items():
+                series = self._series.get((device, metric))
+                if series is None:
+                    series = self._series[(device, metric)] = [
+                        timestamp, [TimeSeriesTier(step, retention, self.chunk_size) for step, retention in self.tiers]]
+                    self._devices.setdefault(device, {})[metric] = None
+                elif timestamp < series[0]:
+                    self.dropped += 1
+                    continue
+                series[0] = timestamp
+                for tier in series[1]:
+                    tier.add(timestamp, float(value))
+
+    def forget(self, device):
+        """Drop every metric series of device"""
+        with self._lock:
+            for metric in self._devices.pop(device, ()):
+                del self._series[(device, metric)]
+
+    def query(self, device, metric, start, end, step):
+        """Return (step, points) for [start, end), bucketed by step seconds
+
+        Reads the coarsest tier no coarser than step that still retains start, so
+        long ranges are answered from rollups instead of raw samples. The returned
+        step is widened to that tier's step if it was finer.
+        """
+        with self._lock:
+            series = self._series.get((device, metric))
+            if series is None:
+                return step, None
+            last, tiers = series
+            usable = [tier for tier in tiers if tier.step <= step] or tiers[:1]
+            tier = usable[-1]
+            if not tier.covers(start, last):
+                tier = next((t for t in tiers if t.step > tier.step and t.covers(start, last)), tiers[-1])
+            step = max(step, tier.step)
+            buckets = {}
+            for t, low, high, total, count in tier.rows(start - start % step, end):
+                key = t - t % step
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [low, high, total, count]
+                else:
+                    bucket[0] = min(bucket[0], low)
+                    bucket[1] = max(bucket[1], high)
+                    bucket[2] += total
+                    bucket[3] += count
+        return step, [{"time": datetime.fromtimestamp(key).strftime("%Y-%m-%d %H:%M:%S"),
+                       "min": low, "max": high, "avg": total / count, "count": count}
+                      for key, (low, high, total, count) in buckets.items()]
+
+
+def parse_date_ordinal(value):
+    """Parse a YYYY-MM-DD string to a date ordinal, or None if missing/invalid"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class PredicateCounter:
+    """Count of records in a store matching a predicate, kept current by store events"""
+
+    def __init__(self, store, predicate):
+        self.predicate = predicate
+        self.count = 0
+        store.subscribe(self.on_change, self.reset)
+
+    def reset(self):
+        self.count = 0
+
+    def on_change(self, old, new):
+        if old is not None and self.predicate(old):
+            self.count -= 1
+        if new is not None and self.predicate(new):
+            self.count += 1
+
+
+class SortedDateIndex:
+    """Records sorted by a YYYY-MM-DD field, for counting and listing records due in a date range"""
+
+    def __init__(self, store, field):
+        self.field = field
+        self.key_field = store.key_field
+        self._entries = []  # sorted (date ordinal, key)
+        store.subscribe(self.on_change, self.reset)
+
+    def reset(self):
+        self._entries = []
+
+    def on_change(self, old, new):
+        old_day = parse_date_ordinal(old.get(self.field)) if old is not None else None
+        new_day = parse_date_ordinal(new.get(self.field)) if new is not None else None
+        if old_day == new_day:
+            return
+        if old_day is not None:
+            del self._entries[bisect_left(self._entries, (old_day, old[self.key_field]))]
+        if new_day is not None:
+            insort(self._entries, (new_day, new[self.key_field]))
+
+    def count_until(self, day):
+        """Number of records whose date is on or before day"""
+        return bisect_left(self._entries, (day.toordinal() + 1,))
+
+    def between(self, start, end):
+        """(date ordinal, key) for records dated from start to end inclusive, earliest first"""
+        lo = 0 if start is None else bisect_left(self._entries, (start.toordinal(),))
+        return self._entries[lo:bisect_left(self._entries, (end.toordinal() + 1,))]
+
+
+class AggregateCube:
+    """Record counts for every combination of grouping dimensions, kept current by store events
+
+    dimensions maps each dimension name to a function extracting its value from a record.
+    All 2**n group-bys are maintained (2**n dict updates per mutation), so any breakdown is
+    read from its precomputed cuboid instead of scanning the store.
+    """
+
+    def __init__(self, store, dimensions):
+        self.dimensions = dict(dimensions)
+        self.reset()
+        store.subscribe(self.on_change, self.reset)
+
+    def reset(self):
+        names = tuple(self.dimensions)
+        self._cuboids = {combo: {} for size in range(len(names) + 1)
+                         for combo in itertools.combinations(names, size)}
+
+    def _apply(self, record, delta):
+        values = {name: extract(record) for name, extract in self.dimensions.items()}
+        for combo, counts in self._cuboids.items():
+            key = tuple(values[name] for name in combo)
+            count = counts.get(key, 0) + delta
+            if count:
+                counts[key] = count
+            else:
+                del counts[key]
+
+    def on_change(self, old, new):
+        if old is not None:
+            self._apply(old, -1)
+        if new is not None:
+            self._apply(new, 1)
+
+    def group_by(self, dimensions, filters=None):
+        """{values: count} grouped by dimensions, in the order given, counting only records matching filters"""
+        filters = filters or {}
+        combo = tuple(name for name in self.dimensions if name in dimensions or name in filters)
+        groups = {}
+        for key, count in self._cuboids[combo].items():
+            row = dict(zip(combo, key))
+            if all(row[name] == value for name, value in filters.items()):
+                group = tuple(row[name] for name in dimensions)
+                groups[group] = groups.get(group, 0) + count
+        return groups
+
+
+class SearchIndex:
+    """Inverted index over tokenized record fields, with prefix matching for type-ahead
+
+    Each document is (kind, key) with a weight per field. Postings map a token to
+    {document: weight}, and the vocabulary is kept sorted so the last query token can
+    match as a prefix with two bisects. Results score by field weight times inverse
+    document frequency, every query token must match, and the top k are returned.
+    Kinds registered with a capacity keep only their most recent documents.
+    """
+
+    TOKEN_RE = re.compile(r"[a-z0-9]+")
+    MAX_PREFIX_EXPANSIONS = 50
+
+    def __init__(self):
+        self.fields = {}     # kind -> {field: weight}
+        self.stores = {}     # kind -> store followed by track()
+        self.records = {}    # (kind, key) -> record
+        self._postings = {}  # token -> {(kind, key): weight}
+        self._doc_tokens = {}
+        self._vocabulary = []
+        self._capped = {}    # kind -> (capacity, deque of keys)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def tokenize(cls, text):
+        return cls.TOKEN_RE.findall(str(text).lower())
+
+    def track(self, kind, store, fields):
+        """Index the given {field: weight} of every record in store and follow its mutations"""
+        self.fields[kind] = fields
+        self.stores[kind] = store
+        def on_change(old, new):
+            if new is None:
+                self.remove(kind, old[store.key_field])
+            else:
+                self.add(kind, new[store.key_field], new)
+        store.subscribe(on_change, lambda: self.clear(kind))
+
+    def refresh(self, kinds=None):
+        """Re-index tracked kinds (all, or those in kinds) written to by other processes"""
+        for kind, store in self.stores.items():
+            if kinds is None or kind in kinds:
+                store.refresh()
+
+    def register(self, kind, fields, capacity=None):
+        """Declare a kind added to directly, optionally keeping only its latest capacity documents"""
+        self.fields[kind] = fields
+        if capacity is not None:
+            self._capped[kind] = (capacity, deque())
+
+    def add(self, kind, key, record):
+        """Index or re-index one document"""
+        weights = {}
+        for field, weight in self.fields[kind].items():
+            if record.get(field) is not None:
+                for token in self.tokenize(record[field]):
+                    weights[token] = weights.get(token, 0) + weight
+        doc = (kind, key)
+        with self._lock:
+            if doc in self.records:
+                self._unlink(doc)
+            elif kind in self._capped:
+                capacity, keys = self._capped[kind]
+                keys.append(key)
+                if len(keys) > capacity:
+                    self.remove(kind, keys.popleft())
+            self.records[doc] = record
+            self._doc_tokens[doc] = weights
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    insort(self._vocabulary, token)
+                postings[doc] = weight
+
+    def remove(self, kind, key):
+        doc = (kind, key)
+        with self._lock:
+            if doc in self.records:
+                self._unlink(doc)
+                del self.records[doc]
+
+    def clear(self, kind):
+        with self._lock:
+            for doc in [doc for doc in self.records if doc[0] == kind]:
+                self.remove(*doc)
+            if kind in self._capped:
+                self._capped[kind][1].clear()
+
+    def _unlink(self, doc):
+        for token in self._doc_tokens.pop(doc):
+            postings = self._postings[token]
+            del postings[doc]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _expand(self, prefix):
+        lo = bisect_left(self._vocabulary, prefix)
+        hi = bisect_left(self._vocabulary, prefix + "\uffff", lo)
+        return self._vocabulary[lo:min(hi, lo + self.MAX_PREFIX_EXPANSIONS)]
+
+    def search(self, query, limit=10, kinds=None, visible=None):
+        """Top (score, kind, key, record) matching every token of query, the last one as a prefix"""
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            total = len(self.records) or 1
+            # Per query token: (postings, idf, exactness) for each vocabulary term it matches
+            terms = []
+            for position, token in enumerate(tokens):
+                expansions = self._expand(token) if position == len(tokens) - 1 else [token]
+                matches = [(self._postings[term], math.log(1 + total / len(self._postings[term])),
+                            1.0 if term == token else 0.8)
+                           for term in expansions if term in self._postings]
+                if not matches:
+                    return []
+                terms.append(matches)
+            # Candidates come from the rarest token; the others are only probed, never scanned
+            terms.sort(key=lambda matches: sum(len(postings) for postings, _, _ in matches))
+
+            def score(doc):
+                total_score = 0
+                for matches in terms:
+                    best = max((postings[doc] * idf * exact for postings, idf, exact in matches if doc in postings),
+                               default=None)
+                    if best is None:
+                        return None
+                    total_score += best
+                return total_score
+
+            seen = set()
+            candidates = []
+            for postings, _, _ in terms[0]:
+                for doc in postings:
+                    if doc in seen or (kinds is not None and doc[0] not in kinds):
+                        continue
+                    seen.add(doc)
+                    if visible is not None and not visible(doc[0], self.records[doc]):
+                        continue
+                    doc_score = score(doc)
+                    if doc_score is not None:
+                        candidates.append((doc_score, doc))
+            top = heapq.nlargest(limit, candidates, key=lambda item: item[0])
+            return [(round(doc_score, 4), doc[0], doc[1], self.records[doc]) for doc_score, doc in top]
+
+
+class ExpiryScheduler:
+    """Notifies once per threshold as tracked records approach their expiry date
+
+    Pending notifications sit in a min-heap keyed by the day they fall due (expiry date
+    minus threshold), so tick() only pops what is due and the background thread sleeps
+    until the earliest one. Changing or removing a date leaves stale heap entries that
+    are skipped when popped. A record first seen inside several thresholds is notified
+    once, at the tightest.
+
+    With a notices store (keyed by "id", with a version_field), the tightest threshold
+    sent for each record and expiry date is kept there, so a restart does not send the
+    same notices again. Each notice is claimed there with a conditional write before it
+    is sent, so when several worker processes share the store only one of them sends it.
+    """
+
+    def __init__(self, thresholds=(90, 30, 7, 0), notify=None, notices=None):
+        self.thresholds = sorted(thresholds, reverse=True)
+        self.notify = notify
+        self.notices = notices
+        self._heap = []      # (due ordinal, expiry ordinal, kind, key)
+        self._expiry = {}    # (kind, key) -> expiry ordinal
+        self._notified = {}  # (kind, key) -> tightest threshold already notified
+        # (kind, key) -> (expiry ordinal, threshold) sent before a restart, claimed by track()
+        self._sent_before = {(n["kind"], n["key"]): (parse_date_ordinal(n["expiryDate"]), n["threshold"])
+                             for n in (notices if notices is not None else ())}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def track(self, kind, store, field):
+        """Schedule notifications for the YYYY-MM-DD field of every record in store"""
+        def on_change(old, new):
+            record = new if new is not None else old
+            item = (kind, record[store.key_field])
+            day = parse_date_ordinal(new.get(field)) if new is not None else None
+            with self._lock:
+                if self._expiry.get(item) == day:
+                    return
+                forget = self._notified.pop(item, None) is not None
+                sent_before = self._sent_before.pop(item, None)
+                if sent_before is not None and sent_before[0] == day:
+                    self._notified[item] = sent_before[1]
+                else:
+                    forget = forget or sent_before is not None
+                if day is not None:
+                    self._expiry[item] = day
+                    for threshold in self.thresholds:
+                        heapq.heappush(self._heap, (day - threshold, day, kind, item[1]))
+                else:
+                    self._expiry.pop(item, None)
+            if forget and self.notices is not None:
+                self._forget(kind, item[1])
+            if day is not None:
+                self._wake.set()
+        # A replay after external writes re-sends unchanged dates, which on_change ignores,
+        # so notification state survives it and nothing needs resetting
+        store.subscribe(on_change, lambda: None)
+
+    def tick(self, today=None):
+        """Send every notification due by today; returns them"""
+        today = (today or datetime.now().date()).toordinal()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= today:
+                _, day, kind, key = heapq.heappop(self._heap)
+                item = (kind, key)
+                if self._expiry.get(item) != day:
+                    continue
+                days_left = day - today
+                threshold = min(t for t in self.thresholds if t >= days_left)
+                if threshold >= self._notified.get(item, float("inf")):
+                    continue
+                self._notified[item] = threshold
+                due.append({"kind": kind, "id": key, "expiryDate": datetime.fromordinal(day).strftime("%Y-%m-%d"),
+                            "daysLeft": days_left, "threshold": threshold})
+        if self.notices is not None:
+            due = [notice for notice in due if self._claim(notice)]
+        if self.notify is not None:
+            for notice in due:
+                self.notify(notice)
+        return due
+
+    def _claim(self, notice):
+        """Record notice as sent unless another process already sent it or a tighter one"""
+        key = f"{notice['kind']}:{notice['id']}"
+        row = {"id": key, "kind": notice["kind"], "key": notice["id"], "expiryDate": notice["expiryDate"],
+               "threshold": notice["threshold"]}
+        while True:
+            current = self.notices.get(key)
+            try:
+                if current is None:
+                    self.notices.insert(row)
+                    return True
+                if current["expiryDate"] == row["expiryDate"] and current["threshold"] <= row["threshold"]:
+                    return False
+                self.notices.update(key, row, expected_version=current.get(self.notices.version_field, 0))
+                return True
+            except (KeyError, VersionConflict):
+                continue  # another process wrote or removed the notice first: look again
+
+    def _forget(self, kind, key):
+        try:
+            self.notices.delete(f"{kind}:{key}")
+        except KeyError:
+            pass
+
+    def next_due(self):
+        """Ordinal of the earliest pending notification, or None"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="iims-expiry")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.tick()
+            except Exception:
+                app.logger.exception("Expiry notification failed")
+            next_due = self.next_due()
+            # Sleep until the next notification falls due (at most a day), or until a date changes
+            midnight = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+            wake_at = max(datetime.fromordinal(next_due), midnight) if next_due is not None else midnight
+            self._wake.wait(min((wake_at - datetime.now()).total_seconds(), 86400))
+
+# ==================== BACKGROUND JOBS ====================
+
+class BackgroundJob:
+    """A unit of work run by JobRunner, with progress, results and cooperative cancellation"""
+
+    def __init__(self, kind, owner):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = "queued"
+        self.total = 0
+        self.done = 0
+        self.results = []
+        self.error = None
+        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def advance(self, result):
+        self.results.append(result)
+        self.done += 1
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "jobId": self.id, "kind": self.kind, "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "results": list(self.results), "error": self.error,
+            "createdAt": self.created_at, "finishedAt": self.finished_at
+        }
+
+
+class JobRunner:
+    """Bounded thread pool for long-running jobs, keeping the most recent jobs for polling
+
+    submit() refuses new work once max_active jobs are queued or running, so a burst of
+    requests cannot pile up unbounded work.
+    """
+
+    def __init__(self, max_workers=2, max_active=8, history=100):
+        self.max_active = max_active
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iims-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def active(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, kind, owner, work):
+        """Queue work(job) and return the job; raises RuntimeError when the runner is full"""
+        job = BackgroundJob(kind, owner)
+        with self._lock:
+            if self.active() >= self.max_active:
+                raise RuntimeError("Too many background jobs in progress")
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, old in self._jobs.items() if old.finished]
+            for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+                del self._jobs[job_id]
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        try:
+            if not job.cancelled:
+                job.status = "running"
+                work(job)
+            job.status = "cancelled" if job.cancelled else "succeeded"
+        except Exception as e:
+            app.logger.exception("Background job %s failed", job.id)
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            job._finished.set()
+
+
+# ==================== INTEGRATIONS ====================
+
+class IntegrationProber:
+    """Background health checks for external integrations, cached in the status dict
+
+    Each configured target is polled over HTTP with a timeout, all due targets at once
+    on a thread pool. A failure schedules the next attempt with exponential backoff;
+    after failure_threshold consecutive failures the target's circuit opens and it is
+    reported Inactive, with only an occasional half-open probe until one succeeds.
+    Targets without a URL keep whatever status they were seeded with.
+    """
+
+    def __init__(self, status, urls, interval=60, timeout=5, failure_threshold=3, max_backoff=900,
+                 max_workers=4, clock=time.time):
+        self.status = status
+        self.urls = {key: url for key, url in urls.items() if url and key in status}
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.version = 0
+        self._state = {key: {"failures": 0, "circuit": "closed", "nextCheck": 0} for key in self.urls}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iims-probe")
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def probe(self, url):
+        """Return (healthy, latency in ms, error message or None) for one target"""
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                healthy, error = response.status < 400, None
+        except urllib.error.HTTPError as e:
+            healthy, error = False, f"HTTP {e.code}"
+        except (urllib.error.URLError, OSError) as e:
+            healthy, error = False, str(getattr(e, "reason", e))
+        return healthy, round((time.perf_counter() - start) * 1000, 1), error
+
+    def run_once(self):
+        """Probe every target whose next check is due; returns the keys probed"""
+        now = self.clock()
+        due = [key for key, state in self._state.items() if state["nextCheck"] <= now]
+        futures = {key: self._executor.submit(self.probe, self.urls[key]) for key in due}
+        for key, future in futures.items():
+            self._record(key, *future.result())
+        return due
+
+    def _record(self, key, healthy, latency, error):
+        now = self.clock()
+        with self._lock:
+            state = self._state[key]
+            if healthy:
+                state.update(failures=0, circuit="closed", nextCheck=now + self.interval)
+                status = "Active"
+            else:
+                state["failures"] += 1
+                backoff = min(self.interval * 2 ** (state["failures"] - 1), self.max_backoff)
+                state["nextCheck"] = now + backoff
+                if state["failures"] >= self.failure_threshold:
+                    state["circuit"] = "open"
+                status = "Inactive" if state["circuit"] == "open" else "Degraded"
+            self.status[key].update({
+                "status": status,
+                "lastCheck": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+                "latencyMs": latency,
+                "error": error,
+                "consecutiveFailures": state["failures"],
+                "circuit": state["circuit"]
+            })
+            self.version += 1
+
+    def snapshot(self):
+        """Copy of the status dict that is safe to serialize while probes update it"""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self.status.items()}
+
+    def start(self):
+        """Run probes from a daemon thread, waking when the earliest target is due"""
+        if self._thread is None and self.urls:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="iims-prober")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                app.logger.exception("Integration probe failed")
+            next_due = min(state["nextCheck"] for state in self._state.values())
+            time.sleep(min(max(next_due - self.clock(), 1), self.interval))
+
+
+# ==================== ALERTING ====================
+
+RULE_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq}
+
+class AlertRules:
+    """Threshold rules for one monitoring table, with per-device-class overrides
+
+    Each rule is {"name", "field", "op", "threshold", "classes": {deviceClass: threshold}};
+    booleans compare as 0/1. A device is in alert when any of its rules match.
+
+    matches() checks a single record. evaluate() checks every device at once for the
+    dashboard counters: the rule fields are mirrored into array('d') columns kept
+    current by store events, so a batch pass is one comparison per rule over a column,
+    vectorized with NumPy when it is installed, and is only redone after a mutation.
+    """
+
+    def __init__(self, store, rules, class_field="deviceClass"):
+        for rule in rules:
+            if rule["op"] not in RULE_OPS:
+                raise ValueError(f"Unknown operator {rule['op']!r} in rule {rule['name']}")
+            if rule.get("hysteresis", 0) < 0:
+                raise ValueError(f"Negative hysteresis in rule {rule['name']}")
+        self.store = store
+        self.class_field = class_field
+        self.rules = [dict(rule, classes=dict(rule.get("classes", {}))) for rule in rules]
+        self._fields = sorted({rule["field"] for rule in self.rules})
+        self._cached = (None, None)
+        # Columns are written by the store's listener dispatch and read by request threads
+        self._lock = threading.Lock()
+        self.reset()
+        store.subscribe(self.on_change, self.reset)
+
+    def threshold(self, rule, device_class):
+        return rule["classes"].get(device_class, rule["threshold"])
+
+    def breaches(self, rule, value, device_class):
+        return RULE_OPS[rule["op"]](value, self.threshold(rule, device_class))
+
+    def clears(self, rule, value, device_class):
+        """Whether value is back past the rule's hysteresis band, e.g. <= 80 for "> 85" with a band of 5"""
+        band = rule.get("hysteresis", 0)
+        if rule["op"] in (">", ">="):
+            band = -band
+        elif rule["op"] == "==":
+            band = 0
+        return not RULE_OPS[rule["op"]](value, self.threshold(rule, device_class) + band)
+
+    def matches(self, record):
+        """Names of the rules record breaches"""
+        device_class = record.get(self.class_field)
+        return [rule["name"] for rule in self.rules
+                if self.breaches(rule, record.get(rule["field"]) or 0, device_class)]
+
+    def reset(self):
+        with self._lock:
+            self._keys = []
+            self._positions = {}
+            self._columns = {field: array('d') for field in self._fields}
+            # Per-device thresholds, only for rules with class overrides
+            self._limits = {rule["name"]: array('d') for rule in self.rules if rule["classes"]}
+            self._cached = (None, None)
+
+    def _row(self, record):
+        device_class = record.get(self.class_field)
+        return ([record.get(field) or 0 for field in self._fields],
+                [self.threshold(rule, device_class) for rule in self.rules if rule["classes"]])
+
+    def on_change(self, old, new):
+        with self._lock:
+            self._apply(old, new)
+            self._cached = (None, None)
+
+    def _apply(self, old, new):
+        key_field = self.store.key_field
+        if new is None:
+            # Swap the last row into the deleted slot so the columns stay dense
+            position = self._positions.pop(old[key_field])
+            last_key = self._keys.pop()
+            for column in (*self._columns.values(), *self._limits.values()):
+                last = column.pop()
+                if position < len(column):
+                    column[position] = last
+            if position < len(self._keys):
+                self._keys[position] = last_key
+                self._positions[last_key] = position
+            return
+        values, limits = self._row(new)
+        position = self._positions.get(new[key_field])
+        if position is None:
+            self._positions[new[key_field]] = len(self._keys)
+            self._keys.append(new[key_field])
+            for column, value in zip((*self._columns.values(), *self._limits.values()), (*values, *limits)):
+                column.append(value)
+        else:
+            for column, value in zip((*self._columns.values(), *self._limits.values()), (*values, *limits)):
+                column[position] = value
+
+    def evaluate(self):
+        """{key: [rule names]} for every device in alert, recomputed once per store version"""
+        with self._lock:
+            version, alerts = self._cached
+            if version != self.store.version or alerts is None:
+                version = self.store.version
+                alerts = self._evaluate_columns()
+                self._cached = (version, alerts)
+            return alerts
+
+    def _evaluate_columns(self):
+        fired = {}
+        for rule in self.rules:
+            op = RULE_OPS[rule["op"]]
+            column = self._columns[rule["field"]]
+            limits = self._limits.get(rule["name"])
+            if numpy is not None:
+                values = numpy.frombuffer(column, dtype=numpy.float64) if column else numpy.empty(0)
+                if limits is not None:
+                    bounds = numpy.frombuffer(limits, dtype=numpy.float64) if limits else numpy.empty(0)
+                else:
+                    bounds = float(rule["threshold"])
+                hits = numpy.flatnonzero(op(values, bounds)).tolist()
+            elif limits is not None:
+                hits = [i for i, (value, bound) in enumerate(zip(column, limits)) if op(value, bound)]
+            else:
+                hits = [i for i, value in enumerate(column) if op(value, rule["threshold"])]
+            for i in hits:
+                fired.setdefault(i, []).append(rule["name"])
+        return {self._keys[i]: fired[i] for i in sorted(fired)}
+
+
+class AlertTracker:
+    """Alert lifecycle per (device, rule), maintained incrementally from store events
+
+    An alert opens when its rule is breached and resolves only once the value is back
+    past the rule's hysteresis band, so a device hovering at a threshold does not flap.
+    A breach within suppressSeconds of resolving reopens the same alert instead of
+    raising a new one. Staff can acknowledge open alerts. Resolved alerts are kept for
+    retention seconds. Every transition is published on the "alerts" event topic.
+    """
+
+    _id_sequence = itertools.count(1)
+
+    def __init__(self, kind, rules, suppress_seconds=300, retention=86400, clock=time.time, bus=None):
+        self.kind = kind
+        self.rules = rules
+        self.suppress_seconds = suppress_seconds
+        self.retention = retention
+        self.clock = clock
+        self.bus = bus
+        self.version = 0
+        self._alerts = {}    # (deviceId, rule name) -> alert
+        self._ids = {}       # alert id -> (deviceId, rule name)
+        self._resolved = {}  # (deviceId, rule name) -> resolve time, for suppression and pruning
+        self._lock = threading.Lock()
+        rules.store.subscribe(self.on_change, self.reset)
+
+    def __contains__(self, alert_id):
+        return alert_id in self._ids
+
+    def reset(self):
+        """Before a store replay: resolve the alerts of devices no longer in the store
+
+        Replayed records are then diffed against the remaining alerts as usual.
+        """
+        store = self.rules.store
+        now = self.clock()
+        with self._lock:
+            transitions = [self._resolve(key, alert, now) for key, alert in self._alerts.items()
+                           if alert["state"] != "resolved" and store.get(key[0]) is None]
+            self.version += len(transitions)
+        self._publish(transitions)
+
+    def _stamp(self, now):
+        return datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+
+    def on_change(self, old, new):
+        record = new if new is not None else old
+        device_id = record[self.rules.store.key_field]
+        device_class = record.get(self.rules.class_field)
+        now = self.clock()
+        transitions = []
+        with self._lock:
+            for rule in self.rules.rules:
+                key = (device_id, rule["name"])
+                alert = self._alerts.get(key)
+                active = alert is not None and alert["state"] != "resolved"
+                if new is None:
+                    if active:
+                        transitions.append(self._resolve(key, alert, now))
+                    continue
+                value = new.get(rule["field"]) or 0
+                if not active and self.rules.breaches(rule, value, device_class):
+                    suppress = rule.get("suppressSeconds", self.suppress_seconds)
+                    if alert is not None and now - self._resolved.pop(key) < suppress:
+                        alert.update(state="open", resolvedAt=None, acknowledgedAt=None, acknowledgedBy=None,
+                                     occurrences=alert["occurrences"] + 1, value=value)
+                        transitions.append(("reopened", dict(alert)))
+                    else:
+                        if alert is not None:
+                            del self._ids[alert["id"]]
+                            self._resolved.pop(key, None)
+                        alert = self._alerts[key] = {
+                            "id": f"ALR-{next(self._id_sequence):06d}", "kind": self.kind, "deviceId": device_id,
+                            "rule": rule["name"], "state": "open", "value": value, "openedAt": self._stamp(now),
+                            "acknowledgedAt": None, "acknowledgedBy": None, "resolvedAt": None, "occurrences": 1
+                        }
+                        self._ids[alert["id"]] = key
+                        transitions.append(("opened", dict(alert)))
+                elif active and self.rules.clears(rule, value, device_class):
+                    alert["value"] = value
+                    transitions.append(self._resolve(key, alert, now))
+                elif active and alert["value"] != value:
+                    alert["value"] = value
+                    self.version += 1
+            self.version += len(transitions)
+        self._publish(transitions)
+
+    def _resolve(self, key, alert, now):
+        alert.update(state="resolved", resolvedAt=self._stamp(now))
+        self._resolved[key] = now
+        return ("resolved", dict(alert))
+
+    def _publish(self, transitions):
+        if self.bus is not None:
+            for op, alert in transitions:
+                self.bus.publish("alerts", {"op": op, "alert": alert})
+
+    def acknowledge(self, alert_id, user):
+        """Mark an open alert acknowledged; raises KeyError if unknown, ValueError if not open"""
+        with self._lock:
+            alert = self._alerts[self._ids[alert_id]]
+            if alert["state"] != "open":
+                raise ValueError(f"Alert {alert_id} is {alert['state']}")
+            alert.update(state="acknowledged", acknowledgedAt=self._stamp(self.clock()), acknowledgedBy=user)
+            self.version += 1
+            snapshot = dict(alert)
+        self._publish([("acknowledged", snapshot)])
+        return snapshot
+
+    def alerts(self, states=("open", "acknowledged")):
+        """Current alerts in the given states, oldest first; prunes expired resolved alerts"""
+        with self._lock:
+            cutoff = self.clock() - self.retention
+            for key in [key for key, resolved_at in self._resolved.items() if resolved_at < cutoff]:
+                del self._ids[self._alerts.pop(key)["id"]]
+                del self._resolved[key]
+            return sorted((dict(alert) for alert in self._alerts.values() if alert["state"] in states),
+                          key=lambda alert: alert["id"])
+
+
+class EwmaDetector:
+    """Streaming anomaly detector keeping an exponentially weighted mean and variance per device
+
+    A value is anomalous when it lies more than threshold standard deviations from the
+    device's running mean, once warmup samples have been seen. Each device costs three
+    floats and each sample O(1) work, whatever the length of its history. Ingest requests
+    observe from several threads, so each update of a device's state runs under a lock.
+    """
+
+    def __init__(self, alpha=0.05, threshold=4.0, warmup=20):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self._state = {}  # device -> [mean, variance, samples seen (capped at warmup)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._state)
+
+    def observe(self, device, value):
+        """Fold value into the device's statistics; returns whether it was anomalous"""
+        with self._lock:
+            state = self._state.get(device)
+            if state is None:
+                self._state[device] = [value, 0.0, 1]
+                return False
+            mean, variance, seen = state
+            diff = value - mean
+            anomalous = seen >= self.warmup and diff * diff > self.threshold * self.threshold * variance > 0
+            increment = self.alpha * diff
+            state[0] = mean + increment
+            state[1] = (1 - self.alpha) * (variance + diff * increment)
+            if seen < self.warmup:
+                state[2] = seen + 1
+            return anomalous
+
+
+def load_alert_rules(path):
+    """Rules per monitoring kind: the defaults, replaced by any kinds present in the JSON file at path"""
+    rules = {
+        "hardware": [
+            {"name": "highCpuLoad", "field": "cpuLoad", "op": ">", "threshold": 85, "hysteresis": 5},
+            {"name": "overheating", "field": "isOverheating", "op": "==", "threshold": True}
+        ],
+        "network": [
+            {"name": "downtime", "field": "isDowntime", "op": "==", "threshold": True},
+            {"name": "abnormalTraffic", "field": "abnormalTraffic", "op": "==", "threshold": True}
+        ]
+    }
+    if path:
+        with open(path) as f:
+            rules.update(json.load(f))
+    return rules
+
 
 # ==================== DATA MODELS (In-Memory Databases) ====================
 
+# Storage engine: "memory" (default, used by tests) or "sqlite" to persist all tables
+# in IIMS_SQLITE_PATH and share them between worker processes
+STORAGE_ENGINE = os.environ.get("IIMS_STORAGE", "memory")
+SQLITE_DB = SQLiteDatabase(os.environ.get("IIMS_SQLITE_PATH", "iims.db")) if STORAGE_ENGINE == "sqlite" else None
+# "wal" keeps the in-memory tables but logs every mutation to IIMS_WAL_DIR, compacts the
+# log into a snapshot every IIMS_WAL_COMPACT_ENTRIES entries and recovers from both on start
+JOURNAL = StoreJournal(os.environ.get("IIMS_WAL_DIR", "iims-data"),
+                       compact_every=int(os.environ.get("IIMS_WAL_COMPACT_ENTRIES", 100000)),
+                       sync_interval=int(os.environ.get("IIMS_WAL_SYNC_MS", 1000)) / 1000
+                       ) if STORAGE_ENGINE == "wal" else None
+
+class AssetRecord(CompactRecord):
+    __slots__ = FIELDS = ("assetId", "assetType", "assignedUser", "purchaseDate", "warrantyExpiryDate",
+                          "status", "department", "version")
+    DATE_FIELDS = ("purchaseDate", "warrantyExpiryDate")
+    ENUM_FIELDS = ("assetType", "status", "department")
+
+
+class LicenseRecord(CompactRecord):
+    __slots__ = FIELDS = ("licenseId", "softwareName", "licenseKey", "totalSeats", "usedSeats", "expiryDate",
+                          "complianceStatus", "version")
+    DATE_FIELDS = ("expiryDate",)
+    ENUM_FIELDS = ("softwareName", "complianceStatus")
+
+
+class HealthRecord(CompactRecord):
+    __slots__ = FIELDS = ("deviceId", "cpuLoad", "memoryUtil", "isOverheating", "lastCheck", "deviceClass")
+    TIMESTAMP_FIELDS = ("lastCheck",)
+    ENUM_FIELDS = ("deviceClass",)
+
+
+class BackupRecord(CompactRecord):
+    __slots__ = FIELDS = ("jobId", "assetId", "lastRunDate", "status", "alertReason")
+    TIMESTAMP_FIELDS = ("lastRunDate",)
+    ENUM_FIELDS = ("status", "alertReason")
+
+
+class NetworkRecord(CompactRecord):
+    __slots__ = FIELDS = ("deviceId", "bandwidthMB", "isDowntime", "abnormalTraffic", "deviceClass")
+    ENUM_FIELDS = ("deviceClass",)
+
+
+# Records of tables edited through the API carry this optimistic-concurrency version
+RECORD_VERSION_FIELD = "version"
+
+def make_store(table, key_field, records=(), indexes=(), record_type=None, version_field=None):
+    """Create a table on the configured storage engine; in memory, rows are stored as record_type"""
+    if SQLITE_DB is not None:
+        return SQLiteStore(SQLITE_DB, table, key_field, records, indexes, version_field)
+    if JOURNAL is not None:
+        store = KeyedStore(key_field, JOURNAL.restored(table, records), indexes, record_type, version_field)
+        JOURNAL.attach(table, store)
+        return store
+    return KeyedStore(key_field, records, indexes, record_type, version_field)
+
 # ASSET_DB (ITM-F-001) - Includes department field for analytics
-ASSET_DB = [
+ASSET_DB = make_store("assets", "assetId", [
     {
         "assetId": "AST-001",
         "assetType": "Laptop",
@@ -74,10 +2734,10 @@ ASSET_DB = [
         "status": "Active",
         "department": "Finance"
     }
-]
+], indexes=("assignedUser", "department", "status"), record_type=AssetRecord, version_field=RECORD_VERSION_FIELD)
 
 # LICENSE_DB (ITM-F-010, F-012) - Includes complianceStatus, one entry flagged as 'Unauthorized'
-LICENSE_DB = [
+LICENSE_DB = make_store("licenses", "licenseId", [
     {
         "licenseId": "LIC-001",
         "softwareName": "Microsoft Office 365",
@@ -123,10 +2783,10 @@ LICENSE_DB = [
         "expiryDate": "2025-06-30",
         "complianceStatus": "Compliant"
     }
-]
+], record_type=LicenseRecord, version_field=RECORD_VERSION_FIELD)
 
 # HEALTH_DB (ITM-F-020) - At least 2 entries must breach threshold (cpuLoad > 85% or isOverheating: True)
-HEALTH_DB = [
+HEALTH_DB = make_store("hardware_health", "deviceId", [
     {
         "deviceId": "DEV-001",
         "cpuLoad": 92,
@@ -169,10 +2829,10 @@ HEALTH_DB = [
         "isOverheating": True,
         "lastCheck": (datetime.now() - timedelta(minutes=4)).strftime("%Y-%m-%d %H:%M:%S")
     }
-]
+], record_type=HealthRecord)
 
 # BACKUP_DB (ITM-F-040) - At least 2 entries must be 'Failure' or 'Missed'
-BACKUP_DB = [
+BACKUP_DB = make_store("backup_jobs", "jobId", [
     {
         "jobId": "BK-001",
         "assetId": "AST-001",
@@ -215,10 +2875,10 @@ BACKUP_DB = [
         "status": "Failure",
         "alertReason": "Network timeout"
     }
-]
+], indexes=("status",), record_type=BackupRecord)
 
 # NETWORK_DB (ITM-F-030) - At least 2 entries must be flagged (isDowntime: True or abnormalTraffic: True)
-NETWORK_DB = [
+NETWORK_DB = make_store("network_usage", "deviceId", [
     {
         "deviceId": "NET-001",
         "bandwidthMB": 450,
@@ -255,10 +2915,21 @@ NETWORK_DB = [
         "isDowntime": False,
         "abnormalTraffic": True
     }
-]
+], record_type=NetworkRecord)
+
+# Expiry notices already sent, per record and expiry date, so restarts do not repeat them
+EXPIRY_NOTICE_DB = make_store("expiry_notices", "id", version_field="version")
 
-# AUDIT_LOG_DB (ITM-SR-004)
-AUDIT_LOG_DB = []
+# AUDIT_LOG_DB (ITM-SR-004) - Bounded ring buffer; set IIMS_AUDIT_DIR to keep the full history on disk
+AUDIT_LOG_DB = SQLiteAuditLog(SQLITE_DB) if SQLITE_DB is not None else AuditLog(
+    capacity=int(os.environ.get("IIMS_AUDIT_CAPACITY", 10000)),
+    segment_dir=os.environ.get("IIMS_AUDIT_DIR")
+)
+if JOURNAL is not None:
+    # Audit segments recover themselves; otherwise the journal persists the audit log too
+    if not AUDIT_LOG_DB.segment_dir:
+        JOURNAL.attach_audit(AUDIT_LOG_DB)
+    JOURNAL.start()
 
 # External Integration Status (ITM-F-041)
 INTEGRATION_STATUS = {
@@ -268,6 +2939,144 @@ INTEGRATION_STATUS = {
     "monitoringService": {"name": "Monitoring Service", "status": "Active", "lastCheck": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 }
 
+# Dashboard counters, maintained incrementally on every store mutation
+LICENSE_EXPIRY_INDEX = SortedDateIndex(LICENSE_DB, "expiryDate")
+WARRANTY_EXPIRY_INDEX = SortedDateIndex(ASSET_DB, "warrantyExpiryDate")
+# Full-text search for /api/search; audit entries are indexed by add_audit_log, and only
+# the most recent IIMS_AUDIT_CAPACITY of them are kept searchable
+SEARCH_INDEX = SearchIndex()
+SEARCH_INDEX.track("asset", ASSET_DB, {"assetId": 3, "assignedUser": 2, "assetType": 1, "department": 1,
+                                       "status": 1})
+SEARCH_INDEX.track("license", LICENSE_DB, {"licenseId": 3, "softwareName": 2, "complianceStatus": 1})
+SEARCH_INDEX.register("audit", {"details": 2, "action": 1, "userRole": 1},
+                      capacity=int(os.environ.get("IIMS_AUDIT_CAPACITY", 10000)))
+_audit_search_ids = itertools.count(1)
+MAX_SEARCH_RESULTS = 100
+
+# Asset counts by every combination of these dimensions, for /api/analytics/assets
+ASSET_CUBE = AggregateCube(ASSET_DB, {
+    "department": lambda asset: asset.get("department"),
+    "assetType": lambda asset: asset.get("assetType"),
+    "status": lambda asset: asset.get("status"),
+    "purchaseYear": lambda asset: (asset.get("purchaseDate") or "")[:4] or None
+})
+# Alert thresholds per monitoring table; IIMS_ALERT_RULES points to a JSON file of
+# {"hardware": [rules], "network": [rules]} that replaces the defaults per kind. Their
+# batch evaluate() gives the dashboard's alert counts; AlertTracker follows single records
+_rule_config = load_alert_rules(os.environ.get("IIMS_ALERT_RULES"))
+ALERT_RULES = {"hardware": AlertRules(HEALTH_DB, _rule_config["hardware"]),
+               "network": AlertRules(NETWORK_DB, _rule_config["network"])}
+BACKUP_FAILURE_COUNTER = PredicateCounter(BACKUP_DB, lambda job: job["status"] in ["Failure", "Missed"])
+
+# Push channel for /api/events: store mutations publish diffs to their topic, and any
+# change to the dashboard counters publishes the new metrics on "dashboard"
+EVENT_BUS = EventBus()
+EVENT_TOPICS = {"assets": ASSET_DB, "licenses": LICENSE_DB, "hardware": HEALTH_DB,
+                "backup": BACKUP_DB, "network": NETWORK_DB}
+# Per-record JSON encodings behind the store-backed list endpoints
+JSON_CACHES = {topic: EncodedRecordCache(store) for topic, store in EVENT_TOPICS.items()}
+# Topics published from derived state rather than a single store
+EVENT_DERIVED_TOPICS = {"dashboard", "alerts", "expirations"}
+SSE_HEARTBEAT_SECONDS = 15
+# Dashboard metrics are recomputed at most this often while stores change, off the write path
+DASHBOARD_PUBLISHER = DebouncedPublisher(EVENT_BUS, "dashboard", lambda: calculate_dashboard_metrics(),
+                                         interval=int(os.environ.get("IIMS_DASHBOARD_PUBLISH_MS", 250)) / 1000)
+
+def _publish_store_changes(topic, store):
+    def listener(old, new):
+        if EVENT_BUS.has_subscribers(topic):
+            EVENT_BUS.publish(topic, store_change_event(store.key_field, old, new))
+        DASHBOARD_PUBLISHER.mark()
+    store.subscribe(listener)
+
+for _topic, _store in EVENT_TOPICS.items():
+    _publish_store_changes(_topic, _store)
+
+# Expiry notifications 90, 30 and 7 days ahead and on the day, for licenses and asset
+# warranties; each one is audited and published on the "expirations" event topic
+EXPIRY_SOURCES = {
+    "license": (LICENSE_DB, LICENSE_EXPIRY_INDEX, "softwareName"),
+    "warranty": (ASSET_DB, WARRANTY_EXPIRY_INDEX, "assetType")
+}
+
+def _notify_expiry(notice):
+    store, _, label = EXPIRY_SOURCES[notice["kind"]]
+    record = store.get(notice["id"]) or {}
+    notice["name"] = record.get(label)
+    when = "expired" if notice["daysLeft"] < 0 else f"expires in {notice['daysLeft']} days"
+    if notice["daysLeft"] == 0:
+        when = "expires today"
+    add_audit_log("EXPIRY", f"{notice['kind'].capitalize()} {notice['id']} ({notice['name']}) {when} "
+                            f"on {notice['expiryDate']}", "System")
+    EVENT_BUS.publish("expirations", notice)
+
+EXPIRY_SCHEDULER = ExpiryScheduler(notify=_notify_expiry, notices=EXPIRY_NOTICE_DB)
+EXPIRY_SCHEDULER.track("license", LICENSE_DB, "expiryDate")
+EXPIRY_SCHEDULER.track("warranty", ASSET_DB, "warrantyExpiryDate")
+MAX_EXPIRY_WINDOW_DAYS = 3650
+
+# Alert lifecycle per monitoring table; a breach within IIMS_ALERT_SUPPRESS_SECONDS of
+# resolving reopens the previous alert. State is per process, like the event bus.
+ALERT_SUPPRESS_SECONDS = int(os.environ.get("IIMS_ALERT_SUPPRESS_SECONDS", 300))
+ALERT_STATES = ("open", "acknowledged", "resolved")
+ALERT_TRACKERS = {kind: AlertTracker(kind, rules, ALERT_SUPPRESS_SECONDS, bus=EVENT_BUS)
+                  for kind, rules in ALERT_RULES.items()}
+
+# Telemetry ingestion: samples are coalesced per device and flushed to HEALTH_DB/NETWORK_DB
+# every IIMS_TELEMETRY_FLUSH_MS. Agents authenticate with X-Telemetry-Token when
+# IIMS_TELEMETRY_TOKEN is set; Admin/IT Staff sessions may always ingest.
+TELEMETRY_TOKEN = os.environ.get("IIMS_TELEMETRY_TOKEN")
+TELEMETRY_FLUSH_SECONDS = int(os.environ.get("IIMS_TELEMETRY_FLUSH_MS", 1000)) / 1000
+TELEMETRY_MAX_SAMPLES = 50000
+TELEMETRY_FIELDS = {
+    "hardware": {"cpuLoad": "number", "memoryUtil": "number", "isOverheating": "bool"},
+    "network": {"bandwidthMB": "number", "isDowntime": "bool", "abnormalTraffic": "bool"}
+}
+# Fields agents may omit because the server derives them on ingest
+TELEMETRY_DERIVED_FIELDS = {"network": {"abnormalTraffic"}}
+# abnormalTraffic is set when bandwidthMB is more than IIMS_TRAFFIC_Z standard deviations
+# from the device's exponentially weighted mean (smoothing IIMS_TRAFFIC_ALPHA)
+TRAFFIC_DETECTOR = EwmaDetector(alpha=float(os.environ.get("IIMS_TRAFFIC_ALPHA", 0.05)),
+                                threshold=float(os.environ.get("IIMS_TRAFFIC_Z", 4.0)))
+TELEMETRY_BUFFERS = {
+    "hardware": TelemetryBuffer(HEALTH_DB, TELEMETRY_FLUSH_SECONDS),
+    "network": TelemetryBuffer(NETWORK_DB, TELEMETRY_FLUSH_SECONDS)
+}
+
+# Metric history for /api/monitoring/<kind>/history: raw samples for 6 hours, then
+# 1m/5m/1h min/max/avg rollups kept for 2, 14 and 400 days
+TIMESERIES_TIERS = ((0, 6 * 3600), (60, 2 * 86400), (300, 14 * 86400), (3600, 400 * 86400))
+TIMESERIES_MAX_POINTS = 1000
+TIMESERIES_METRICS = {"hardware": ("cpuLoad", "memoryUtil"), "network": ("bandwidthMB",)}
+METRICS_HISTORY = {kind: TimeSeriesStore(TIMESERIES_TIERS) for kind in TIMESERIES_METRICS}
+
+def _record_history(kind, store):
+    history, metrics = METRICS_HISTORY[kind], TIMESERIES_METRICS[kind]
+    def listener(old, new):
+        if new is None:
+            if old is not None:
+                history.forget(old["deviceId"])
+            return
+        try:
+            timestamp = datetime.strptime(new["lastCheck"], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (KeyError, TypeError, ValueError):
+            timestamp = time.time()
+        history.record(new["deviceId"], timestamp, {metric: new[metric] for metric in metrics})
+    store.subscribe(listener)
+
+_record_history("hardware", HEALTH_DB)
+_record_history("network", NETWORK_DB)
+
+# Integration health: set the URL of a health endpoint per integration to have it probed
+# every IIMS_PROBE_INTERVAL seconds; unconfigured integrations keep their seeded status
+INTEGRATION_PROBER = IntegrationProber(INTEGRATION_STATUS, {
+    "licenseVendorAPI": os.environ.get("IIMS_LICENSE_VENDOR_URL"),
+    "networkSNMPAgent": os.environ.get("IIMS_SNMP_AGENT_URL"),
+    "backupToolX": os.environ.get("IIMS_BACKUP_TOOL_URL"),
+    "monitoringService": os.environ.get("IIMS_MONITORING_URL")
+}, interval=int(os.environ.get("IIMS_PROBE_INTERVAL", 60)), timeout=float(os.environ.get("IIMS_PROBE_TIMEOUT", 5)))
+INTEGRATION_PROBER.start()
+
 # Mock user database for authentication
 USER_DB = {
     "admin": {"password": "admin123", "role": "Admin", "name": "Administrator"},
@@ -275,10 +3084,28 @@ USER_DB = {
     "employee": {"password": "emp123", "role": "Employee", "name": "Alice Johnson"}
 }
 
-# Current user session
-current_role = None
-current_user = None
-is_authenticated = False
+# Upper bound for ?limit= on list endpoints
+MAX_PAGE_SIZE = 1000
+
+# Records fetched per store call when streaming a collection
+STREAM_CHUNK_SIZE = 500
+
+# Bulk import/export: rows inserted per store batch, and column order for CSV
+BULK_BATCH_SIZE = 1000
+BULK_MAX_ERRORS = 100
+ASSET_FIELDS = ["assetId", "assetType", "assignedUser", "purchaseDate", "warrantyExpiryDate", "status", "department"]
+LICENSE_FIELDS = ["licenseId", "softwareName", "licenseKey", "totalSeats", "usedSeats", "expiryDate", "complianceStatus"]
+
+# Background jobs (backup verification): IIMS_JOB_WORKERS jobs run at once, each checking
+# up to BACKUP_VERIFY_CONCURRENCY backup targets in parallel
+JOB_RUNNER = JobRunner(max_workers=int(os.environ.get("IIMS_JOB_WORKERS", 2)))
+BACKUP_VERIFY_CONCURRENCY = 8
+BACKUP_VERIFY_SECONDS = float(os.environ.get("IIMS_BACKUP_VERIFY_SECONDS", 0))
+
+# Session lifetime in seconds, for both the signed token and the server-side cache
+SESSION_TTL = int(os.environ.get("IIMS_SESSION_TTL", 8 * 3600))
+SESSION_COOKIE = "iims_session"
+SESSION_RECHECK_SECONDS = int(os.environ.get("IIMS_SESSION_RECHECK_SECONDS", 5))
 
 # ==================== HELPER FUNCTIONS ====================
 
@@ -290,79 +3117,542 @@ def add_audit_log(action, details, user_role):
         "action": action,
         "details": details
     }
-    AUDIT_LOG_DB.append(log_entry)
+    if JOURNAL is not None and JOURNAL.audit is not None:
+        JOURNAL.log_audit(log_entry)
+    else:
+        AUDIT_LOG_DB.append(log_entry)
+    SEARCH_INDEX.add("audit", next(_audit_search_ids), log_entry)
     return log_entry
 
+def encode_cursor(position):
+    """Encode a store position as an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor; raises ValueError if it is malformed"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def project(record, fields):
+    """Return only the requested fields of a record"""
+    return {f: record[f] for f in fields if f in record}
+
+def make_etag(*parts):
+    """Opaque ETag value derived from version numbers and other representation inputs"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+def conditional_response(etag, build):
+    """Return 304 Not Modified if If-None-Match matches etag, otherwise build() with a weak ETag
+
+    build is only called on a miss, so idle polling costs no serialization.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+        if isinstance(response, tuple) or response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def iter_records(page_fn, after=None):
+    """Yield every record after a position, fetching STREAM_CHUNK_SIZE records per page_fn call"""
+    while True:
+        records, after = page_fn(after, STREAM_CHUNK_SIZE)
+        yield from records
+        if after is None:
+            return
+
+def wants_stream():
+    """True if the client asked for NDJSON via ?stream=1 or the Accept header"""
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+def list_response(page_fn, version=None, cache=None):
+    """Build a list response honouring ?limit=, ?cursor=, ?fields=, NDJSON streaming
+    and, when the backing store's version is given, If-None-Match
+
+    page_fn(after, limit) returns (records, last_position) as KeyedStore.page does;
+    when more records follow, the next cursor is sent in the X-Next-Cursor header.
+    A streamed response without ?limit= pulls records through page_fn a chunk at a
+    time while it is being sent, so memory stays flat however large the collection.
+    With an EncodedRecordCache for the store, unprojected responses are joined from
+    each record's cached encoding.
+    """
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    if version is not None:
+        etag = make_etag(wants_stream(), *version)
+        return conditional_response(etag, lambda: build_list_response(page_fn, after, limit, fields, cache))
+    return build_list_response(page_fn, after, limit, fields, cache)
+
+def build_list_response(page_fn, after, limit, fields, cache=None):
+    """Serialize one page (or, streamed without a limit, everything) of page_fn's records"""
+    encoded = cache is not None and not fields
+    if encoded:
+        page_fn = cache.pager(page_fn)
+    if wants_stream():
+        last_position = None
+        if limit is None:
+            records = iter_records(page_fn, after)
+        else:
+            records, last_position = page_fn(after, limit)
+
+        def generate():
+            for record in records:
+                if encoded:
+                    yield record + b"\n"
+                else:
+                    yield json.dumps(project(record, fields) if fields else record, default=json_default) + "\n"
+
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    elif encoded:
+        records, last_position = page_fn(after, limit)
+        response = Response(b"[" + b",".join(records) + b"]\n", mimetype='application/json')
+    else:
+        records, last_position = page_fn(after, limit)
+        if fields:
+            records = [project(r, fields) for r in records]
+        response = jsonify(records)
+    if last_position is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(last_position)
+    return response
+
+def build_asset(data):
+    """Build an asset record from request data, applying defaults"""
+    return {
+        "assetId": data.get('assetId', f"AST-{str(uuid.uuid4())[:8]}"),
+        "assetType": data.get('assetType'),
+        "assignedUser": data.get('assignedUser'),
+        "purchaseDate": data.get('purchaseDate'),
+        "warrantyExpiryDate": data.get('warrantyExpiryDate'),
+        "status": data.get('status', 'Active'),
+        "department": data.get('department', 'IT')
+    }
+
+def build_license(data):
+    """Build a license record from request data, applying defaults"""
+    return {
+        "licenseId": data.get('licenseId', f"LIC-{str(uuid.uuid4())[:8]}"),
+        "softwareName": data.get('softwareName'),
+        "licenseKey": data.get('licenseKey'),
+        "totalSeats": data.get('totalSeats'),
+        "usedSeats": data.get('usedSeats', 0),
+        "expiryDate": data.get('expiryDate'),
+        "complianceStatus": data.get('complianceStatus', 'Compliant')
+    }
+
+def validate_asset(asset):
+    """Return an error message for an invalid imported asset, or None"""
+    if not asset["assetType"] or not asset["assignedUser"]:
+        return "assetType and assignedUser are required"
+    for field in ("purchaseDate", "warrantyExpiryDate"):
+        if asset[field] is not None and parse_date_ordinal(asset[field]) is None:
+            return f"{field} must be YYYY-MM-DD"
+    return None
+
+def validate_license(lic):
+    """Return an error message for an invalid imported license, or None; coerces seat counts"""
+    if not lic["softwareName"]:
+        return "softwareName is required"
+    for field in ("totalSeats", "usedSeats"):
+        try:
+            lic[field] = int(lic[field])
+        except (TypeError, ValueError):
+            return f"{field} must be an integer"
+    if lic["expiryDate"] is not None and parse_date_ordinal(lic["expiryDate"]) is None:
+        return "expiryDate must be YYYY-MM-DD"
+    return None
+
+def iter_bulk_rows():
+    """Yield (line number, row) from a CSV or NDJSON request body, reading it line by line
+
+    Empty CSV cells are dropped so record defaults apply; an unparseable NDJSON line
+    yields None as its row.
+    """
+    lines = (line.decode('utf-8') for line in request.stream)
+    if request.mimetype == 'text/csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if v not in ('', None)}
+    else:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+def bulk_import(store, build, validate, kind, user_role):
+    """Validate and insert streamed rows into store in batches, with a single audit entry"""
+    if request.mimetype not in ('text/csv', 'application/x-ndjson'):
+        return jsonify({"error": "Content-Type must be text/csv or application/x-ndjson"}), 415
+    counts = {"imported": 0, "rejected": 0}
+    errors = []
+    batch = {}  # key -> (line number, record)
+
+    def reject(line_number, message):
+        counts["rejected"] += 1
+        if len(errors) < BULK_MAX_ERRORS:
+            errors.append({"line": line_number, "error": message})
+
+    def flush():
+        skipped = store.insert_many([record for _, record in batch.values()])
+        for key in skipped:
+            reject(batch[key][0], f"{key} already exists")
+        counts["imported"] += len(batch) - len(skipped)
+        batch.clear()
+
+    for line_number, row in iter_bulk_rows():
+        if not isinstance(row, dict):
+            reject(line_number, "Malformed row")
+            continue
+        record = build(row)
+        error = validate(record)
+        if error:
+            reject(line_number, error)
+        elif record[store.key_field] in batch:
+            reject(line_number, f"{record[store.key_field]} already exists")
+        else:
+            batch[record[store.key_field]] = (line_number, record)
+            if len(batch) >= BULK_BATCH_SIZE:
+                flush()
+    flush()
+
+    add_audit_log("BULK_CREATE", f"Imported {counts['imported']} {kind}s ({counts['rejected']} rejected)", user_role)
+    return jsonify({**counts, "errors": errors})
+
+def export_response(store, fields, name):
+    """Stream every record of store as CSV or NDJSON (?format=), one row at a time"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    def generate():
+        if fmt == 'ndjson':
+            for record in iter_records(store.page):
+                yield json.dumps(record, default=json_default) + "\n"
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for record in iter_records(store.page):
+            writer.writerow([record.get(f) for f in fields])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
+
+def validate_telemetry(kind, sample):
+    """Return an error message for a malformed telemetry sample, or None"""
+    if not isinstance(sample, dict):
+        return "Sample must be an object"
+    if not isinstance(sample.get("deviceId"), str) or not sample["deviceId"]:
+        return "deviceId is required"
+    for field, expected in TELEMETRY_FIELDS[kind].items():
+        if field not in sample and field in TELEMETRY_DERIVED_FIELDS.get(kind, ()):
+            continue
+        value = sample.get(field)
+        if expected == "bool":
+            if not isinstance(value, bool):
+                return f"{field} must be true or false"
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return f"{field} must be a non-negative number"
+    if "lastCheck" in sample and not isinstance(sample["lastCheck"], str):
+        return "lastCheck must be a timestamp string"
+    if "deviceClass" in sample and not isinstance(sample["deviceClass"], str):
+        return "deviceClass must be a string"
+    return None
+
+def telemetry_authorized():
+    """Agents present the shared ingest token; staff sessions are also accepted"""
+    token = request.headers.get('X-Telemetry-Token')
+    if TELEMETRY_TOKEN and token and hmac.compare_digest(token, TELEMETRY_TOKEN):
+        return True
+    return can_perform_crud(session_role())
+
+def check_backup_target(backup):
+    """Verify one backup target and return its new status
+
+    The backup tool has no API wired in yet, so this stands in for the check by waiting
+    BACKUP_VERIFY_SECONDS and flagging the job for investigation.
+    """
+    if BACKUP_VERIFY_SECONDS:
+        time.sleep(BACKUP_VERIFY_SECONDS)
+    return "Under Investigation"
+
+def verify_backups(job, user_role):
+    """Background job: check every failed or missed backup concurrently and record the outcome"""
+    # Index lookups by status instead of a scan of every backup job
+    failed = [backup for status in ("Failure", "Missed") for backup in BACKUP_DB.find({"status": status})]
+    job.total = len(failed)
+    pool = ThreadPoolExecutor(max_workers=BACKUP_VERIFY_CONCURRENCY, thread_name_prefix="iims-verify")
+    try:
+        futures = {pool.submit(check_backup_target, backup): backup for backup in failed}
+        for future in as_completed(futures):
+            if job.cancelled:
+                break
+            backup, new_status = futures[future], future.result()
+            previous_status = backup["status"]
+            BACKUP_DB.update(backup["jobId"], {"status": new_status})
+            job.advance({
+                "jobId": backup["jobId"],
+                "assetId": backup["assetId"],
+                "previousStatus": previous_status,
+                "newStatus": new_status,
+                "alertReason": backup["alertReason"],
+                "verificationStatus": new_status,
+                "recommendedAction": "Review backup configuration and retry backup job"
+            })
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    job_ids = [result["jobId"] for result in job.results]
+    suffix = f" (cancelled after {len(job_ids)} of {job.total})" if job.cancelled else ""
+    add_audit_log("VERIFY", f"Backup verification run - {len(job_ids)} jobs set to 'Under Investigation'{suffix}",
+                  user_role)
+    EVENT_BUS.publish("backup", {"op": "verified", "verifiedJobs": len(job_ids), "jobIds": job_ids})
+
+def requested_version(data):
+    """(version, failure status) a conditional write is based on, or (None, None)
+
+    The version comes from If-Match (a mismatch answers 412) or an expectedVersion field
+    (409). Raises ValueError if it is not a single integer version.
+    """
+    if request.if_match:
+        if request.if_match.star_tag:
+            return None, None
+        tags = list(request.if_match.as_set(include_weak=True))
+        if len(tags) != 1 or not tags[0].isdigit():
+            raise ValueError("If-Match must name a single record version")
+        return int(tags[0]), 412
+    version = data.get('expectedVersion')
+    if version is None:
+        return None, None
+    if type(version) is not int:
+        raise ValueError("expectedVersion must be an integer")
+    return version, 409
+
+def record_response(record, status=200):
+    """Return one record, with its version as the ETag to send back in If-Match"""
+    response = jsonify(record)
+    response.status_code = status
+    if RECORD_VERSION_FIELD in record:
+        response.set_etag(str(record[RECORD_VERSION_FIELD]))
+    return response
+
+def version_conflict(kind, error, status):
+    """Response for a conditional write that lost to a concurrent one"""
+    return jsonify({"error": f"{kind} was changed by another user", "currentVersion": error.current}), status
+
 def can_perform_crud(role):
     """Check if role can perform CRUD operations"""
     return role in ["Admin", "IT Staff"]
 
 def calculate_dashboard_metrics():
-    """Calculate dashboard metrics from all databases"""
-    total_assets = len(ASSET_DB)
-    
+    """Read dashboard metrics from the incrementally maintained counters"""
+    for store in (LICENSE_DB, HEALTH_DB, BACKUP_DB, NETWORK_DB):
+        store.refresh()
     # Licenses expiring in next 90 days
-    today = datetime.now().date()
-    expiry_threshold = today + timedelta(days=90)
-    licenses_expiring_soon = sum(
-        1 for lic in LICENSE_DB 
-        if datetime.strptime(lic["expiryDate"], "%Y-%m-%d").date() <= expiry_threshold
-    )
-    
-    # Hardware health alerts (CPU > 85% or overheating)
-    hardware_alerts = sum(
-        1 for dev in HEALTH_DB 
-        if dev["cpuLoad"] > 85 or dev["isOverheating"]
-    )
-    
-    # Backup failures
-    backup_failures = sum(
-        1 for job in BACKUP_DB 
-        if job["status"] in ["Failure", "Missed"]
-    )
-    
-    # Network events
-    network_events = sum(
-        1 for net in NETWORK_DB 
-        if net["isDowntime"] or net["abnormalTraffic"]
-    )
-    
+    expiry_threshold = datetime.now().date() + timedelta(days=90)
     return {
-        "totalAssets": total_assets,
-        "licensesExpiringSoon": licenses_expiring_soon,
-        "hardwareHealthAlerts": hardware_alerts,
-        "backupFailures": backup_failures,
-        "networkEvents": network_events
+        "totalAssets": len(ASSET_DB),
+        "licensesExpiringSoon": LICENSE_EXPIRY_INDEX.count_until(expiry_threshold),
+        "hardwareHealthAlerts": len(ALERT_RULES["hardware"].evaluate()),
+        "backupFailures": BACKUP_FAILURE_COUNTER.count,
+        "networkEvents": len(ALERT_RULES["network"].evaluate())
+    }
+
+# ==================== SESSIONS ====================
+
+class SessionCache:
+    """Server-side session cache with TTL eviction
+
+    Entries are kept in expiry order so eviction only ever looks at the oldest ones.
+    A revoked session is kept as a None tombstone until its TTL runs out.
+    """
+
+    def __init__(self, ttl, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now):
+        while self._entries:
+            sid, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[sid]
+
+    def get(self, sid, default=None):
+        """Return the cached session (None if revoked), or default if not cached"""
+        with self._lock:
+            self._evict(time.monotonic())
+            item = self._entries.get(sid)
+            return item[1] if item is not None else default
+
+    def put(self, sid, session):
+        with self._lock:
+            now = time.monotonic()
+            self._entries[sid] = (now + self.ttl, session)
+            self._entries.move_to_end(sid)
+            self._evict(now)
+
+    def revoke(self, sid):
+        self.put(sid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteSessionRevocations:
+    """Revoked session ids in SQLite, so a logout in one worker process reaches all of them
+
+    Rows are kept until the revoked token would have expired anyway.
+    """
+
+    def __init__(self, db, table="revoked_sessions"):
+        self.db = db
+        self.table = table
+        with db.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (sid TEXT PRIMARY KEY, expiresAt REAL NOT NULL)")
+
+    def __contains__(self, sid):
+        return self.db.connection().execute(
+            f"SELECT 1 FROM {self.table} WHERE sid = ? AND expiresAt > ?", (sid, time.time())).fetchone() is not None
+
+    def add(self, sid, ttl):
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} (sid, expiresAt) VALUES (?, ?)", (sid, now + ttl))
+            conn.execute(f"DELETE FROM {self.table} WHERE expiresAt <= ?", (now,))
+
+
+# With the SQLite engine, worker processes share revocations through the database and
+# only trust a cached session for SESSION_RECHECK_SECONDS before checking it again
+SESSION_REVOCATIONS = SQLiteSessionRevocations(SQLITE_DB) if SQLITE_DB is not None else None
+SESSIONS = SessionCache(SESSION_RECHECK_SECONDS if SESSION_REVOCATIONS is not None else SESSION_TTL)
+_session_signer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt="iims-session")
+_NOT_CACHED = object()
+
+def start_session(user, role, authenticated):
+    """Create a session and return (session, signed token)"""
+    session = {
+        "sid": uuid.uuid4().hex,
+        "user": user,
+        "role": role,
+        "name": USER_DB[user]["name"] if user in USER_DB else None,
+        "authenticated": authenticated
     }
+    SESSIONS.put(session["sid"], session)
+    return session, _session_signer.dumps(session)
+
+def current_session():
+    """Return the session for this request from its bearer token or cookie, or None
+
+    Tokens are signed, so a session created by another worker process is accepted and
+    cached here on first sight, unless it is in the shared revocation list; sessions
+    logged out in this process stay revoked.
+    """
+    if 'session' in g:
+        return g.session
+    session = None
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:] if auth_header.startswith('Bearer ') else request.cookies.get(SESSION_COOKIE)
+    if token:
+        try:
+            payload = _session_signer.loads(token, max_age=SESSION_TTL)
+        except BadSignature:
+            payload = None
+        if payload is not None:
+            session = SESSIONS.get(payload["sid"], _NOT_CACHED)
+            if session is _NOT_CACHED:
+                revoked = SESSION_REVOCATIONS is not None and payload["sid"] in SESSION_REVOCATIONS
+                session = None if revoked else payload
+                SESSIONS.put(payload["sid"], session)
+    g.session = session
+    return session
+
+def session_role():
+    """Role of the current request's session, or None"""
+    session = current_session()
+    return session["role"] if session else None
+
+def session_response(payload, token):
+    """JSON response that also sets the session cookie"""
+    response = jsonify(payload)
+    response.set_cookie(SESSION_COOKIE, token, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    return response
 
 # ==================== API ENDPOINTS ====================
 
+@app.after_request
+def commit_journal(response):
+    """Make the request's logged mutations durable before responding (group commit)"""
+    if JOURNAL is not None:
+        JOURNAL.commit()
+    return response
+
 @app.route('/api/role', methods=['GET', 'POST'])
 def role():
     """Get or set current user role"""
-    global current_role
     if request.method == 'POST':
         data = request.json
-        current_role = data.get('role', 'Admin')
-        return jsonify({"role": current_role})
-    return jsonify({"role": current_role})
+        session = current_session()
+        new_session, token = start_session(session["user"] if session else None, data.get('role', 'Admin'),
+                                           session["authenticated"] if session else False)
+        if session:
+            SESSIONS.revoke(session["sid"])
+        return session_response({"role": new_session["role"], "token": token}, token)
+    return jsonify({"role": session_role()})
 
 @app.route('/api/dashboard/metrics', methods=['GET'])
 def dashboard_metrics():
     """Get dashboard metrics"""
-    return jsonify(calculate_dashboard_metrics())
+    # The expiry window moves daily, so today's date is part of the ETag
+    etag = make_etag(datetime.now().date(), *(store.version for store in (ASSET_DB, LICENSE_DB, HEALTH_DB, BACKUP_DB, NETWORK_DB)))
+    return conditional_response(etag, lambda: jsonify(calculate_dashboard_metrics()))
 
 @app.route('/api/assets', methods=['GET', 'POST'])
 def assets():
     """CRUD operations for assets"""
-    global current_role
+    session = current_session()
+    current_role = session["role"] if session else None
     
     if request.method == 'GET':
+        criteria = {field: request.args[field] for field in ('department', 'status') if field in request.args}
         # Filter by assignedUser if Employee role
         if current_role == "Employee":
-            filtered_assets = [a for a in ASSET_DB if a["assignedUser"] == "Alice Johnson"]
-            return jsonify(filtered_assets)
-        return jsonify(ASSET_DB)
+            criteria["assignedUser"] = session["name"]
+        ASSET_DB.refresh()
+        # The Employee view depends on who is asking, so the ETag does too
+        version = (ASSET_DB.version, current_role, session["name"] if session else None)
+        return list_response(lambda after, limit: ASSET_DB.page(after, limit, criteria), version,
+                             JSON_CACHES["assets"])
     
     elif request.method == 'POST':
         if not can_perform_crud(current_role):
@@ -372,51 +3662,51 @@ def assets():
         action = data.get('action')
         
         if action == 'create':
-            new_asset = {
-                "assetId": data.get('assetId', f"AST-{str(uuid.uuid4())[:8]}"),
-                "assetType": data.get('assetType'),
-                "assignedUser": data.get('assignedUser'),
-                "purchaseDate": data.get('purchaseDate'),
-                "warrantyExpiryDate": data.get('warrantyExpiryDate'),
-                "status": data.get('status', 'Active'),
-                "department": data.get('department', 'IT')
-            }
-            ASSET_DB.append(new_asset)
+            new_asset = build_asset(data)
+            try:
+                created = ASSET_DB.insert(new_asset)
+            except KeyError:
+                return jsonify({"error": "Asset already exists"}), 409
             add_audit_log("CREATE", f"Created asset {new_asset['assetId']}", current_role)
-            return jsonify(new_asset), 201
+            return record_response(created, 201)
         
-        elif action == 'update':
+        try:
+            expected, conflict_status = requested_version(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if action == 'update':
             asset_id = data.get('assetId')
-            for i, asset in enumerate(ASSET_DB):
-                if asset["assetId"] == asset_id:
-                    ASSET_DB[i].update({
-                        "assetType": data.get('assetType', asset["assetType"]),
-                        "assignedUser": data.get('assignedUser', asset["assignedUser"]),
-                        "purchaseDate": data.get('purchaseDate', asset["purchaseDate"]),
-                        "warrantyExpiryDate": data.get('warrantyExpiryDate', asset["warrantyExpiryDate"]),
-                        "status": data.get('status', asset["status"]),
-                        "department": data.get('department', asset.get("department", "IT"))
-                    })
-                    add_audit_log("UPDATE", f"Updated asset {asset_id}", current_role)
-                    return jsonify(ASSET_DB[i])
-            return jsonify({"error": "Asset not found"}), 404
+            # Only the fields sent are written, so concurrent edits to other fields are kept
+            changes = {field: data[field] for field in ASSET_FIELDS if field != "assetId" and field in data}
+            try:
+                updated = ASSET_DB.update(asset_id, changes, expected)
+            except KeyError:
+                return jsonify({"error": "Asset not found"}), 404
+            except VersionConflict as e:
+                return version_conflict("Asset", e, conflict_status)
+            add_audit_log("UPDATE", f"Updated asset {asset_id}", current_role)
+            return record_response(updated)
         
         elif action == 'delete':
             asset_id = data.get('assetId')
-            for i, asset in enumerate(ASSET_DB):
-                if asset["assetId"] == asset_id:
-                    deleted = ASSET_DB.pop(i)
-                    add_audit_log("DELETE", f"Deleted asset {asset_id}", current_role)
-                    return jsonify(deleted)
-            return jsonify({"error": "Asset not found"}), 404
+            try:
+                deleted = ASSET_DB.delete(asset_id, expected)
+            except KeyError:
+                return jsonify({"error": "Asset not found"}), 404
+            except VersionConflict as e:
+                return version_conflict("Asset", e, conflict_status)
+            add_audit_log("DELETE", f"Deleted asset {asset_id}", current_role)
+            return jsonify(deleted)
 
 @app.route('/api/licenses', methods=['GET', 'POST'])
 def licenses():
     """CRUD operations for licenses"""
-    global current_role
+    current_role = session_role()
     
     if request.method == 'GET':
-        return jsonify(LICENSE_DB)
+        LICENSE_DB.refresh()
+        return list_response(LICENSE_DB.page, (LICENSE_DB.version,), JSON_CACHES["licenses"])
     
     elif request.method == 'POST':
         if not can_perform_crud(current_role):
@@ -426,71 +3716,180 @@ def licenses():
         action = data.get('action')
         
         if action == 'create':
-            new_license = {
-                "licenseId": data.get('licenseId', f"LIC-{str(uuid.uuid4())[:8]}"),
-                "softwareName": data.get('softwareName'),
-                "licenseKey": data.get('licenseKey'),
-                "totalSeats": data.get('totalSeats'),
-                "usedSeats": data.get('usedSeats', 0),
-                "expiryDate": data.get('expiryDate'),
-                "complianceStatus": data.get('complianceStatus', 'Compliant')
-            }
-            LICENSE_DB.append(new_license)
+            new_license = build_license(data)
+            try:
+                created = LICENSE_DB.insert(new_license)
+            except KeyError:
+                return jsonify({"error": "License already exists"}), 409
             add_audit_log("CREATE", f"Created license {new_license['licenseId']}", current_role)
-            return jsonify(new_license), 201
+            return record_response(created, 201)
         
-        elif action == 'update':
+        try:
+            expected, conflict_status = requested_version(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if action == 'update':
             license_id = data.get('licenseId')
-            for i, lic in enumerate(LICENSE_DB):
-                if lic["licenseId"] == license_id:
-                    LICENSE_DB[i].update({
-                        "softwareName": data.get('softwareName', lic["softwareName"]),
-                        "licenseKey": data.get('licenseKey', lic["licenseKey"]),
-                        "totalSeats": data.get('totalSeats', lic["totalSeats"]),
-                        "usedSeats": data.get('usedSeats', lic["usedSeats"]),
-                        "expiryDate": data.get('expiryDate', lic["expiryDate"]),
-                        "complianceStatus": data.get('complianceStatus', lic.get("complianceStatus", "Compliant"))
-                    })
-                    add_audit_log("UPDATE", f"Updated license {license_id}", current_role)
-                    return jsonify(LICENSE_DB[i])
-            return jsonify({"error": "License not found"}), 404
+            changes = {field: data[field] for field in LICENSE_FIELDS if field != "licenseId" and field in data}
+            try:
+                updated = LICENSE_DB.update(license_id, changes, expected)
+            except KeyError:
+                return jsonify({"error": "License not found"}), 404
+            except VersionConflict as e:
+                return version_conflict("License", e, conflict_status)
+            add_audit_log("UPDATE", f"Updated license {license_id}", current_role)
+            return record_response(updated)
         
         elif action == 'delete':
             license_id = data.get('licenseId')
-            for i, lic in enumerate(LICENSE_DB):
-                if lic["licenseId"] == license_id:
-                    deleted = LICENSE_DB.pop(i)
-                    add_audit_log("DELETE", f"Deleted license {license_id}", current_role)
-                    return jsonify(deleted)
-            return jsonify({"error": "License not found"}), 404
+            try:
+                deleted = LICENSE_DB.delete(license_id, expected)
+            except KeyError:
+                return jsonify({"error": "License not found"}), 404
+            except VersionConflict as e:
+                return version_conflict("License", e, conflict_status)
+            add_audit_log("DELETE", f"Deleted license {license_id}", current_role)
+            return jsonify(deleted)
+
+@app.route('/api/assets/bulk', methods=['POST'])
+def assets_bulk():
+    """Bulk asset import from a streamed CSV or NDJSON body"""
+    current_role = session_role()
+    if not can_perform_crud(current_role):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    return bulk_import(ASSET_DB, build_asset, validate_asset, "asset", current_role)
+
+@app.route('/api/assets/export', methods=['GET'])
+def assets_export():
+    """Streaming asset export as CSV or NDJSON"""
+    if not can_perform_crud(session_role()):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    return export_response(ASSET_DB, ASSET_FIELDS, "assets")
+
+@app.route('/api/licenses/bulk', methods=['POST'])
+def licenses_bulk():
+    """Bulk license import from a streamed CSV or NDJSON body"""
+    current_role = session_role()
+    if not can_perform_crud(current_role):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    return bulk_import(LICENSE_DB, build_license, validate_license, "license", current_role)
+
+@app.route('/api/licenses/export', methods=['GET'])
+def licenses_export():
+    """Streaming license export as CSV or NDJSON"""
+    if not can_perform_crud(session_role()):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    return export_response(LICENSE_DB, LICENSE_FIELDS, "licenses")
 
 @app.route('/api/monitoring/hardware', methods=['GET'])
 def hardware_health():
     """Get hardware health monitoring data"""
-    return jsonify(HEALTH_DB)
+    HEALTH_DB.refresh()
+    return list_response(HEALTH_DB.page, (HEALTH_DB.version,), JSON_CACHES["hardware"])
 
 @app.route('/api/monitoring/network', methods=['GET'])
 def network_usage():
     """Get network usage monitoring data"""
-    return jsonify(NETWORK_DB)
+    NETWORK_DB.refresh()
+    return list_response(NETWORK_DB.page, (NETWORK_DB.version,), JSON_CACHES["network"])
+
+@app.route('/api/telemetry/ingest', methods=['POST'])
+def telemetry_ingest():
+    """Batched telemetry ingestion: {"hardware": [samples], "network": [samples]}"""
+    if not telemetry_authorized():
+        return jsonify({"error": "Insufficient permissions"}), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not set(data) <= set(TELEMETRY_BUFFERS):
+        return jsonify({"error": f"Body must map {' and/or '.join(TELEMETRY_BUFFERS)} to sample lists"}), 400
+    if sum(len(samples) for samples in data.values() if isinstance(samples, list)) > TELEMETRY_MAX_SAMPLES:
+        return jsonify({"error": f"At most {TELEMETRY_MAX_SAMPLES} samples per request"}), 413
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    accepted, rejected, errors = {}, 0, []
+    for kind, samples in data.items():
+        if not isinstance(samples, list):
+            return jsonify({"error": f"{kind} must be a list of samples"}), 400
+        valid = []
+        for position, sample in enumerate(samples):
+            error = validate_telemetry(kind, sample)
+            if error:
+                rejected += 1
+                if len(errors) < BULK_MAX_ERRORS:
+                    errors.append({"kind": kind, "index": position, "error": error})
+                continue
+            record = {"deviceId": sample["deviceId"],
+                      **{field: sample[field] for field in TELEMETRY_FIELDS[kind] if field in sample}}
+            if kind == "hardware":
+                record["lastCheck"] = sample.get("lastCheck") or now
+            elif kind == "network":
+                # Every sample feeds the detector, including ones later coalesced away;
+                # downtime readings are not traffic and would skew the baseline
+                anomalous = not record["isDowntime"] and TRAFFIC_DETECTOR.observe(record["deviceId"],
+                                                                                  record["bandwidthMB"])
+                record["abnormalTraffic"] = sample.get("abnormalTraffic", False) or anomalous
+            if "deviceClass" in sample:
+                record["deviceClass"] = sample["deviceClass"]
+            valid.append(record)
+        TELEMETRY_BUFFERS[kind].add(valid)
+        accepted[kind] = len(valid)
+    return jsonify({"accepted": accepted, "rejected": rejected, "errors": errors}), 202
+
+@app.route('/api/monitoring/<kind>/history', methods=['GET'])
+def monitoring_history(kind):
+    """Metric history for one device: ?deviceId=&metric=&from=&to=&step= (seconds)"""
+    if kind not in METRICS_HISTORY:
+        return jsonify({"error": f"Unknown monitoring kind: {kind}"}), 404
+    device_id = request.args.get('deviceId')
+    if not device_id:
+        return jsonify({"error": "deviceId is required"}), 400
+    metrics = request.args.get('metric', '').split(',') if request.args.get('metric') else TIMESERIES_METRICS[kind]
+    unknown = [metric for metric in metrics if metric not in TIMESERIES_METRICS[kind]]
+    if unknown:
+        return jsonify({"error": f"Unknown metric: {', '.join(unknown)}"}), 400
+    try:
+        end = datetime.fromisoformat(request.args['to']).timestamp() if 'to' in request.args else time.time()
+        start = datetime.fromisoformat(request.args['from']).timestamp() if 'from' in request.args else end - 3600
+        step = int(request.args.get('step', 1))
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO timestamps and step an integer"}), 400
+    if start >= end or step < 1:
+        return jsonify({"error": "from must be before to and step positive"}), 400
+    # Never return more than TIMESERIES_MAX_POINTS buckets per metric
+    step = max(step, -(-int(end - start) // TIMESERIES_MAX_POINTS))
+
+    history = METRICS_HISTORY[kind]
+    if device_id not in history:
+        return jsonify({"error": "Device not found"}), 404
+    series = {}
+    for metric in metrics:
+        metric_step, points = history.query(device_id, metric, start, end, step)
+        series[metric] = {"step": metric_step, "points": points or []}
+    return jsonify({"deviceId": device_id, "series": series})
 
 @app.route('/api/monitoring/backup', methods=['GET'])
 def backup_recovery():
     """Get backup and recovery monitoring data"""
-    return jsonify(BACKUP_DB)
+    BACKUP_DB.refresh()
+    return list_response(BACKUP_DB.page, (BACKUP_DB.version,), JSON_CACHES["backup"])
 
 @app.route('/api/audit-log', methods=['GET'])
 def audit_log():
     """Get audit log (Admin/IT Staff only)"""
-    global current_role
+    current_role = session_role()
     if current_role not in ["Admin", "IT Staff"]:
         return jsonify({"error": "Insufficient permissions"}), 403
-    return jsonify(AUDIT_LOG_DB)
+    since = request.args.get('since')
+    until = request.args.get('until')
+    if until is not None and len(until) == 10:
+        until += " 23:59:59"  # date-only upper bound includes the whole day
+    action = request.args.get('action')
+    return list_response(lambda after, limit: AUDIT_LOG_DB.query(after, limit, since, until, action),
+                         (AUDIT_LOG_DB.version,))
 
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """User authentication endpoint (ITM-SR-002) with MFA for Admin"""
-    global current_role, current_user, is_authenticated
     data = request.json
     username = data.get('username', '').lower()
     password = data.get('password', '')
@@ -515,15 +3914,14 @@ def login():
                     "message": "MFA code required for Admin login. Use code: 123456"
                 }), 401
         
-        current_user = username
-        current_role = USER_DB[username]["role"]
-        is_authenticated = True
-        add_audit_log("LOGIN", f"User {username} logged in", current_role)
-        return jsonify({
+        session, token = start_session(username, USER_DB[username]["role"], True)
+        add_audit_log("LOGIN", f"User {username} logged in", session["role"])
+        return session_response({
             "success": True,
-            "role": current_role,
-            "name": USER_DB[username]["name"]
-        })
+            "role": session["role"],
+            "name": USER_DB[username]["name"],
+            "token": token
+        }, token)
     else:
         return jsonify({
             "success": False,
@@ -533,80 +3931,259 @@ def login():
 @app.route('/api/auth/logout', methods=['POST'])
 def logout():
     """User logout endpoint"""
-    global current_user, current_role, is_authenticated
-    if current_user:
-        add_audit_log("LOGOUT", f"User {current_user} logged out", current_role)
-    current_user = None
-    current_role = None
-    is_authenticated = False
-    return jsonify({"success": True})
+    session = current_session()
+    if session:
+        if session["user"]:
+            add_audit_log("LOGOUT", f"User {session['user']} logged out", session["role"])
+        SESSIONS.revoke(session["sid"])
+        if SESSION_REVOCATIONS is not None:
+            SESSION_REVOCATIONS.add(session["sid"], SESSION_TTL)
+    response = jsonify({"success": True})
+    response.delete_cookie(SESSION_COOKIE)
+    return response
 
 @app.route('/api/auth/status', methods=['GET'])
 def auth_status():
     """Get current authentication status"""
-    global current_role, current_user, is_authenticated
+    session = current_session() or {}
     return jsonify({
-        "authenticated": is_authenticated,
-        "role": current_role,
-        "user": current_user
+        "authenticated": session.get("authenticated", False),
+        "role": session.get("role"),
+        "user": session.get("user")
     })
 
 @app.route('/api/monitoring/backup/verify', methods=['POST'])
 def backup_verify():
-    """Automated backup verification endpoint (ITM-F-041) - Resets status to 'Under Investigation'"""
-    global current_role, is_authenticated
-    if not is_authenticated or current_role not in ["Admin", "IT Staff"]:
+    """Automated backup verification endpoint (ITM-F-041) - Starts a background verification job"""
+    session = current_session()
+    current_role = session["role"] if session else None
+    if not session or not session["authenticated"] or current_role not in ["Admin", "IT Staff"]:
         return jsonify({"error": "Insufficient permissions"}), 403
-    
-    # Find failed/missed backup jobs
-    failed_jobs = [job for job in BACKUP_DB if job["status"] in ["Failure", "Missed"]]
-    
-    # Simulate verification process and reset status to 'Under Investigation'
-    verification_results = []
-    for job in failed_jobs:
-        # Update job status to 'Under Investigation'
-        for i, backup_job in enumerate(BACKUP_DB):
-            if backup_job["jobId"] == job["jobId"]:
-                BACKUP_DB[i]["status"] = "Under Investigation"
-                break
-        
-        verification_results.append({
-            "jobId": job["jobId"],
-            "assetId": job["assetId"],
-            "previousStatus": job["status"],
-            "newStatus": "Under Investigation",
-            "alertReason": job["alertReason"],
-            "verificationStatus": "Under Investigation",
-            "recommendedAction": "Review backup configuration and retry backup job"
-        })
-    
-    add_audit_log("VERIFY", f"Backup verification run - {len(failed_jobs)} jobs set to 'Under Investigation'", current_role)
-    
-    return jsonify({
-        "verifiedJobs": len(failed_jobs),
-        "results": verification_results,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
+    try:
+        job = JOB_RUNNER.submit("backup-verify", session["user"],
+                                lambda job: verify_backups(job, current_role))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 429
+    response = jsonify({"jobId": job.id, "status": job.status, "statusUrl": f"/api/jobs/{job.id}"})
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progress and results of a background job"""
+    if not can_perform_crud(session_role()):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    job = JOB_RUNNER.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Request cancellation of a queued or running background job"""
+    current_role = session_role()
+    if not can_perform_crud(current_role):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    job = JOB_RUNNER.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.finished:
+        return jsonify({"error": f"Job already {job.status}"}), 409
+    job.cancel()
+    add_audit_log("CANCEL", f"Cancelled {job.kind} job {job_id}", current_role)
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/events', methods=['GET'])
+def events():
+    """Server-Sent Events stream of changes for ?topics= (comma-separated, default: all visible)"""
+    # Asset events bypass the Employee view filter, so they are limited to Admin/IT Staff,
+    # as are warranty expirations, which /api/expirations hides from other roles too
+    visible = set(EVENT_TOPICS) | EVENT_DERIVED_TOPICS
+    staff = can_perform_crud(session_role())
+    if not staff:
+        visible.discard("assets")
+    requested = request.args.get('topics')
+    topics = set(requested.split(',')) if requested else visible
+    unknown = topics - set(EVENT_TOPICS) - EVENT_DERIVED_TOPICS
+    if unknown:
+        return jsonify({"error": f"Unknown topics: {', '.join(sorted(unknown))}"}), 400
+    if not topics <= visible:
+        return jsonify({"error": "Insufficient permissions"}), 403
+
+    def generate():
+        subscription = EVENT_BUS.subscribe(topics)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                topic, data = event
+                if topic == "expirations" and data["kind"] == "warranty" and not staff:
+                    continue
+                yield f"event: {topic}\ndata: {json.dumps(data, default=json_default)}\n\n"
+        finally:
+            EVENT_BUS.unsubscribe(subscription)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/alerts', methods=['GET'])
+def alerts():
+    """Tracked alerts for ?kind= and ?state= (comma-separated, default: all kinds, open and acknowledged)"""
+    kinds = request.args.get('kind', '').split(',') if request.args.get('kind') else list(ALERT_TRACKERS)
+    states = request.args.get('state', '').split(',') if request.args.get('state') else ["open", "acknowledged"]
+    unknown = [kind for kind in kinds if kind not in ALERT_TRACKERS] + [s for s in states if s not in ALERT_STATES]
+    if unknown:
+        return jsonify({"error": f"Unknown alert kind or state: {', '.join(unknown)}"}), 400
+    for kind in kinds:
+        ALERT_RULES[kind].store.refresh()
+
+    def build():
+        return jsonify([alert for kind in kinds for alert in ALERT_TRACKERS[kind].alerts(states)])
+    etag = make_etag(*kinds, *states, *(ALERT_TRACKERS[kind].version for kind in kinds))
+    return conditional_response(etag, build)
+
+@app.route('/api/alerts/<alert_id>/ack', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Acknowledge an open alert"""
+    session = current_session()
+    current_role = session["role"] if session else None
+    if not can_perform_crud(current_role):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    tracker = next((t for t in ALERT_TRACKERS.values() if alert_id in t), None)
+    if tracker is None:
+        return jsonify({"error": "Alert not found"}), 404
+    try:
+        alert = tracker.acknowledge(alert_id, session["user"] or current_role)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    add_audit_log("ACK", f"Acknowledged alert {alert_id} ({alert['rule']} on {alert['deviceId']})", current_role)
+    return jsonify(alert)
+
+@app.route('/api/expirations', methods=['GET'])
+def expirations():
+    """Licenses and warranties expiring within ?within= days (default 90), earliest first
+
+    ?kind= limits to license or warranty; ?expired=true also lists past expiry dates.
+    """
+    visible = list(EXPIRY_SOURCES)
+    if not can_perform_crud(session_role()):
+        visible.remove("warranty")
+    kinds = request.args.get('kind', '').split(',') if request.args.get('kind') else visible
+    unknown = [kind for kind in kinds if kind not in EXPIRY_SOURCES]
+    if unknown:
+        return jsonify({"error": f"Unknown expiry kind: {', '.join(unknown)}"}), 400
+    if not set(kinds) <= set(visible):
+        return jsonify({"error": "Insufficient permissions"}), 403
+    try:
+        within = int(request.args.get('within', 90))
+    except ValueError:
+        return jsonify({"error": "within must be a number of days"}), 400
+    if not 0 <= within <= MAX_EXPIRY_WINDOW_DAYS:
+        return jsonify({"error": f"within must be between 0 and {MAX_EXPIRY_WINDOW_DAYS}"}), 400
+
+    today = datetime.now().date()
+    start = None if request.args.get('expired') == 'true' else today
+    for kind in kinds:
+        EXPIRY_SOURCES[kind][0].refresh()
+
+    def build():
+        items = []
+        for kind in kinds:
+            store, index, label = EXPIRY_SOURCES[kind]
+            for day, key in index.between(start, today + timedelta(days=within)):
+                items.append({"kind": kind, "id": key, "name": store.get(key, {}).get(label),
+                              "expiryDate": datetime.fromordinal(day).strftime("%Y-%m-%d"),
+                              "daysLeft": day - today.toordinal()})
+        items.sort(key=lambda item: (item["expiryDate"], item["kind"], item["id"]))
+        return jsonify(items)
+    etag = make_etag(today.isoformat(), within, start is None, *kinds,
+                     *(EXPIRY_SOURCES[kind][0].version for kind in kinds))
+    return conditional_response(etag, build)
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Ranked search over assets, licenses and audit entries: ?q=&kind=&limit=
+
+    The last word of q also matches as a prefix, for type-ahead. Employees only see
+    licenses and the assets assigned to them; audit entries need Admin/IT Staff.
+    """
+    session = current_session()
+    current_role = session["role"] if session else None
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    kinds = set(request.args['kind'].split(',')) if request.args.get('kind') else None
+    if kinds is not None and not kinds <= set(SEARCH_INDEX.fields):
+        return jsonify({"error": f"Unknown kind: {', '.join(sorted(kinds - set(SEARCH_INDEX.fields)))}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_SEARCH_RESULTS)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    if can_perform_crud(current_role):
+        visible = None
+    else:
+        user_name = session["name"] if session and current_role == "Employee" else None
+        def visible(kind, record):
+            return kind == "license" or (kind == "asset" and user_name is not None
+                                         and record.get("assignedUser") == user_name)
+
+    SEARCH_INDEX.refresh(kinds)
+    results = SEARCH_INDEX.search(query, max(limit, 1), kinds, visible)
+    return jsonify({"query": query, "results": [{"kind": kind, "id": key, "score": score, "record": record}
+                                                 for score, kind, key, record in results]})
 
 @app.route('/api/integrations/status', methods=['GET'])
 def integration_status():
     """Get external integration status"""
-    return jsonify(INTEGRATION_STATUS)
+    return conditional_response(make_etag(INTEGRATION_PROBER.version), lambda: jsonify(INTEGRATION_PROBER.snapshot()))
 
 @app.route('/api/analytics/assets-by-department', methods=['GET'])
 def assets_by_department():
     """Get asset distribution by department for analytics (ITM-F-061)"""
-    department_counts = {}
-    for asset in ASSET_DB:
-        dept = asset.get("department", "Unknown")
-        department_counts[dept] = department_counts.get(dept, 0) + 1
-    
-    return jsonify(department_counts)
+    ASSET_DB.refresh()
+
+    def build():
+        department_counts = {
+            dept if dept is not None else "Unknown": count
+            for (dept,), count in ASSET_CUBE.group_by(("department",)).items()
+        }
+        return jsonify(department_counts)
+    return conditional_response(make_etag(ASSET_DB.version), build)
+
+@app.route('/api/analytics/assets', methods=['GET'])
+def assets_analytics():
+    """Asset counts grouped by ?groupBy= (any of department, assetType, status, purchaseYear)
+
+    Any of the same dimensions may also be given as a filter, e.g. ?groupBy=status&department=IT.
+    Missing values are reported, and can be filtered, as "Unknown".
+    """
+    group_by = request.args.get('groupBy', 'department').split(',')
+    filters = {name: (None if value == "Unknown" else value)
+               for name, value in request.args.items() if name != 'groupBy'}
+    unknown = [name for name in (*group_by, *filters) if name not in ASSET_CUBE.dimensions]
+    if unknown or len(set(group_by)) != len(group_by):
+        return jsonify({"error": f"Unknown or repeated dimension: {', '.join(unknown or group_by)}"}), 400
+    ASSET_DB.refresh()
+
+    def build():
+        groups = [{**{name: value if value is not None else "Unknown" for name, value in zip(group_by, key)},
+                   "count": count}
+                  for key, count in ASSET_CUBE.group_by(group_by, filters).items()]
+        groups.sort(key=lambda group: (-group["count"], [str(group[name]) for name in group_by]))
+        return jsonify({"groupBy": group_by, "filters": {name: request.args[name] for name in filters},
+                        "total": sum(group["count"] for group in groups), "groups": groups})
+    return conditional_response(make_etag(ASSET_DB.version, request.query_string), build)
 
 @app.route('/api/assets/<asset_id>/qr', methods=['GET'])
 def generate_qr(asset_id):
     """Generate QR code data for asset (ITM-F-001)"""
-    asset = next((a for a in ASSET_DB if a["assetId"] == asset_id), None)
+    asset = ASSET_DB.get(asset_id)
     if not asset:
         return jsonify({"error": "Asset not found"}), 404
     
@@ -618,7 +4195,7 @@ def generate_qr(asset_id):
         "message": "In a real application, scanning this QR code would link to the asset's details page."
     }
     
-    user_role = current_role if current_role else "System"
+    user_role = session_role() or "System"
     add_audit_log("QR_GENERATE", f"QR code generated for asset {asset_id}", user_role)
     return jsonify(qr_data)
 
@@ -627,8 +4204,13 @@ def index():
     """Serve the main HTML file"""
     return send_from_directory(os.path.dirname(os.path.abspath(__file__)), 'index.html')
 
+# Started at import, after the helpers it calls, so it also runs under a WSGI server
+EXPIRY_SCHEDULER.start()
+
 if __name__ == '__main__':
     # Initialize audit log with startup entry
     add_audit_log("SYSTEM", "IIMS System Started", "System")
-    app.run(debug=True, port=5000)
+    # The reloader would import this module again in a child process, which would open a
+    # second journal (and prober, scheduler, ...) next to this one
+    app.run(debug=True, port=5000, use_reloader=False)
 
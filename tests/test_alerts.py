@@ -0,0 +1,208 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest import mock
+import server
+from server import (app, AlertRules, AlertTracker, EventBus, KeyedStore, SQLiteDatabase, SQLiteStore,
+                    load_alert_rules, HEALTH_DB)
+
+RULES = [
+    {"name": "highCpuLoad", "field": "cpuLoad", "op": ">", "threshold": 85, "classes": {"server": 95}},
+    {"name": "overheating", "field": "isOverheating", "op": "==", "threshold": True}
+]
+DEVICES = [
+    {"deviceId": "A", "cpuLoad": 90, "isOverheating": False},
+    {"deviceId": "B", "cpuLoad": 90, "isOverheating": False, "deviceClass": "server"},
+    {"deviceId": "C", "cpuLoad": 99, "isOverheating": True, "deviceClass": "server"},
+    {"deviceId": "D", "cpuLoad": 10, "isOverheating": True}
+]
+EXPECTED = {"A": ["highCpuLoad"], "C": ["highCpuLoad", "overheating"], "D": ["overheating"]}
+
+class AlertRulesTestCase(unittest.TestCase):
+    """Test cases for per-class threshold rules"""
+
+    def setUp(self):
+        """Create the rule set over a small device store"""
+        self.store = KeyedStore("deviceId", [dict(device) for device in DEVICES])
+        self.rules = AlertRules(self.store, RULES)
+
+    def test_single_record_matches(self):
+        """Test class overrides apply to single-record checks"""
+        self.assertEqual({d["deviceId"]: self.rules.matches(d) for d in DEVICES if self.rules.matches(d)}, EXPECTED)
+
+    def test_batch_evaluation_pure_python(self):
+        """Test column evaluation without NumPy agrees with single-record checks"""
+        with mock.patch.object(server, 'numpy', None):
+            self.assertEqual(self.rules.evaluate(), EXPECTED)
+
+    @unittest.skipUnless(server.numpy is not None, "NumPy not installed")
+    def test_batch_evaluation_numpy(self):
+        """Test vectorized evaluation agrees with single-record checks"""
+        self.assertEqual(self.rules.evaluate(), EXPECTED)
+
+    def test_columns_follow_mutations(self):
+        """Test the mirrored columns track updates, inserts and swap-deletes"""
+        self.store.update("B", {"deviceClass": None})
+        self.store.delete("A")
+        self.store.insert({"deviceId": "E", "cpuLoad": 96, "isOverheating": False, "deviceClass": "server"})
+        self.store.delete("C")
+        expected = {"B": ["highCpuLoad"], "D": ["overheating"], "E": ["highCpuLoad"]}
+        self.assertEqual(self.rules.evaluate(), expected)
+        with mock.patch.object(server, 'numpy', None):
+            self.rules.reset()
+            for device in self.store:
+                self.rules.on_change(None, device)
+            self.assertEqual(self.rules.evaluate(), expected)
+        for device in list(self.store.all()):
+            self.store.delete(device["deviceId"])
+        self.assertEqual(self.rules.evaluate(), {})
+
+    def test_unknown_operator_rejected(self):
+        """Test a rule with an unsupported operator is refused"""
+        with self.assertRaises(ValueError):
+            AlertRules(self.store, [{"name": "x", "field": "cpuLoad", "op": "~", "threshold": 1}])
+
+    def test_rules_file_replaces_kind(self):
+        """Test IIMS_ALERT_RULES overrides only the kinds it names"""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"network": [{"name": "saturated", "field": "bandwidthMB", "op": ">=", "threshold": 900}]}, f)
+        self.addCleanup(os.unlink, f.name)
+        rules = load_alert_rules(f.name)
+        self.assertEqual([r["name"] for r in rules["network"]], ["saturated"])
+        self.assertEqual(len(rules["hardware"]), 2)
+
+
+class AlertTrackerTestCase(unittest.TestCase):
+    """Test cases for the alert lifecycle"""
+
+    def setUp(self):
+        """Track a store with a hysteresis band of 5 and a 300s suppression window"""
+        self.now = 1000.0
+        self.store = KeyedStore("deviceId", [{"deviceId": "A", "cpuLoad": 50}])
+        rules = AlertRules(self.store, [{"name": "highCpuLoad", "field": "cpuLoad", "op": ">", "threshold": 85,
+                                         "hysteresis": 5}])
+        self.bus = EventBus()
+        self.events = self.bus.subscribe({"alerts"})
+        self.tracker = AlertTracker("hardware", rules, suppress_seconds=300, retention=3600,
+                                    clock=lambda: self.now, bus=self.bus)
+
+    def set_cpu(self, load, at=None):
+        if at is not None:
+            self.now = at
+        self.store.update("A", {"cpuLoad": load})
+
+    def ops(self):
+        ops = []
+        while (event := self.events.get(timeout=0)) is not None:
+            ops.append(event[1]["op"])
+        return ops
+
+    def test_hysteresis_prevents_flapping(self):
+        """Test a value hovering around the threshold keeps one open alert"""
+        for load in (86, 84, 87, 82, 90):
+            self.set_cpu(load)
+        alerts = self.tracker.alerts()
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual((alerts[0]["state"], alerts[0]["value"]), ("open", 90))
+        self.set_cpu(80)
+        self.assertEqual(self.tracker.alerts(), [])
+        self.assertEqual(self.ops(), ["opened", "resolved"])
+
+    def test_reopen_within_suppression_window(self):
+        """Test a breach soon after resolving reopens the same alert"""
+        self.set_cpu(90, at=1000)
+        self.set_cpu(70, at=1100)
+        self.set_cpu(95, at=1200)
+        alert, = self.tracker.alerts()
+        self.assertEqual(alert["occurrences"], 2)
+        self.set_cpu(70, at=1300)
+        self.set_cpu(95, at=1700)
+        fresh, = self.tracker.alerts()
+        self.assertNotEqual(fresh["id"], alert["id"])
+        self.assertNotIn(alert["id"], self.tracker)
+        self.assertEqual(self.ops(), ["opened", "resolved", "reopened", "resolved", "opened"])
+
+    def test_acknowledge(self):
+        """Test acknowledging an open alert, and refusing to acknowledge twice"""
+        self.set_cpu(90)
+        alert, = self.tracker.alerts()
+        acked = self.tracker.acknowledge(alert["id"], "itstaff")
+        self.assertEqual((acked["state"], acked["acknowledgedBy"]), ("acknowledged", "itstaff"))
+        with self.assertRaises(ValueError):
+            self.tracker.acknowledge(alert["id"], "itstaff")
+        with self.assertRaises(KeyError):
+            self.tracker.acknowledge("ALR-missing", "itstaff")
+
+    def test_delete_resolves_and_retention_prunes(self):
+        """Test deleting a device resolves its alerts, which expire after retention"""
+        self.set_cpu(90)
+        self.store.delete("A")
+        alert, = self.tracker.alerts(("resolved",))
+        self.now += 3601
+        self.assertEqual(self.tracker.alerts(("resolved",)), [])
+        self.assertNotIn(alert["id"], self.tracker)
+
+    def test_replay_resolves_devices_deleted_elsewhere(self):
+        """Test a store replay after another worker deleted a device resolves its alerts"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "iims.db")
+            store = SQLiteStore(SQLiteDatabase(path), "health", "deviceId",
+                                [{"deviceId": "A", "cpuLoad": 90}, {"deviceId": "B", "cpuLoad": 95}])
+            rules = AlertRules(store, [{"name": "highCpuLoad", "field": "cpuLoad", "op": ">", "threshold": 85}])
+            tracker = AlertTracker("hardware", rules, clock=lambda: self.now)
+            self.assertEqual(len(tracker.alerts()), 2)
+            SQLiteStore(SQLiteDatabase(path), "health", "deviceId").delete("A")
+            store.refresh()
+            self.assertEqual([a["deviceId"] for a in tracker.alerts()], ["B"])
+            self.assertEqual([a["deviceId"] for a in tracker.alerts(("resolved",))], ["A"])
+            self.assertEqual(rules.evaluate(), {"B": ["highCpuLoad"]})
+
+
+class AlertsEndpointTestCase(unittest.TestCase):
+    """Test cases for GET /api/alerts and acknowledgement"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        server.SESSIONS.clear()
+
+    def test_alerts_match_dashboard_counters(self):
+        """Test seeded devices in alert are tracked as open alerts and counted by batch evaluation"""
+        data = json.loads(self.app.get('/api/alerts').data)
+        metrics = json.loads(self.app.get('/api/dashboard/metrics').data)
+        self.assertEqual(len({a["deviceId"] for a in data if a["kind"] == "hardware"}),
+                         metrics["hardwareHealthAlerts"])
+        self.assertEqual(len({a["deviceId"] for a in data if a["kind"] == "network"}), metrics["networkEvents"])
+
+    def test_alert_lifecycle_over_http(self):
+        """Test a breach opens an alert that staff can acknowledge, and the ETag changes"""
+        device = HEALTH_DB.all()[1]
+        self.addCleanup(HEALTH_DB.update, device["deviceId"], dict(device))
+        first = self.app.get('/api/alerts?kind=hardware')
+        self.assertNotIn(device["deviceId"], [a["deviceId"] for a in json.loads(first.data)])
+        self.assertEqual(self.app.get('/api/alerts?kind=hardware',
+                                      headers={'If-None-Match': first.headers['ETag']}).status_code, 304)
+        HEALTH_DB.update(device["deviceId"], {"cpuLoad": 99})
+        opened = [a for a in json.loads(self.app.get('/api/alerts?kind=hardware').data)
+                  if a["deviceId"] == device["deviceId"]]
+        self.assertEqual([(a["rule"], a["state"]) for a in opened], [("highCpuLoad", "open")])
+
+        alert_id = opened[0]["id"]
+        self.assertEqual(self.app.post(f'/api/alerts/{alert_id}/ack').status_code, 403)
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        response = self.app.post(f'/api/alerts/{alert_id}/ack')
+        self.assertEqual(json.loads(response.data)["acknowledgedBy"], "itstaff")
+        self.assertEqual(self.app.post(f'/api/alerts/{alert_id}/ack').status_code, 409)
+        self.assertEqual(self.app.post('/api/alerts/ALR-nope/ack').status_code, 404)
+        acked = json.loads(self.app.get('/api/alerts?kind=hardware&state=acknowledged').data)
+        self.assertEqual([a["id"] for a in acked], [alert_id])
+
+    def test_unknown_kind_or_state(self):
+        """Test an unknown kind or state returns 400"""
+        self.assertEqual(self.app.get('/api/alerts?kind=disk').status_code, 400)
+        self.assertEqual(self.app.get('/api/alerts?state=closed').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import json
+from collections import Counter
+from server import app, AggregateCube, KeyedStore, ASSET_DB
+
+class AggregateCubeTestCase(unittest.TestCase):
+    """Test cases for the incrementally maintained aggregate cube"""
+
+    def setUp(self):
+        """Create a cube over two dimensions"""
+        self.store = KeyedStore("id", [{"id": "A", "dept": "IT", "s": "on"}, {"id": "B", "dept": "HR", "s": "on"},
+                                       {"id": "C", "dept": "IT", "s": "off"}])
+        self.cube = AggregateCube(self.store, {"dept": lambda r: r.get("dept"), "s": lambda r: r.get("s")})
+
+    def test_every_group_by(self):
+        """Test all four group-bys, including the grand total"""
+        self.assertEqual(self.cube.group_by(()), {(): 3})
+        self.assertEqual(self.cube.group_by(("dept",)), {("IT",): 2, ("HR",): 1})
+        self.assertEqual(self.cube.group_by(("s", "dept")), {("on", "IT"): 1, ("on", "HR"): 1, ("off", "IT"): 1})
+        self.assertEqual(self.cube.group_by(("s",), {"dept": "IT"}), {("on",): 1, ("off",): 1})
+
+    def test_follows_mutations(self):
+        """Test updates and deletes move counts and empty groups disappear"""
+        self.store.update("B", {"dept": "IT"})
+        self.store.delete("C")
+        self.store.insert({"id": "D", "s": "on"})
+        self.assertEqual(self.cube.group_by(("dept",)), {("IT",): 2, (None,): 1})
+        self.assertEqual(self.cube.group_by(("dept", "s")), {("IT", "on"): 2, (None, "on"): 1})
+
+
+class AssetAnalyticsEndpointTestCase(unittest.TestCase):
+    """Test cases for GET /api/analytics/assets"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def test_matches_full_scan(self):
+        """Test a two-dimensional breakdown equals counting the store directly"""
+        data = json.loads(self.app.get('/api/analytics/assets?groupBy=assetType,purchaseYear').data)
+        expected = Counter((a["assetType"], a["purchaseDate"][:4]) for a in ASSET_DB)
+        self.assertEqual({(g["assetType"], g["purchaseYear"]): g["count"] for g in data["groups"]}, dict(expected))
+        self.assertEqual(data["total"], len(ASSET_DB))
+
+    def test_filters_and_mutations(self):
+        """Test filtering by a dimension and that new assets are counted"""
+        url = '/api/analytics/assets?groupBy=status&department=Engineering'
+        before = json.loads(self.app.get(url).data)["total"]
+        ASSET_DB.insert({"assetId": "AST-CUBE-1", "assetType": "Laptop", "department": "Engineering",
+                         "status": "Active", "purchaseDate": None})
+        self.addCleanup(ASSET_DB.delete, "AST-CUBE-1")
+        data = json.loads(self.app.get(url).data)
+        self.assertEqual(data["total"], before + 1)
+        self.assertEqual(data["filters"], {"department": "Engineering"})
+        unknown = json.loads(self.app.get('/api/analytics/assets?groupBy=department&purchaseYear=Unknown').data)
+        self.assertEqual(unknown["groups"], [{"department": "Engineering", "count": 1}])
+
+    def test_unknown_dimension(self):
+        """Test unknown or repeated dimensions return 400"""
+        self.assertEqual(self.app.get('/api/analytics/assets?groupBy=color').status_code, 400)
+        self.assertEqual(self.app.get('/api/analytics/assets?groupBy=status,status').status_code, 400)
+        self.assertEqual(self.app.get('/api/analytics/assets?owner=x').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
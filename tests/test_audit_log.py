@@ -0,0 +1,108 @@
+import unittest
+import json
+import os
+import tempfile
+from server import app, AuditLog
+
+def entry(i, action="UPDATE"):
+    return {"timestamp": f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}", "userRole": "Admin",
+            "action": action, "details": f"entry {i}"}
+
+class AuditLogTestCase(unittest.TestCase):
+    """Test cases for the bounded, segment-backed audit log"""
+
+    def setUp(self):
+        """Create a temporary segment directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_ring_buffer_is_bounded(self):
+        """Test that memory holds only the newest capacity entries"""
+        log = AuditLog(capacity=5)
+        for i in range(12):
+            log.append(entry(i))
+        self.assertEqual(len(log), 5)
+        self.assertEqual([e["details"] for e in log], [f"entry {i}" for i in range(7, 12)])
+        records, _ = log.query()
+        self.assertEqual(len(records), 5)
+
+    def test_segments_roll_and_serve_evicted_entries(self):
+        """Test that entries evicted from memory are read back from segment files"""
+        log = AuditLog(capacity=4, segment_dir=self.tmp.name, segment_size=10, sparse_every=3)
+        for i in range(35):
+            log.append(entry(i, "DELETE" if i % 5 == 0 else "UPDATE"))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 4)
+        records, last = log.query(since="2024-01-01 00:00:12", until="2024-01-01 00:00:24", action="DELETE")
+        self.assertEqual([r["details"] for r in records], ["entry 15", "entry 20"])
+        self.assertIsNone(last)
+        records, last = log.query(after=3, limit=2)
+        self.assertEqual([r["details"] for r in records], ["entry 4", "entry 5"])
+        self.assertEqual(last, 5)
+        log.close()
+
+    def test_reload_from_segments(self):
+        """Test that a new log instance recovers history and continues numbering"""
+        log = AuditLog(capacity=4, segment_dir=self.tmp.name, segment_size=10)
+        for i in range(15):
+            log.append(entry(i))
+        log.close()
+        reopened = AuditLog(capacity=4, segment_dir=self.tmp.name, segment_size=10)
+        self.assertEqual([e["details"] for e in reopened], [f"entry {i}" for i in range(11, 15)])
+        reopened.append(entry(15))
+        records, _ = reopened.query(after=13)
+        self.assertEqual([r["details"] for r in records], ["entry 14", "entry 15"])
+        self.assertEqual(len(reopened.query()[0]), 16)
+        reopened.close()
+
+    def test_torn_tail_is_truncated_on_reload(self):
+        """Test a partial last line left by a crash is cut off and disk queries still work"""
+        log = AuditLog(capacity=2, segment_dir=self.tmp.name, segment_size=100)
+        for i in range(5):
+            log.append(entry(i))
+        log.close()
+        path = os.path.join(self.tmp.name, "audit-000000000000.jsonl")
+        size = os.path.getsize(path)
+        with open(path, 'ab') as f:
+            f.write(b'{"seq": 5, "timest')
+        reopened = AuditLog(capacity=2, segment_dir=self.tmp.name, segment_size=100)
+        self.assertEqual(os.path.getsize(path), size)
+        reopened.append(entry(5))
+        records, _ = reopened.query()
+        self.assertEqual([r["details"] for r in records], [f"entry {i}" for i in range(6)])
+        reopened.close()
+
+    def test_reader_stops_at_unparsable_line(self):
+        """Test a disk query ends a segment at a line it cannot parse instead of failing"""
+        log = AuditLog(capacity=2, segment_dir=self.tmp.name, segment_size=100)
+        for i in range(5):
+            log.append(entry(i))
+        with open(log._segments[-1].path, 'ab') as f:
+            f.write(b'{"seq": 5, "timest\n')
+        records, _ = log.query()
+        self.assertEqual([r["details"] for r in records], [f"entry {i}" for i in range(5)])
+        log.close()
+
+
+class AuditLogEndpointTestCase(unittest.TestCase):
+    """Test cases for /api/audit-log filters"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def test_action_and_time_filters(self):
+        """Test ?action=, ?since= and ?until= on the audit log endpoint"""
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        data = json.loads(self.app.get('/api/audit-log?action=LOGIN').data)
+        self.assertGreater(len(data), 0)
+        self.assertTrue(all(e['action'] == 'LOGIN' for e in data))
+        data = json.loads(self.app.get('/api/audit-log?until=2000-01-01').data)
+        self.assertEqual(data, [])
+        data = json.loads(self.app.get('/api/audit-log?since=2999-01-01').data)
+        self.assertEqual(data, [])
+
+if __name__ == '__main__':
+    unittest.main()
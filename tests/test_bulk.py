@@ -0,0 +1,71 @@
+import unittest
+import csv
+import io
+import json
+from server import app, ASSET_DB, LICENSE_DB
+
+class BulkImportExportTestCase(unittest.TestCase):
+    """Test cases for bulk import and streaming export"""
+
+    def setUp(self):
+        """Set up test client logged in as IT Staff"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+
+    def test_ndjson_asset_import(self):
+        """Test NDJSON import inserts valid rows and reports invalid ones"""
+        rows = [{"assetId": f"BULK-A-{i}", "assetType": "Laptop", "assignedUser": "Bulk User",
+                 "department": "Sales"} for i in range(5)]
+        body = "\n".join(json.dumps(r) for r in rows) + "\n{not json}\n" + json.dumps({"assetId": "BULK-A-X"})
+        response = self.app.post('/api/assets/bulk', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['imported'], 5)
+        self.assertEqual(data['rejected'], 2)
+        self.assertEqual([e['line'] for e in data['errors']], [6, 7])
+        self.assertEqual(ASSET_DB.get("BULK-A-3")["department"], "Sales")
+        log = json.loads(self.app.get('/api/audit-log?action=BULK_CREATE').data)
+        self.assertIn("Imported 5 assets (2 rejected)", [e['details'] for e in log])
+
+    def test_csv_license_import_with_duplicates(self):
+        """Test CSV import coerces seat counts and rejects duplicate IDs"""
+        body = ("licenseId,softwareName,totalSeats,usedSeats,expiryDate\n"
+                "BULK-L-1,Editor,10,2,2030-01-01\n"
+                "BULK-L-1,Editor,10,2,2030-01-01\n"
+                "BULK-L-2,Viewer,ten,0,\n"
+                "LIC-001,Office,1,1,2030-01-01\n")
+        response = self.app.post('/api/licenses/bulk', data=body, content_type='text/csv')
+        data = json.loads(response.data)
+        self.assertEqual(data['imported'], 1)
+        self.assertEqual(data['rejected'], 3)
+        self.assertEqual(LICENSE_DB.get("BULK-L-1")["totalSeats"], 10)
+        self.assertEqual(LICENSE_DB.get("BULK-L-1")["complianceStatus"], "Compliant")
+
+    def test_import_rejects_unknown_content_type(self):
+        """Test that unsupported bodies return 415"""
+        response = self.app.post('/api/assets/bulk', data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 415)
+
+    def test_exports_stream_every_record(self):
+        """Test CSV and NDJSON exports contain the whole store"""
+        response = self.app.get('/api/assets/export?format=ndjson')
+        self.assertTrue(response.is_streamed)
+        ids = [json.loads(line)['assetId'] for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(ids, [a['assetId'] for a in ASSET_DB])
+        response = self.app.get('/api/licenses/export?format=csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([r['licenseId'] for r in rows], [lic['licenseId'] for lic in LICENSE_DB])
+        self.assertEqual(self.app.get('/api/assets/export?format=xml').status_code, 400)
+
+    def test_bulk_requires_crud_role(self):
+        """Test that employees cannot import or export"""
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': 'employee', 'password': 'emp123'})
+        self.assertEqual(client.post('/api/assets/bulk', data='', content_type='text/csv').status_code, 403)
+        self.assertEqual(client.get('/api/licenses/export').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+import server
+from server import app, KeyedStore, PredicateCounter, SQLiteDatabase, SQLiteStore, VersionConflict, LICENSE_DB
+
+THREADS = 8
+INCREMENTS = 50
+
+def run_threads(target, count=THREADS):
+    """Run target(n) on count threads at once and re-raise the first failure"""
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def run(n):
+        try:
+            barrier.wait()
+            target(n)
+        except Exception as e:  # surfaced below so the test fails instead of hanging
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+def increment_with_retry(store, key, field):
+    """Optimistic read-modify-write: retry on VersionConflict until the write lands"""
+    while True:
+        record = store.get(key)
+        try:
+            return store.update(key, {field: record[field] + 1}, expected_version=record["version"])
+        except VersionConflict:
+            continue
+
+
+class RecordVersionTestCase(unittest.TestCase):
+    """Test cases for per-record versions and conditional writes"""
+
+    def test_versions_and_conflicts(self):
+        """Test versions start at 1, bump on update and guard update and delete"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}], version_field="version")
+        self.assertEqual(store.get("A")["version"], 1)
+        store.update("A", {"n": 1}, expected_version=1)
+        self.assertEqual(store.get("A")["version"], 2)
+        with self.assertRaises(VersionConflict) as caught:
+            store.update("A", {"n": 5}, expected_version=1)
+        self.assertEqual(caught.exception.current, 2)
+        self.assertEqual(store.get("A")["n"], 1)
+        with self.assertRaises(VersionConflict):
+            store.delete("A", expected_version=1)
+        store.delete("A", expected_version=2)
+        self.assertNotIn("A", store)
+
+    def test_sqlite_store_versions(self):
+        """Test the SQLite engine checks versions inside its write transaction"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteStore(SQLiteDatabase(os.path.join(tmp, "iims.db")), "items", "id", [{"id": "A", "n": 0}],
+                                version_field="version")
+            store.update("A", {"n": 1}, expected_version=1)
+            with self.assertRaises(VersionConflict):
+                store.update("A", {"n": 2}, expected_version=1)
+            self.assertEqual(store.get("A"), {"id": "A", "n": 1, "version": 2})
+
+
+class ConcurrencyStressTestCase(unittest.TestCase):
+    """Stress tests for concurrent writers"""
+
+    def test_no_lost_updates_on_one_record(self):
+        """Test optimistic retries never lose an increment of a contended record"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}], version_field="version")
+        run_threads(lambda n: [increment_with_retry(store, "A", "n") for _ in range(INCREMENTS)])
+        self.assertEqual(store.get("A")["n"], THREADS * INCREMENTS)
+        self.assertEqual(store.get("A")["version"], THREADS * INCREMENTS + 1)
+
+    def test_readers_never_see_torn_records(self):
+        """Test an update swaps in a new record and never changes one a reader already holds"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}], indexes=("n",), version_field="version")
+        seen = []
+        store.subscribe(lambda old, new: seen.append((old, new)))
+        before = store.get("A")
+        after = store.update("A", {"n": 1}, expected_version=1)
+        self.assertEqual((before["n"], before["version"]), (0, 1))
+        self.assertEqual((after["n"], after["version"]), (1, 2))
+        self.assertIs(store.get("A"), after)
+        self.assertEqual(seen[-1], (before, after))
+        self.assertEqual(store.find({"n": 1}), [after])
+
+    def test_writers_to_different_records_with_readers(self):
+        """Test concurrent writers keep indexes and order consistent while readers page"""
+        store = KeyedStore("id", [{"id": f"R{i}", "dept": "A"} for i in range(THREADS * 10)],
+                           indexes=("dept",), version_field="version")
+
+        def work(n):
+            if n == 0:
+                for _ in range(200):
+                    store.page(None, 25)
+                    store.find({"dept": "B"})
+                return
+            for i in range(n * 10, n * 10 + 10):
+                key = f"R{i}"
+                for step in range(20):
+                    store.update(key, {"dept": "B" if step % 2 == 0 else "A"})
+                store.delete(key)
+                store.insert({"id": key, "dept": "B"})
+        run_threads(work)
+        self.assertEqual(store.count_by("dept"), {"A": 10, "B": (THREADS - 1) * 10})
+        self.assertEqual([r["id"] for r in store.find({"dept": "B"})], [r["id"] for r in store if r["dept"] == "B"])
+        self.assertEqual(len(store.page(None, None)[0]), THREADS * 10)
+
+    def test_writer_does_not_wait_for_other_records(self):
+        """Test a writer holding one record's stripe does not block a write to another record"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}], version_field="version")
+        other = next(f"B{i}" for i in range(1000) if store._stripe(f"B{i}") is not store._stripe("A"))
+        store.insert({"id": other, "n": 0})
+        done = threading.Event()
+        with store._stripe("A"):
+            threading.Thread(target=lambda: (store.update(other, {"n": 1}), done.set())).start()
+            self.assertTrue(done.wait(5))
+
+    def test_listeners_run_outside_store_lock(self):
+        """Test a write to another record is applied while a slow listener is still running"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}, {"id": "B", "n": 0}], indexes=("n",), version_field="version")
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_listener(old, new):
+            if old is not None and new["id"] == "A":
+                entered.set()
+                release.wait(5)
+        store.subscribe(slow_listener)
+        version = store.version
+        writers = [threading.Thread(target=store.update, args=(key, {"n": 1})) for key in ("A", "B")]
+        writers[0].start()
+        self.assertTrue(entered.wait(5))
+        writers[1].start()
+        try:
+            for _ in range(500):
+                if store.get("B")["n"] == 1:
+                    break
+                time.sleep(0.01)
+            self.assertEqual((store.get("B")["n"], store.count_by("n")), (1, {1: 2}))
+            self.assertEqual(store.version, version)
+        finally:
+            release.set()
+            for t in writers:
+                t.join()
+        self.assertEqual(store.version, version + 2)
+
+    def test_stripe_released_before_listeners_run(self):
+        """Test a record's next write is applied while listeners still handle its previous one"""
+        store = KeyedStore("id", [{"id": "A", "n": 0}], version_field="version")
+        entered, release = threading.Event(), threading.Event()
+        seen = []
+
+        def slow_listener(old, new):
+            if old is not None:
+                seen.append(new["n"])
+                if new["n"] == 1:
+                    entered.set()
+                    release.wait(5)
+        store.subscribe(slow_listener)
+        first = threading.Thread(target=store.update, args=("A", {"n": 1}))
+        first.start()
+        self.assertTrue(entered.wait(5))
+        second = threading.Thread(target=store.update, args=("A", {"n": 2}), kwargs={"expected_version": 2})
+        second.start()
+        try:
+            for _ in range(500):
+                if store.get("A")["n"] == 2:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(store.get("A")["version"], 3)
+            self.assertEqual(seen, [1])
+        finally:
+            release.set()
+            first.join()
+            second.join()
+        self.assertEqual(seen, [1, 2])
+
+    def test_subscribe_during_writes_sees_each_change_once(self):
+        """Test a listener subscribed while writers run ends up matching the store exactly"""
+        store = KeyedStore("id", [{"id": f"R{i}", "dept": "A"} for i in range(THREADS * 10)], version_field="version")
+        counters = []
+
+        def work(n):
+            if n == 0:
+                for _ in range(20):
+                    counters.append(PredicateCounter(store, lambda r: r["dept"] == "B"))
+                return
+            for i in range(n * 10, n * 10 + 10):
+                for step in range(10):
+                    store.update(f"R{i}", {"dept": "B" if step % 2 == 0 else "A"})
+        run_threads(work)
+        self.assertEqual({counter.count for counter in counters}, {0})
+
+
+class ConditionalUpdateEndpointTestCase(unittest.TestCase):
+    """Conditional license writes through the API (assets share the same code path)"""
+
+    def setUp(self):
+        """Log in as IT Staff and restore the license touched by each test"""
+        self.app = app.test_client()
+        self.app.testing = True
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        self.license = dict(LICENSE_DB.all()[0])
+        self.addCleanup(LICENSE_DB.update, self.license['licenseId'], self.license)
+
+    def post(self, client=None, headers=None, **body):
+        """POST a license action"""
+        response = (client or self.app).post('/api/licenses', json=body, headers=headers)
+        return response.status_code, json.loads(response.data)
+
+    def test_expected_version_and_if_match(self):
+        """Test stale writes get 409 (expectedVersion) or 412 (If-Match) and current writes succeed"""
+        license_id, version = self.license['licenseId'], LICENSE_DB.get(self.license['licenseId'])['version']
+        response = self.app.post('/api/licenses', json={'action': 'update', 'licenseId': license_id,
+                                                        'usedSeats': 1, 'expectedVersion': version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], f'"{version + 1}"')
+        status, data = self.post(action='update', licenseId=license_id, usedSeats=2, expectedVersion=version)
+        self.assertEqual((status, data['currentVersion']), (409, version + 1))
+        status, _ = self.post(headers={'If-Match': f'"{version}"'}, action='update', licenseId=license_id, usedSeats=2)
+        self.assertEqual(status, 412)
+        status, data = self.post(headers={'If-Match': f'"{version + 1}"'}, action='update', licenseId=license_id,
+                                 usedSeats=2)
+        self.assertEqual((status, data['usedSeats']), (200, 2))
+        status, _ = self.post(action='update', licenseId=license_id, expectedVersion="2")
+        self.assertEqual(status, 400)
+
+    def test_partial_update_keeps_concurrent_edit(self):
+        """Test updating one field leaves a field changed by another user intact"""
+        license_id = self.license['licenseId']
+        self.post(action='update', licenseId=license_id, softwareName='Renamed')
+        self.post(action='update', licenseId=license_id, usedSeats=3)
+        record = LICENSE_DB.get(license_id)
+        self.assertEqual((record['softwareName'], record['usedSeats']), ('Renamed', 3))
+
+    def test_concurrent_api_increments(self):
+        """Test clients retrying on 409 never lose a seat increment"""
+        license_id = self.license['licenseId']
+        start = LICENSE_DB.get(license_id)['usedSeats']
+
+        def client_work(n):
+            client = app.test_client()
+            client.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+            for _ in range(10):
+                while True:
+                    record = LICENSE_DB.get(license_id)
+                    status, _ = self.post(client, action='update', licenseId=license_id,
+                                          usedSeats=record['usedSeats'] + 1, expectedVersion=record['version'])
+                    if status == 200:
+                        break
+                    self.assertEqual(status, 409)
+        run_threads(client_work)
+        self.assertEqual(LICENSE_DB.get(license_id)['usedSeats'], start + THREADS * 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import json
+from server import app, KeyedStore
+
+class ETagTestCase(unittest.TestCase):
+    """Test cases for version-based ETags on polled endpoints"""
+
+    def setUp(self):
+        """Set up test client logged in as IT Staff"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+
+    def revalidate(self, url):
+        first = self.app.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        return etag, self.app.get(url, headers={'If-None-Match': etag})
+
+    def test_unchanged_endpoints_return_304(self):
+        """Test that polling with a matching ETag returns 304 and no body"""
+        for url in ('/api/dashboard/metrics', '/api/integrations/status',
+                    '/api/analytics/assets-by-department', '/api/monitoring/hardware',
+                    '/api/monitoring/network', '/api/monitoring/backup', '/api/licenses'):
+            etag, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+
+    def test_mutation_changes_etag(self):
+        """Test that creating an asset invalidates dashboard and analytics ETags"""
+        dashboard_etag, _ = self.revalidate('/api/dashboard/metrics')
+        analytics_etag, _ = self.revalidate('/api/analytics/assets-by-department')
+        self.app.post('/api/assets', json={'action': 'create', 'assetId': 'ETAG-001', 'assetType': 'Laptop'})
+        response = self.app.get('/api/dashboard/metrics', headers={'If-None-Match': dashboard_etag})
+        self.assertEqual(response.status_code, 200)
+        response = self.app.get('/api/analytics/assets-by-department', headers={'If-None-Match': analytics_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('IT', json.loads(response.data))
+
+    def test_asset_etag_depends_on_viewer(self):
+        """Test that an employee cannot revalidate against an admin's cached asset list"""
+        etag, _ = self.revalidate('/api/assets')
+        employee = app.test_client()
+        employee.post('/api/auth/login', json={'username': 'employee', 'password': 'emp123'})
+        response = employee.get('/api/assets', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_store_version_bumps(self):
+        """Test that every mutation bumps the store version"""
+        store = KeyedStore("id", [{"id": "A"}])
+        versions = [store.version]
+        store.insert({"id": "B"})
+        versions.append(store.version)
+        store.update("A", {"x": 1})
+        versions.append(store.version)
+        store.delete("B")
+        versions.append(store.version)
+        self.assertEqual(versions, sorted(set(versions)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import json
+import threading
+from server import app, EventBus, DebouncedPublisher, HEALTH_DB, BACKUP_DB
+
+class EventBusTestCase(unittest.TestCase):
+    """Test cases for the in-process publish/subscribe bus"""
+
+    def test_topic_routing(self):
+        """Test subscribers only receive their topics"""
+        bus = EventBus()
+        sub = bus.subscribe({"hardware"})
+        bus.publish("network", {"x": 1})
+        bus.publish("hardware", {"x": 2})
+        self.assertEqual(sub.get(timeout=0), ("hardware", {"x": 2}))
+        self.assertIsNone(sub.get(timeout=0))
+        bus.unsubscribe(sub)
+        self.assertFalse(bus.has_subscribers("hardware"))
+
+    def test_overflow_sends_resync(self):
+        """Test a slow subscriber is told to resync instead of blocking publishers"""
+        bus = EventBus(max_queue=2)
+        sub = bus.subscribe({"backup"})
+        for i in range(3):
+            bus.publish("backup", {"i": i})
+        self.assertEqual(sub.get(timeout=0)[0], "resync")
+
+    def test_has_subscribers_during_churn(self):
+        """Test checking for subscribers is safe while clients connect and disconnect"""
+        bus = EventBus()
+        for _ in range(200):
+            bus.subscribe({"network"})
+        stop, errors = threading.Event(), []
+
+        def churn():
+            while not stop.is_set():
+                bus.unsubscribe(bus.subscribe({"hardware"}))
+        thread = threading.Thread(target=churn)
+        thread.start()
+        try:
+            for _ in range(5000):
+                bus.has_subscribers("dashboard")
+        except RuntimeError as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_debounced_publisher_coalesces_changes(self):
+        """Test a burst of marked changes is published once, and only with a subscriber"""
+        bus = EventBus()
+        builds = []
+        publisher = DebouncedPublisher(bus, "dashboard", lambda: builds.append(1) or {"n": len(builds)}, interval=0.05)
+        publisher.mark()
+        self.assertIsNone(publisher._thread)
+        sub = bus.subscribe({"dashboard"})
+        for _ in range(100):
+            publisher.mark()
+        self.assertEqual(sub.get(timeout=5), ("dashboard", {"n": 1}))
+        self.assertIsNone(sub.get(timeout=0.2))
+        self.assertEqual(len(builds), 1)
+
+
+class EventStreamTestCase(unittest.TestCase):
+    """Test cases for the /api/events SSE endpoint"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def open_stream(self, url):
+        response = self.app.get(url, buffered=False)
+        self.addCleanup(response.close)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b"retry: 5000\n\n")
+        return chunks
+
+    def test_store_mutation_is_pushed(self):
+        """Test hardware updates and the resulting dashboard change are pushed"""
+        chunks = self.open_stream('/api/events?topics=hardware,dashboard')
+        device = HEALTH_DB.all()[1]
+        device = HEALTH_DB.update(device["deviceId"], {"cpuLoad": device["cpuLoad"] + 1})
+        event = next(chunks).decode()
+        self.assertTrue(event.startswith("event: hardware\n"))
+        data = json.loads(event.split("data: ", 1)[1])
+        self.assertEqual(data, {"op": "update", "key": device["deviceId"], "changes": {"cpuLoad": device["cpuLoad"]}})
+        self.assertTrue(next(chunks).decode().startswith("event: dashboard\n"))
+
+    def test_heartbeat(self):
+        """Test an idle stream sends heartbeat comments"""
+        import server
+        original = server.SSE_HEARTBEAT_SECONDS
+        server.SSE_HEARTBEAT_SECONDS = 0.01
+        self.addCleanup(setattr, server, 'SSE_HEARTBEAT_SECONDS', original)
+        chunks = self.open_stream('/api/events?topics=network')
+        self.assertEqual(next(chunks), b": heartbeat\n\n")
+
+    def test_backup_verification_is_pushed(self):
+        """Test backup verification publishes a summary event"""
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123', 'mfaCode': '123456'})
+        response = client.get('/api/events?topics=backup', buffered=False)
+        self.addCleanup(response.close)
+        chunks = iter(response.response)
+        next(chunks)
+        statuses = {job["jobId"]: job["status"] for job in BACKUP_DB}
+        self.addCleanup(lambda: [BACKUP_DB.update(k, {"status": v}) for k, v in statuses.items()])
+        failed = [k for k, v in statuses.items() if v in ("Failure", "Missed")]
+        client.post('/api/monitoring/backup/verify')
+        events = [next(chunks).decode() for _ in range(len(failed) + 1)]
+        self.assertTrue(all('"op": "update"' in e for e in events[:-1]))
+        data = json.loads(events[-1].split("data: ", 1)[1])
+        self.assertEqual((data["op"], data["verifiedJobs"]), ("verified", len(failed)))
+        self.assertEqual(sorted(data["jobIds"]), sorted(failed))
+
+    def test_warranty_expirations_hidden_from_other_roles(self):
+        """Test warranty expiry notices reach Admin/IT Staff streams only, like /api/expirations"""
+        import server
+        notices = [{"kind": "warranty", "id": "AST-001"}, {"kind": "license", "id": "LIC-001"}]
+        for login, kinds in ((None, ["license"]), ({'username': 'itstaff', 'password': 'it123'},
+                                                   ["warranty", "license"])):
+            client = app.test_client()
+            if login:
+                client.post('/api/auth/login', json=login)
+            response = client.get('/api/events?topics=expirations', buffered=False)
+            chunks = iter(response.response)
+            next(chunks)
+            for notice in notices:
+                server.EVENT_BUS.publish("expirations", notice)
+            self.assertEqual([json.loads(next(chunks).decode().split("data: ", 1)[1])["kind"] for _ in kinds], kinds)
+            response.close()
+
+    def test_topic_validation(self):
+        """Test unknown topics and restricted topics are rejected"""
+        self.assertEqual(self.app.get('/api/events?topics=nope').status_code, 400)
+        self.assertEqual(self.app.get('/api/events?topics=assets').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
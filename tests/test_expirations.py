@@ -0,0 +1,127 @@
+import unittest
+import json
+from datetime import date, timedelta
+from server import app, ExpiryScheduler, KeyedStore, SortedDateIndex, LICENSE_DB
+
+TODAY = date(2024, 1, 1)
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+class ExpirySchedulerTestCase(unittest.TestCase):
+    """Test cases for heap-scheduled expiry notifications"""
+
+    def setUp(self):
+        """Track a small license store"""
+        self.sent = []
+        self.store = KeyedStore("id", [{"id": "A", "expires": day(100)}, {"id": "B", "expires": day(20)},
+                                       {"id": "C", "expires": None}])
+        self.scheduler = ExpiryScheduler(notify=self.sent.append)
+        self.scheduler.track("license", self.store, "expires")
+
+    def notices(self, offset):
+        return [(n["id"], n["threshold"]) for n in self.scheduler.tick(TODAY + timedelta(days=offset))]
+
+    def test_each_threshold_fires_once(self):
+        """Test notifications fire as each threshold is crossed and never repeat"""
+        self.assertEqual(self.notices(0), [("B", 30)])
+        self.assertEqual(self.notices(0), [])
+        self.assertEqual(self.notices(10), [("A", 90)])
+        self.assertEqual(self.notices(13), [("B", 7)])
+        self.assertEqual(self.notices(20), [("B", 0)])
+        self.assertEqual(self.notices(69), [])
+        self.assertEqual(self.notices(70), [("A", 30)])
+        self.assertEqual(len(self.sent), 5)
+
+    def test_catch_up_sends_only_tightest(self):
+        """Test a long gap between ticks sends one notification at the tightest threshold"""
+        self.assertEqual(self.notices(95), [("B", 0), ("A", 7)])
+        self.assertEqual(self.sent[0]["daysLeft"], -75)
+
+    def test_date_changes_reschedule(self):
+        """Test renewing or clearing a date drops the old schedule"""
+        self.assertEqual(self.notices(0), [("B", 30)])
+        self.store.update("B", {"expires": day(400)})
+        self.store.update("A", {"expires": None})
+        self.assertEqual(self.notices(50), [])
+        self.assertEqual(self.notices(310), [("B", 90)])
+        self.store.delete("B")
+        self.assertEqual(self.notices(400), [])
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_sent_notices_survive_restart(self):
+        """Test a restarted scheduler does not resend notices, unless the date changed meanwhile"""
+        notices = KeyedStore("id", version_field="version")
+        first = ExpiryScheduler(notices=notices)
+        first.track("license", self.store, "expires")
+        self.assertEqual([n["id"] for n in first.tick(TODAY + timedelta(days=10))], ["B", "A"])
+        self.store.update("A", {"expires": day(300)})
+        self.assertEqual([n["id"] for n in notices], ["license:B"])
+
+        restarted = ExpiryScheduler(notices=notices)
+        restarted.track("license", self.store, "expires")
+        self.assertEqual(restarted.tick(TODAY + timedelta(days=10)), [])
+        self.assertEqual([(n["id"], n["threshold"]) for n in restarted.tick(TODAY + timedelta(days=13))],
+                         [("B", 7)])
+        self.assertEqual(notices.get("license:B")["threshold"], 7)
+
+    def test_workers_sharing_notices_send_each_once(self):
+        """Test schedulers in several workers sharing one notices store send each notice once"""
+        notices = KeyedStore("id", version_field="version")
+        workers = [ExpiryScheduler(notices=notices) for _ in range(3)]
+        for worker in workers:
+            worker.track("license", self.store, "expires")
+        sent = [(n["id"], n["threshold"]) for worker in workers for n in worker.tick(TODAY + timedelta(days=10))]
+        self.assertEqual(sorted(sent), [("A", 90), ("B", 30)])
+        sent = [(n["id"], n["threshold"]) for worker in workers for n in worker.tick(TODAY + timedelta(days=13))]
+        self.assertEqual(sent, [("B", 7)])
+        self.assertEqual(notices.get("license:B")["threshold"], 7)
+
+    def test_sorted_index_range(self):
+        """Test the date index lists records in a date range"""
+        index = SortedDateIndex(self.store, "expires")
+        self.assertEqual([key for _, key in index.between(TODAY, TODAY + timedelta(days=30))], ["B"])
+        self.assertEqual([key for _, key in index.between(None, TODAY + timedelta(days=365))], ["B", "A"])
+        self.store.update("A", {"expires": day(5)})
+        self.assertEqual([key for _, key in index.between(TODAY, TODAY + timedelta(days=30))], ["A", "B"])
+
+
+class ExpirationsEndpointTestCase(unittest.TestCase):
+    """Test cases for GET /api/expirations"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def test_within_window(self):
+        """Test licenses are listed earliest first within the requested window"""
+        soon = (date.today() + timedelta(days=3)).isoformat()
+        LICENSE_DB.insert({"licenseId": "LIC-EXP-001", "softwareName": "Soon", "expiryDate": soon})
+        self.addCleanup(LICENSE_DB.delete, "LIC-EXP-001")
+        data = json.loads(self.app.get('/api/expirations?within=5').data)
+        self.assertIn({"kind": "license", "id": "LIC-EXP-001", "name": "Soon", "expiryDate": soon, "daysLeft": 3},
+                      data)
+        self.assertTrue(all(0 <= item["daysLeft"] <= 5 for item in data))
+        everything = json.loads(self.app.get('/api/expirations?within=3650&expired=true').data)
+        self.assertEqual(len(everything), sum(1 for lic in LICENSE_DB if lic["expiryDate"]))
+        self.assertEqual([i["expiryDate"] for i in everything], sorted(i["expiryDate"] for i in everything))
+
+    def test_warranties_require_staff(self):
+        """Test asset warranties are only listed for Admin/IT Staff"""
+        self.assertEqual(self.app.get('/api/expirations?kind=warranty').status_code, 403)
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        data = json.loads(self.app.get('/api/expirations?kind=warranty&within=3650&expired=true').data)
+        self.assertTrue(data)
+        self.assertEqual({item["kind"] for item in data}, {"warranty"})
+
+    def test_bad_parameters(self):
+        """Test invalid within and kind values return 400"""
+        self.assertEqual(self.app.get('/api/expirations?within=soon').status_code, 400)
+        self.assertEqual(self.app.get('/api/expirations?within=-1').status_code, 400)
+        self.assertEqual(self.app.get('/api/expirations?kind=domain').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,11 +9,9 @@ class IIMSIntegrationTestCase(unittest.TestCase):
         """Set up test client"""
         self.app = app.test_client()
         self.app.testing = True
-        # Reset authentication state before each test
+        # Reset server-side sessions before each test
         import server
-        server.current_role = None
-        server.current_user = None
-        server.is_authenticated = False
+        server.SESSIONS.clear()
     
     def test_full_workflow(self):
         """Test complete workflow: login -> get data -> logout"""
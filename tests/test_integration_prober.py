@@ -0,0 +1,97 @@
+import unittest
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from server import app, IntegrationProber
+
+# /slow answers this long after the request, far past the 0.2 s probe timeout
+SLOW_SECONDS = 2.0
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Health endpoint stub: /ok answers 200, /error 503, /slow sleeps past the probe timeout"""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(SLOW_SECONDS)
+        try:
+            self.send_response(503 if self.path == "/error" else 200)
+            self.end_headers()
+            self.wfile.write(b"{}")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the prober timed out and closed the connection
+
+    def log_message(self, *args):
+        pass
+
+
+class IntegrationProberTestCase(unittest.TestCase):
+    """Test cases for the integration prober against local stub servers"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a stub health server"""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Probe three stub targets with a controllable clock"""
+        self.now = 1000.0
+        self.status = {key: {"name": key, "status": "Unknown", "lastCheck": None}
+                       for key in ("ok", "error", "slow", "unconfigured")}
+        self.prober = IntegrationProber(self.status, {
+            "ok": f"{self.base}/ok", "error": f"{self.base}/error", "slow": f"{self.base}/slow", "unconfigured": None
+        }, interval=10, timeout=0.2, failure_threshold=3, max_backoff=40, clock=lambda: self.now)
+
+    def test_probes_run_concurrently_with_timeouts(self):
+        """Test one round probes every target at once and classifies the outcomes"""
+        start = time.perf_counter()
+        self.assertEqual(sorted(self.prober.run_once()), ["error", "ok", "slow"])
+        self.assertLess(time.perf_counter() - start, SLOW_SECONDS * 0.75)
+        self.assertEqual(self.status["ok"]["status"], "Active")
+        self.assertEqual((self.status["error"]["status"], self.status["error"]["error"]), ("Degraded", "HTTP 503"))
+        self.assertEqual(self.status["slow"]["status"], "Degraded")
+        self.assertEqual(self.status["unconfigured"]["status"], "Unknown")
+        self.assertEqual(self.prober.version, 3)
+
+    def test_backoff_and_circuit_breaker(self):
+        """Test failures back off exponentially and open the circuit, and a success closes it"""
+        self.prober = IntegrationProber(self.status, {"error": f"{self.base}/error"}, interval=10, timeout=0.2,
+                                        failure_threshold=3, max_backoff=40, clock=lambda: self.now)
+        due_times = []
+        for _ in range(4):
+            self.assertEqual(self.prober.run_once(), ["error"])
+            due_times.append(self.prober._state["error"]["nextCheck"] - self.now)
+            self.now += due_times[-1]
+        self.assertEqual(due_times, [10, 20, 40, 40])
+        self.assertEqual((self.status["error"]["status"], self.status["error"]["circuit"]), ("Inactive", "open"))
+        self.now -= 1
+        self.assertEqual(self.prober.run_once(), [])
+
+        self.prober.urls["error"] = f"{self.base}/ok"
+        self.now += 1
+        self.assertEqual(self.prober.run_once(), ["error"])
+        self.assertEqual((self.status["error"]["status"], self.status["error"]["circuit"]), ("Active", "closed"))
+        self.assertEqual(self.status["error"]["consecutiveFailures"], 0)
+
+    def test_status_endpoint_served_from_cache(self):
+        """Test /api/integrations/status reflects probe results and changes its ETag"""
+        import server
+        client = app.test_client()
+        first = client.get('/api/integrations/status')
+        original = server.INTEGRATION_PROBER
+        server.INTEGRATION_PROBER = self.prober
+        self.addCleanup(setattr, server, 'INTEGRATION_PROBER', original)
+        self.prober.run_once()
+        response = client.get('/api/integrations/status', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["ok"]["status"], "Active")
+
+if __name__ == '__main__':
+    unittest.main()
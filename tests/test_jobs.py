@@ -0,0 +1,112 @@
+import unittest
+import json
+import threading
+from server import app, JobRunner, BACKUP_DB
+
+class JobRunnerTestCase(unittest.TestCase):
+    """Test cases for the bounded background job runner"""
+
+    def setUp(self):
+        """Create a single-worker runner"""
+        self.runner = JobRunner(max_workers=1, max_active=2, history=2)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def blocking(self, job):
+        job.total = 1
+        self.release.wait(5)
+        job.advance("ok")
+
+    def test_progress_and_success(self):
+        """Test a job reports progress and results once finished"""
+        job = self.runner.submit("test", "admin", self.blocking)
+        self.assertIn(job.status, ("queued", "running"))
+        self.release.set()
+        self.assertTrue(job.wait(5))
+        data = job.to_dict()
+        self.assertEqual((data["status"], data["progress"], data["results"]), ("succeeded", {"done": 1, "total": 1}, ["ok"]))
+
+    def test_bounded_and_cancel_queued(self):
+        """Test the runner refuses work when full and a queued job can be cancelled before it starts"""
+        running = self.runner.submit("test", "admin", self.blocking)
+        queued = self.runner.submit("test", "admin", self.blocking)
+        with self.assertRaises(RuntimeError):
+            self.runner.submit("test", "admin", self.blocking)
+        queued.cancel()
+        self.release.set()
+        self.assertTrue(queued.wait(5))
+        self.assertEqual((running.wait(5), running.status), (True, "succeeded"))
+        self.assertEqual((queued.status, queued.results), ("cancelled", []))
+
+    def test_failure_recorded(self):
+        """Test an exception marks the job failed with its message"""
+        def broken(job):
+            raise OSError("target unreachable")
+        job = self.runner.submit("test", "admin", broken)
+        self.assertTrue(job.wait(5))
+        self.assertEqual((job.status, job.error), ("failed", "target unreachable"))
+
+    def test_finished_jobs_are_pruned(self):
+        """Test only the most recent finished jobs are kept"""
+        self.release.set()
+        jobs = [self.runner.submit("test", "admin", self.blocking) for _ in range(2)]
+        for job in jobs:
+            job.wait(5)
+        latest = self.runner.submit("test", "admin", self.blocking)
+        latest.wait(5)
+        self.assertIsNone(self.runner.get(jobs[0].id))
+        self.assertIs(self.runner.get(latest.id), latest)
+
+
+class BackupVerifyJobTestCase(unittest.TestCase):
+    """Test cases for backup verification as a background job"""
+
+    def setUp(self):
+        """Log in as Admin and restore backup statuses afterwards"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123', 'mfaCode': '123456'})
+        statuses = {job["jobId"]: job["status"] for job in BACKUP_DB}
+        self.addCleanup(lambda: [BACKUP_DB.update(k, {"status": v}) for k, v in statuses.items()])
+        self.failed = sorted(k for k, v in statuses.items() if v in ("Failure", "Missed"))
+        self.previous = statuses
+
+    def test_verification_job_updates_store(self):
+        """Test the job moves every failed backup to 'Under Investigation' and records the previous status"""
+        import server
+        data = json.loads(self.app.post('/api/monitoring/backup/verify').data)
+        self.assertTrue(server.JOB_RUNNER.get(data["jobId"]).wait(5))
+        job = json.loads(self.app.get(f'/api/jobs/{data["jobId"]}').data)
+        self.assertEqual(sorted(r["jobId"] for r in job["results"]), self.failed)
+        for result in job["results"]:
+            self.assertEqual(result["previousStatus"], self.previous[result["jobId"]])
+            self.assertEqual(BACKUP_DB.get(result["jobId"])["status"], "Under Investigation")
+
+    def test_cancel_running_job(self):
+        """Test cancelling stops a slow verification and finished jobs cannot be cancelled again"""
+        import server
+        original = server.BACKUP_VERIFY_SECONDS
+        server.BACKUP_VERIFY_SECONDS = 0.2
+        self.addCleanup(setattr, server, 'BACKUP_VERIFY_SECONDS', original)
+        original_concurrency = server.BACKUP_VERIFY_CONCURRENCY
+        server.BACKUP_VERIFY_CONCURRENCY = 1
+        self.addCleanup(setattr, server, 'BACKUP_VERIFY_CONCURRENCY', original_concurrency)
+        job_id = json.loads(self.app.post('/api/monitoring/backup/verify').data)["jobId"]
+        response = self.app.post(f'/api/jobs/{job_id}/cancel')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(server.JOB_RUNNER.get(job_id).wait(5))
+        job = json.loads(self.app.get(f'/api/jobs/{job_id}').data)
+        self.assertEqual(job["status"], "cancelled")
+        self.assertLess(job["progress"]["done"], len(self.failed))
+        self.assertEqual(self.app.post(f'/api/jobs/{job_id}/cancel').status_code, 409)
+
+    def test_job_endpoints_require_staff(self):
+        """Test job polling requires Admin/IT Staff and unknown jobs return 404"""
+        self.assertEqual(self.app.get('/api/jobs/nope').status_code, 404)
+        self.assertEqual(self.app.post('/api/jobs/nope/cancel').status_code, 404)
+        self.assertEqual(app.test_client().get('/api/jobs/nope').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import os
+import tempfile
+import threading
+from server import StoreJournal, WriteAheadLog, KeyedStore, AuditLog, AssetRecord
+
+SEED = [{"assetId": f"A{i}", "status": "Active", "purchaseDate": "2024-01-01"} for i in range(3)]
+
+class StoreJournalTestCase(unittest.TestCase):
+    """Test cases for snapshot + write-ahead log persistence"""
+
+    def setUp(self):
+        """Use a temporary journal directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = self.tmp.name
+
+    def open(self, compact_every=1000):
+        """Open a journal with one attached asset table, as server.py wires them up"""
+        journal = StoreJournal(self.dir, compact_every=compact_every, sync_interval=60)
+        store = KeyedStore("assetId", journal.restored("assets", SEED), indexes=("status",),
+                           record_type=AssetRecord)
+        journal.attach("assets", store)
+        audit = AuditLog(capacity=5)
+        journal.attach_audit(audit)
+        journal.start()
+        self.addCleanup(journal.close)
+        return journal, store, audit
+
+    def test_recovers_mutations_in_order(self):
+        """Test seeds, inserts, updates, deletes and audit entries survive a restart"""
+        journal, store, audit = self.open()
+        self.assertFalse(journal.recovered)
+        store.insert({"assetId": "A9", "status": "Active"})
+        store.update("A1", {"status": "Retired"})
+        store.delete("A0")
+        store.insert({"assetId": "A0", "status": "In Repair"})
+        journal.log_audit({"action": "UPDATE", "details": "x"})
+        journal.commit()
+        journal.close()
+
+        journal, store, audit = self.open()
+        self.assertTrue(journal.recovered)
+        self.assertEqual([r["assetId"] for r in store], ["A1", "A2", "A9", "A0"])
+        self.assertEqual(store.get("A1")["status"], "Retired")
+        self.assertEqual(store.get("A2")["purchaseDate"], "2024-01-01")
+        self.assertEqual(store.count_by("status"), {"Active": 2, "Retired": 1, "In Repair": 1})
+        self.assertEqual([e["action"] for e in audit], ["UPDATE"])
+
+    def test_compaction_replaces_old_logs(self):
+        """Test a snapshot supersedes older logs and later writes replay on top of it"""
+        journal, store, _ = self.open()
+        for i in range(20):
+            store.update("A2", {"status": f"S{i}"})
+        journal.compact()
+        store.delete("A1")
+        journal.commit()
+        self.assertEqual(sorted(os.listdir(self.dir)), ["LOCK", "snapshot-00000002.bin", "wal-00000003.log"])
+        journal.close()
+        _, store, _ = self.open()
+        self.assertEqual([r["assetId"] for r in store], ["A0", "A2"])
+        self.assertEqual(store.get("A2")["status"], "S19")
+
+    def test_audit_during_compaction_recovers_once(self):
+        """Test an audit entry logged while the snapshot copies the tables is not replayed twice"""
+        journal, store, audit = self.open()
+        copy_rows = store.all
+
+        def all_while_auditing():
+            journal.log_audit({"action": "SYSTEM", "details": "during compaction"})
+            return copy_rows()
+        store.all = all_while_auditing
+        journal.compact()
+        journal.commit()
+        journal.close()
+        _, _, audit = self.open()
+        self.assertEqual([e["details"] for e in audit], ["during compaction"])
+
+    def test_compacts_automatically(self):
+        """Test a compaction is started once compact_every entries have been logged"""
+        journal, store, _ = self.open(compact_every=10)
+        for i in range(10):
+            store.insert({"assetId": f"B{i}"})
+        compactor = journal._compactor
+        if compactor is not None:
+            compactor.join()
+        self.assertEqual(len([n for n in os.listdir(self.dir) if n.startswith("snapshot-")]), 1)
+        self.assertIn("snapshot-00000002.bin", os.listdir(self.dir))
+        journal.close()
+        self.assertEqual(len(self.open()[1]), 13)
+
+    def test_directory_is_locked(self):
+        """Test a second journal cannot open a directory in use until the first is closed"""
+        journal, _, _ = self.open()
+        with self.assertRaises(RuntimeError):
+            StoreJournal(self.dir)
+        journal.close()
+        self.open()
+
+    def test_torn_tail_is_ignored(self):
+        """Test a partially written final entry is dropped on recovery"""
+        journal, store, _ = self.open()
+        store.insert({"assetId": "A7"})
+        journal.commit()
+        journal.close()
+        with open(journal._wal.path, 'ab') as f:
+            f.write(WriteAheadLog.HEADER.pack(100, 0) + b"partial")
+        _, store, _ = self.open()
+        self.assertIn("A7", store)
+
+    def test_group_commit_shares_fsyncs(self):
+        """Test concurrent committers are all made durable, never with more fsyncs than commits"""
+        journal, store, _ = self.open(compact_every=10 ** 6)
+
+        def writer(n):
+            for i in range(50):
+                store.insert({"assetId": f"T{n}-{i}"})
+                journal.commit()
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wal = journal._wal
+        self.assertEqual(wal.durable, wal.appended)
+        self.assertLessEqual(wal.syncs, 400)
+        journal.close()
+        self.assertEqual(len(list(WriteAheadLog.read(wal.path))), 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest import mock
+import server
+from server import (app, ASSET_DB, JSON_CACHES, EncodedRecordCache, KeyedStore, AssetRecord, encode_json,
+                    SQLiteDatabase, SQLiteStore)
+
+class EncodedRecordCacheTestCase(unittest.TestCase):
+    """Test cases for cached per-record JSON encodings"""
+
+    def setUp(self):
+        """Create a small typed store and its cache"""
+        self.store = KeyedStore("assetId", [{"assetId": f"A{i}", "status": "Active"} for i in range(3)],
+                                record_type=AssetRecord)
+        self.cache = EncodedRecordCache(self.store)
+
+    def test_encodings_are_cached_and_invalidated(self):
+        """Test encodings are kept after a read and dropped when their record changes"""
+        page = self.cache.pager(self.store.page)
+        encoded, _ = page(None, None)
+        self.assertEqual([json.loads(e) for e in encoded], [dict(r) for r in self.store])
+        self.assertEqual(len(self.cache), 3)
+        self.store.update("A1", {"status": "Retired"})
+        self.assertEqual(len(self.cache), 2)
+        encoded, _ = page(None, None)
+        self.assertEqual(json.loads(encoded[1])["status"], "Retired")
+        self.store.delete("A2")
+        self.assertEqual(len(self.cache), 2)
+
+    def test_write_during_read_is_not_cached(self):
+        """Test encodings of records read before a write are served but not kept"""
+        generation = self.cache._generation
+        records = self.store.all()
+        self.store.update("A0", {"status": "Retired"})
+        self.cache.encode(records, generation)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_refresh_drops_encodings_written_by_other_workers(self):
+        """Test a SQLite store's refresh clears encodings of rows another process has changed"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "iims.db")
+            store = SQLiteStore(SQLiteDatabase(path), "items", "id", [{"id": "k", "v": 1}])
+            page = EncodedRecordCache(store).pager(store.page)
+            self.assertEqual(page(None, None)[0], [b'{"id":"k","v":1}'])
+            SQLiteStore(SQLiteDatabase(path), "items", "id").update("k", {"v": 2})
+            store.refresh()
+            self.assertEqual(page(None, None)[0], [b'{"id":"k","v":2}'])
+
+    def test_json_module_fallback_matches_orjson(self):
+        """Test the json module fallback produces the same compact, key-sorted output"""
+        value = {"b": 1, "a": [True, None, "x"], "record": self.store.get("A0")}
+        with mock.patch.object(server, "orjson", None):
+            fallback = encode_json(value)
+        self.assertEqual(json.loads(fallback), json.loads(encode_json(value)))
+        self.assertTrue(fallback.startswith(b'{"a":[true,null,"x"],"b":1,'))
+        self.assertEqual(json.loads(encode_json({1: "non-string key"})), {"1": "non-string key"})
+
+
+class CachedListEndpointTestCase(unittest.TestCase):
+    """List endpoints served from cached encodings"""
+
+    def setUp(self):
+        """Set up test client logged in as IT Staff"""
+        self.app = app.test_client()
+        self.app.testing = True
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+
+    def test_assets_match_jsonify(self):
+        """Test the joined response decodes to what jsonify would have sent"""
+        response = self.app.get('/api/assets')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data), [dict(a) for a in ASSET_DB])
+        self.assertGreaterEqual(len(JSON_CACHES["assets"]), len(ASSET_DB))
+
+    def test_update_is_visible_in_next_list(self):
+        """Test an update through the API is reflected despite the cache"""
+        asset = dict(ASSET_DB.all()[0])
+        self.addCleanup(ASSET_DB.update, asset['assetId'], asset)
+        self.app.get('/api/assets')
+        self.app.post('/api/assets', json={'action': 'update', 'assetId': asset['assetId'], 'status': 'In Repair'})
+        data = json.loads(self.app.get('/api/assets').data)
+        self.assertEqual(data[0]['status'], 'In Repair')
+
+    def test_lists_refresh_their_store(self):
+        """Test each cached list refreshes its store first, so writes from other workers are seen"""
+        for path, store in (('/api/assets', ASSET_DB), ('/api/licenses', server.LICENSE_DB),
+                            ('/api/monitoring/hardware', server.HEALTH_DB),
+                            ('/api/monitoring/network', server.NETWORK_DB),
+                            ('/api/monitoring/backup', server.BACKUP_DB)):
+            with mock.patch.object(store, "refresh") as refresh:
+                self.assertEqual(self.app.get(path).status_code, 200)
+            refresh.assert_called_once_with()
+
+    def test_stream_and_projection(self):
+        """Test NDJSON streams cached encodings and ?fields= still projects"""
+        lines = self.app.get('/api/licenses?stream=1').data.decode().splitlines()
+        self.assertEqual([json.loads(line)['licenseId'] for line in lines],
+                         [lic['licenseId'] for lic in server.LICENSE_DB])
+        data = json.loads(self.app.get('/api/licenses?fields=licenseId&limit=2').data)
+        self.assertEqual(data, [{'licenseId': lic['licenseId']} for lic in server.LICENSE_DB.all()[:2]])
+
+if __name__ == '__main__':
+    unittest.main()
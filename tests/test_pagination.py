@@ -0,0 +1,115 @@
+import unittest
+import json
+from server import app, KeyedStore, ASSET_DB, encode_cursor, decode_cursor
+
+class StorePagingTestCase(unittest.TestCase):
+    """Test cases for cursor paging over the keyed store"""
+
+    def setUp(self):
+        """Create a store with ten records"""
+        self.store = KeyedStore("id", [{"id": f"R{i}", "even": i % 2 == 0} for i in range(10)], indexes=("even",))
+
+    def collect(self, limit, criteria=None):
+        pages, after = [], None
+        while True:
+            records, after = self.store.page(after, limit, criteria)
+            pages.append([r["id"] for r in records])
+            if after is None:
+                return pages
+
+    def test_pages_cover_store_in_order(self):
+        """Test that walking all pages returns every record once, in order"""
+        pages = self.collect(4)
+        self.assertEqual(pages, [["R0", "R1", "R2", "R3"], ["R4", "R5", "R6", "R7"], ["R8", "R9"]])
+
+    def test_cursor_stable_across_deletes(self):
+        """Test that deleting records already paged past does not shift the next page"""
+        records, after = self.store.page(None, 3)
+        for key in ("R0", "R1", "R2", "R4", "R5"):
+            self.store.delete(key)
+        records, after = self.store.page(after, 3)
+        self.assertEqual([r["id"] for r in records], ["R3", "R6", "R7"])
+
+    def test_filtered_pages(self):
+        """Test paging over an index-filtered result"""
+        self.assertEqual(self.collect(2, {"even": True}), [["R0", "R2"], ["R4", "R6"], ["R8"]])
+
+    def test_cursor_round_trip(self):
+        """Test cursors are opaque and decode back to the position"""
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor!")
+
+
+class PaginationEndpointTestCase(unittest.TestCase):
+    """Test cases for ?limit=, ?cursor= and ?fields= on list endpoints"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def test_asset_pages_follow_next_cursor(self):
+        """Test following X-Next-Cursor returns the full asset list"""
+        seen, url = [], '/api/assets?limit=2'
+        while True:
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(a['assetId'] for a in json.loads(response.data))
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            url = f'/api/assets?limit=2&cursor={cursor}'
+        self.assertEqual(seen, [a['assetId'] for a in ASSET_DB])
+
+    def test_field_projection(self):
+        """Test ?fields= limits the keys in each record"""
+        response = self.app.get('/api/monitoring/hardware?fields=deviceId,cpuLoad')
+        data = json.loads(response.data)
+        self.assertTrue(all(set(d) == {'deviceId', 'cpuLoad'} for d in data))
+
+    def test_invalid_paging_parameters(self):
+        """Test bad limit or cursor values return 400"""
+        self.assertEqual(self.app.get('/api/licenses?limit=0').status_code, 400)
+        self.assertEqual(self.app.get('/api/licenses?cursor=%%%').status_code, 400)
+
+    def test_ndjson_stream_via_query_parameter(self):
+        """Test ?stream=1 streams every record as NDJSON"""
+        response = self.app.get('/api/assets?stream=1&fields=assetId')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines, [{'assetId': a['assetId']} for a in ASSET_DB])
+
+    def test_ndjson_stream_via_accept_header_in_chunks(self):
+        """Test Accept: application/x-ndjson pulls records a chunk at a time"""
+        import server
+        original = server.STREAM_CHUNK_SIZE
+        server.STREAM_CHUNK_SIZE = 2
+        self.addCleanup(setattr, server, 'STREAM_CHUNK_SIZE', original)
+        response = self.app.get('/api/licenses', headers={'Accept': 'application/x-ndjson'})
+        ids = [json.loads(line)['licenseId'] for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(ids, [lic['licenseId'] for lic in server.LICENSE_DB])
+
+    def test_ndjson_stream_with_limit_sets_cursor(self):
+        """Test a limited stream returns one page and the next cursor"""
+        response = self.app.get('/api/monitoring/network?stream=1&limit=2')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+        self.assertIn('X-Next-Cursor', response.headers)
+
+    def test_audit_log_pages(self):
+        """Test the audit log pages by position"""
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        response = self.app.get('/api/audit-log?limit=1')
+        self.assertEqual(len(json.loads(response.data)), 1)
+        cursor = response.headers['X-Next-Cursor']
+        response = self.app.get(f'/api/audit-log?limit=1&cursor={cursor}&fields=action')
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(list(data[0]), ['action'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import json
+import os
+import tempfile
+from server import app, KeyedStore, SearchIndex, SQLiteDatabase, SQLiteStore, ASSET_DB, LICENSE_DB
+
+class SearchIndexTestCase(unittest.TestCase):
+    """Test cases for the inverted search index"""
+
+    def setUp(self):
+        """Index a small store"""
+        self.store = KeyedStore("id", [
+            {"id": "A1", "name": "Alice Johnson", "type": "Laptop"},
+            {"id": "A2", "name": "Alan Turing", "type": "Laptop"},
+            {"id": "A3", "name": "Bob Smith", "type": "Desktop Laptop"}
+        ])
+        self.index = SearchIndex()
+        self.index.track("asset", self.store, {"id": 3, "name": 2, "type": 1})
+
+    def ids(self, query, **kwargs):
+        return [key for _, _, key, _ in self.index.search(query, **kwargs)]
+
+    def test_prefix_and_conjunction(self):
+        """Test the last token matches as a prefix and every token must match"""
+        self.assertEqual(sorted(self.ids("al")), ["A1", "A2"])
+        self.assertEqual(self.ids("laptop ali"), ["A1"])
+        self.assertEqual(self.ids("smith al"), [])
+        self.assertEqual(self.ids("!!"), [])
+
+    def test_ranking_and_limit(self):
+        """Test heavier fields and exact matches rank first, and limit caps results"""
+        self.assertEqual(self.ids("a3 laptop"), ["A3"])
+        self.assertEqual(self.ids("alice")[0], "A1")
+        self.assertEqual(len(self.ids("laptop", limit=2)), 2)
+
+    def test_follows_mutations(self):
+        """Test updates re-index a document and deletes drop it and its unused tokens"""
+        self.store.update("A3", {"name": "Alice Cooper"})
+        self.assertEqual(sorted(self.ids("alice")), ["A1", "A3"])
+        self.assertEqual(self.ids("smith"), [])
+        self.store.delete("A1")
+        self.assertEqual(self.ids("johnson"), [])
+        self.assertNotIn("johnson", self.index._vocabulary)
+
+    def test_capacity_evicts_oldest(self):
+        """Test a capped kind keeps only its most recent documents"""
+        self.index.register("audit", {"details": 1}, capacity=2)
+        for seq in range(1, 4):
+            self.index.add("audit", seq, {"details": f"event number{seq}"})
+        self.assertEqual(sorted(self.ids("event", kinds={"audit"})), [2, 3])
+        self.assertEqual(len(self.index), 5)
+
+    def test_refresh_picks_up_other_workers_writes(self):
+        """Test refresh re-indexes a SQLite table changed by another process"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "iims.db")
+            index = SearchIndex()
+            index.track("asset", SQLiteStore(SQLiteDatabase(path), "items", "id", [{"id": "A1", "name": "Alice"}]),
+                        {"name": 1})
+            SQLiteStore(SQLiteDatabase(path), "items", "id").update("A1", {"name": "Carol"})
+            index.refresh({"license"})
+            self.assertEqual(len(index.search("carol")), 0)
+            index.refresh()
+            self.assertEqual([key for _, _, key, _ in index.search("carol")], ["A1"])
+
+
+class SearchEndpointTestCase(unittest.TestCase):
+    """Test cases for GET /api/search"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+
+    def search(self, query):
+        return json.loads(self.app.get(f'/api/search?{query}').data)["results"]
+
+    def test_staff_search_all_kinds(self):
+        """Test staff find assets, licenses and audit entries"""
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        license = LICENSE_DB.all()[0]
+        first_word = license["softwareName"].split()[0]
+        self.assertEqual(self.search(f'q={first_word[:4]}&kind=license')[0]["id"], license["licenseId"])
+        self.assertTrue(self.search('q=itstaff logged&kind=audit'))
+        asset = ASSET_DB.all()[0]
+        self.assertEqual(self.search(f'q={asset["assetId"]}')[0]["record"], asset)
+
+    def test_new_asset_is_searchable(self):
+        """Test assets created through the API are indexed immediately"""
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        self.app.post('/api/assets', json={'action': 'create', 'assetId': 'AST-SRCH-1', 'assetType': 'Tablet',
+                                           'assignedUser': 'Zelda Quux', 'department': 'IT'})
+        self.addCleanup(self.app.post, '/api/assets', json={'action': 'delete', 'assetId': 'AST-SRCH-1'})
+        self.assertEqual([r["id"] for r in self.search('q=zel')], ["AST-SRCH-1"])
+
+    def test_employee_visibility(self):
+        """Test Employees only see licenses and their own assets"""
+        self.app.post('/api/auth/login', json={'username': 'employee', 'password': 'emp123'})
+        results = self.search('q=laptop')
+        self.assertTrue(all(r["record"]["assignedUser"] == "Alice Johnson" for r in results))
+        self.assertEqual(self.search('q=logged&kind=audit'), [])
+
+    def test_bad_parameters(self):
+        """Test missing q, unknown kind and bad limit return 400"""
+        self.assertEqual(self.app.get('/api/search').status_code, 400)
+        self.assertEqual(self.app.get('/api/search?q=x&kind=user').status_code, 400)
+        self.assertEqual(self.app.get('/api/search?q=x&limit=many').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,11 +9,9 @@ class IIMSExtendedTestCase(unittest.TestCase):
         """Set up test client"""
         self.app = app.test_client()
         self.app.testing = True
-        # Reset authentication state
+        # Reset server-side sessions
         import server
-        server.current_role = None
-        server.current_user = None
-        server.is_authenticated = False
+        server.SESSIONS.clear()
     
     def test_login_itstaff(self):
         """Test IT Staff login (no MFA required)"""
@@ -84,16 +82,16 @@ class IIMSExtendedTestCase(unittest.TestCase):
                      json={'username': 'itstaff', 'password': 'it123'})
         # Update existing asset
         if len(ASSET_DB) > 0:
-            asset_id = ASSET_DB[0]['assetId']
+            asset_id = ASSET_DB.all()[0]['assetId']
             response = self.app.post('/api/assets',
                                     json={
                                         'action': 'update',
                                         'assetId': asset_id,
                                         'assetType': 'Updated Type',
-                                        'assignedUser': ASSET_DB[0]['assignedUser'],
-                                        'purchaseDate': ASSET_DB[0]['purchaseDate'],
-                                        'warrantyExpiryDate': ASSET_DB[0]['warrantyExpiryDate'],
-                                        'department': ASSET_DB[0]['department'],
+                                        'assignedUser': ASSET_DB.all()[0]['assignedUser'],
+                                        'purchaseDate': ASSET_DB.all()[0]['purchaseDate'],
+                                        'warrantyExpiryDate': ASSET_DB.all()[0]['warrantyExpiryDate'],
+                                        'department': ASSET_DB.all()[0]['department'],
                                         'status': 'Maintenance'
                                     })
             self.assertEqual(response.status_code, 200)
@@ -150,16 +148,16 @@ class IIMSExtendedTestCase(unittest.TestCase):
                      json={'username': 'itstaff', 'password': 'it123'})
         # Update existing license
         if len(LICENSE_DB) > 0:
-            license_id = LICENSE_DB[0]['licenseId']
+            license_id = LICENSE_DB.all()[0]['licenseId']
             response = self.app.post('/api/licenses',
                                     json={
                                         'action': 'update',
                                         'licenseId': license_id,
-                                        'softwareName': LICENSE_DB[0]['softwareName'],
-                                        'licenseKey': LICENSE_DB[0]['licenseKey'],
-                                        'totalSeats': LICENSE_DB[0]['totalSeats'],
+                                        'softwareName': LICENSE_DB.all()[0]['softwareName'],
+                                        'licenseKey': LICENSE_DB.all()[0]['licenseKey'],
+                                        'totalSeats': LICENSE_DB.all()[0]['totalSeats'],
                                         'usedSeats': 50,
-                                        'expiryDate': LICENSE_DB[0]['expiryDate'],
+                                        'expiryDate': LICENSE_DB.all()[0]['expiryDate'],
                                         'complianceStatus': 'Compliant'
                                     })
             self.assertEqual(response.status_code, 200)
@@ -193,12 +191,17 @@ class IIMSExtendedTestCase(unittest.TestCase):
         # Login as Admin
         self.app.post('/api/auth/login',
                      json={'username': 'admin', 'password': 'admin123', 'mfaCode': '123456'})
-        # Run verification
+        # Run verification as a background job and wait for it
         response = self.app.post('/api/monitoring/backup/verify')
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 202)
         data = json.loads(response.data)
-        self.assertIn('verifiedJobs', data)
-        self.assertIn('results', data)
+        self.assertIn('jobId', data)
+        from server import JOB_RUNNER
+        self.assertTrue(JOB_RUNNER.get(data['jobId']).wait(5))
+        job = json.loads(self.app.get(data['statusUrl']).data)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress']['done'], job['progress']['total'])
+        self.assertEqual(len(job['results']), job['progress']['total'])
     
     def test_employee_asset_filtering(self):
         """Test that Employee role only sees assigned assets"""
@@ -0,0 +1,117 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+from server import app, SessionCache, SQLiteDatabase, SQLiteSessionRevocations
+
+class SessionCacheTestCase(unittest.TestCase):
+    """Test cases for the server-side session cache"""
+
+    def test_ttl_eviction(self):
+        """Test that entries expire after the TTL"""
+        cache = SessionCache(ttl=0.05)
+        cache.put("a", {"role": "Admin"})
+        self.assertEqual(cache.get("a"), {"role": "Admin"})
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_size_bound_and_revoke(self):
+        """Test that the oldest entries are evicted past max_entries and revocations stick"""
+        cache = SessionCache(ttl=60, max_entries=2)
+        for sid in ("a", "b", "c"):
+            cache.put(sid, {"sid": sid})
+        self.assertEqual(cache.get("a", "missing"), "missing")
+        cache.revoke("b")
+        self.assertIsNone(cache.get("b", "missing"))
+
+    def test_sqlite_revocations_are_shared(self):
+        """Test a revocation made through one connection is seen through another until it expires"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "iims.db")
+            SQLiteSessionRevocations(SQLiteDatabase(path)).add("a", ttl=60)
+            SQLiteSessionRevocations(SQLiteDatabase(path)).add("b", ttl=-1)
+            other_worker = SQLiteSessionRevocations(SQLiteDatabase(path))
+            self.assertIn("a", other_worker)
+            self.assertNotIn("b", other_worker)
+
+
+class PerRequestSessionTestCase(unittest.TestCase):
+    """Test cases for per-request session handling"""
+
+    def setUp(self):
+        """Set up two independent clients"""
+        import server
+        server.SESSIONS.clear()
+        self.admin = app.test_client()
+        self.employee = app.test_client()
+
+    def test_concurrent_users_keep_their_own_role(self):
+        """Test that logging in a second user does not change the first user's role"""
+        self.admin.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123', 'mfaCode': '123456'})
+        self.employee.post('/api/auth/login', json={'username': 'employee', 'password': 'emp123'})
+        self.assertEqual(json.loads(self.admin.get('/api/auth/status').data)['role'], 'Admin')
+        self.assertEqual(self.admin.get('/api/audit-log').status_code, 200)
+        self.assertEqual(self.employee.get('/api/audit-log').status_code, 403)
+
+    def test_bearer_token_and_tampering(self):
+        """Test that the login token works as a bearer token and a tampered one does not"""
+        response = self.admin.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        token = json.loads(response.data)['token']
+        client = app.test_client()
+        status = json.loads(client.get('/api/auth/status', headers={'Authorization': f'Bearer {token}'}).data)
+        self.assertTrue(status['authenticated'])
+        status = json.loads(client.get('/api/auth/status', headers={'Authorization': f'Bearer {token}x'}).data)
+        self.assertFalse(status['authenticated'])
+
+    def test_token_from_other_worker_is_accepted(self):
+        """Test that a valid token is accepted when this process has no cached session"""
+        import server
+        response = self.admin.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        token = json.loads(response.data)['token']
+        server.SESSIONS.clear()
+        client = app.test_client()
+        response = client.get('/api/audit-log', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_revokes_token(self):
+        """Test that a logged-out token can no longer be used"""
+        response = self.admin.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        token = json.loads(response.data)['token']
+        self.admin.post('/api/auth/logout')
+        client = app.test_client()
+        response = client.get('/api/audit-log', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_logout_reaches_other_workers(self):
+        """Test a token logged out in one worker is rejected by a worker that had it cached"""
+        import server
+        with tempfile.TemporaryDirectory() as tmp:
+            revocations = SQLiteSessionRevocations(SQLiteDatabase(os.path.join(tmp, "iims.db")))
+            with mock.patch.object(server, "SESSION_REVOCATIONS", revocations):
+                response = self.admin.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+                token = json.loads(response.data)['token']
+                self.admin.post('/api/auth/logout')
+                server.SESSIONS.clear()  # the other worker's cached entry has come up for a recheck
+                client = app.test_client()
+                response = client.get('/api/audit-log', headers={'Authorization': f'Bearer {token}'})
+                self.assertEqual(response.status_code, 403)
+
+    def test_cors_only_allows_configured_origins(self):
+        """Test credentialed CORS responses are only sent to the front-end origin"""
+        response = self.admin.get('/api/auth/status', headers={'Origin': 'https://evil.example'})
+        self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+        response = self.admin.get('/api/auth/status', headers={'Origin': 'http://localhost:5000'})
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], 'http://localhost:5000')
+        self.assertEqual(response.headers['Access-Control-Allow-Credentials'], 'true')
+
+    def test_role_endpoint_is_per_session(self):
+        """Test that /api/role changes only the caller's role"""
+        self.admin.post('/api/role', json={'role': 'IT Staff'})
+        self.assertEqual(json.loads(self.admin.get('/api/role').data)['role'], 'IT Staff')
+        self.assertIsNone(json.loads(self.employee.get('/api/role').data)['role'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import os
+import tempfile
+import threading
+from server import SQLiteDatabase, SQLiteStore, SQLiteAuditLog, PredicateCounter
+
+SEED = [{"id": f"R{i}", "dept": "IT" if i % 2 else "HR", "v": i} for i in range(6)]
+
+class SQLiteStoreTestCase(unittest.TestCase):
+    """Test cases for the SQLite storage engine"""
+
+    def setUp(self):
+        """Open a store on a temporary database file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "iims.db")
+        self.store = SQLiteStore(SQLiteDatabase(self.path), "items", "id", SEED, indexes=("dept",))
+
+    def test_wal_mode(self):
+        """Test the database runs in WAL journal mode"""
+        mode = self.store.db.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_crud_matches_keyed_store_semantics(self):
+        """Test insert, update, delete and ordering behave like the in-memory store"""
+        self.assertEqual(len(self.store), 6)
+        self.assertEqual(self.store.get("R2")["v"], 2)
+        self.assertIn("R3", self.store)
+        self.store.update("R0", {"v": 100})
+        self.assertEqual(self.store.get("R0")["v"], 100)
+        self.store.delete("R1")
+        self.store.insert({"id": "R1", "dept": "IT", "v": 1})
+        self.assertEqual([r["id"] for r in self.store], ["R0", "R2", "R3", "R4", "R5", "R1"])
+        with self.assertRaises(KeyError):
+            self.store.insert({"id": "R2"})
+        with self.assertRaises(KeyError):
+            self.store.delete("missing")
+
+    def test_indexed_queries_and_paging(self):
+        """Test find, count_by and cursor paging"""
+        self.assertEqual([r["id"] for r in self.store.find({"dept": "IT"})], ["R1", "R3", "R5"])
+        self.assertEqual([r["id"] for r in self.store.find({"dept": "IT", "v": 3})], ["R3"])
+        self.assertEqual(self.store.count_by("dept"), {"HR": 3, "IT": 3})
+        records, last = self.store.page(None, 4)
+        self.assertEqual(len(records), 4)
+        records, last = self.store.page(last, 4)
+        self.assertEqual([r["id"] for r in records], ["R4", "R5"])
+        self.assertIsNone(last)
+
+    def test_upsert_many_merges_and_inserts(self):
+        """Test a batch upsert merges existing rows, inserts new ones and notifies listeners"""
+        counter = PredicateCounter(self.store, lambda r: r["dept"] == "IT")
+        self.store.upsert_many([{"id": "R0", "dept": "IT"}, {"id": "R9", "dept": "IT", "v": 9}])
+        self.assertEqual(self.store.get("R0"), {"id": "R0", "dept": "IT", "v": 0})
+        self.assertEqual(self.store.get("R9")["v"], 9)
+        self.assertEqual(self.store.find({"dept": "IT"})[-1]["id"], "R9")
+        self.assertEqual(counter.count, 5)
+
+    def test_persists_across_reopen(self):
+        """Test data survives reopening and is not re-seeded"""
+        self.store.delete("R0")
+        reopened = SQLiteStore(SQLiteDatabase(self.path), "items", "id", SEED, indexes=("dept",))
+        self.assertEqual(len(reopened), 5)
+        self.assertNotIn("R0", reopened)
+
+    def test_refresh_replays_writes_from_other_process(self):
+        """Test that listeners catch up with writes made through another connection"""
+        counter = PredicateCounter(self.store, lambda r: r["dept"] == "IT")
+        self.assertEqual(counter.count, 3)
+        self.store.update("R0", {"dept": "IT"})
+        self.assertEqual(counter.count, 4)
+        other_worker = SQLiteStore(SQLiteDatabase(self.path), "items", "id", indexes=("dept",))
+        version = self.store.version
+        other_worker.update("R2", {"dept": "IT"})
+        self.assertEqual(self.store.version, version + 1)
+        self.assertEqual(counter.count, 4)
+        self.store.refresh()
+        self.assertEqual(counter.count, 5)
+
+    def test_replay_waits_for_inflight_notification(self):
+        """Test a refresh does not reset and replay listeners while a write is still notifying them"""
+        counter = PredicateCounter(self.store, lambda r: r["dept"] == "IT")
+        entered, release, refreshed = threading.Event(), threading.Event(), threading.Event()
+
+        def slow_listener(old, new):
+            if old is not None and new is not None:
+                entered.set()
+                release.wait(5)
+        self.store.subscribe(slow_listener)
+        writer = threading.Thread(target=self.store.update, args=("R0", {"dept": "IT"}))
+        writer.start()
+        self.assertTrue(entered.wait(5))
+        SQLiteStore(SQLiteDatabase(self.path), "items", "id", indexes=("dept",)).update("R2", {"dept": "IT"})
+        refresher = threading.Thread(target=lambda: (self.store.refresh(), refreshed.set()))
+        refresher.start()
+        self.assertFalse(refreshed.wait(0.2))
+        release.set()
+        writer.join()
+        refresher.join()
+        self.assertEqual(counter.count, 5)
+
+
+class SQLiteAuditLogTestCase(unittest.TestCase):
+    """Test cases for the SQLite audit log"""
+
+    def test_filters_and_paging(self):
+        """Test time range, action filter and cursor paging"""
+        with tempfile.TemporaryDirectory() as tmp:
+            log = SQLiteAuditLog(SQLiteDatabase(os.path.join(tmp, "iims.db")))
+            for i in range(10):
+                log.append({"timestamp": f"2024-01-01 00:00:{i:02d}", "userRole": "Admin",
+                            "action": "LOGIN" if i % 3 == 0 else "UPDATE", "details": str(i)})
+            self.assertEqual(len(log), 10)
+            self.assertEqual(log.version, 10)
+            entries, _ = log.query(since="2024-01-01 00:00:02", until="2024-01-01 00:00:08", action="LOGIN")
+            self.assertEqual([e["details"] for e in entries], ["3", "6"])
+            entries, last = log.query(limit=4)
+            self.assertEqual(len(entries), 4)
+            entries, last = log.query(after=last, limit=10)
+            self.assertEqual([e["details"] for e in entries], [str(i) for i in range(4, 10)])
+            self.assertIsNone(last)
+            self.assertEqual(len(list(log)), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import unittest
+import json
+from datetime import date, timedelta
+from server import (app, KeyedStore, PredicateCounter, SortedDateIndex, ASSET_DB, LICENSE_DB,
+                    HEALTH_DB, BACKUP_DB, NETWORK_DB, STORAGE_ENGINE, AssetRecord, HealthRecord, json_default)
+
+class KeyedStoreTestCase(unittest.TestCase):
+    """Test cases for the keyed in-memory store"""
+
+    def setUp(self):
+        """Create a small store"""
+        self.store = KeyedStore("id", [{"id": "A", "v": 1}, {"id": "B", "v": 2}, {"id": "C", "v": 3}])
+
+    def test_lookup_by_key(self):
+        """Test O(1) lookup by primary key"""
+        self.assertEqual(self.store.get("B")["v"], 2)
+        self.assertIsNone(self.store.get("Z"))
+        self.assertIn("C", self.store)
+        self.assertEqual(len(self.store), 3)
+
+    def test_update_keeps_position(self):
+        """Test that updates keep the record in its original position"""
+        self.store.update("A", {"v": 10})
+        self.assertEqual([r["id"] for r in self.store], ["A", "B", "C"])
+        self.assertEqual(self.store.get("A")["v"], 10)
+
+    def test_delete_and_reinsert_order(self):
+        """Test that delete removes the record and re-insert appends it"""
+        deleted = self.store.delete("A")
+        self.assertEqual(deleted["v"], 1)
+        self.store.insert({"id": "A", "v": 4})
+        self.assertEqual([r["id"] for r in self.store.all()], ["B", "C", "A"])
+
+    def test_secondary_index_find(self):
+        """Test indexed lookups follow updates and keep insertion order"""
+        store = KeyedStore("id", [{"id": "A", "dept": "IT", "s": "on"}, {"id": "B", "dept": "HR", "s": "on"},
+                                  {"id": "C", "dept": "IT", "s": "off"}], indexes=("dept", "s"))
+        self.assertEqual([r["id"] for r in store.find({"dept": "IT"})], ["A", "C"])
+        self.assertEqual([r["id"] for r in store.find({"dept": "IT", "s": "on"})], ["A"])
+        store.update("B", {"dept": "IT"})
+        self.assertEqual([r["id"] for r in store.find({"dept": "IT"})], ["A", "B", "C"])
+        self.assertEqual(store.count_by("dept"), {"IT": 3})
+        store.delete("A")
+        self.assertEqual(store.count_by("s"), {"on": 1, "off": 1})
+        self.assertEqual(store.find({"dept": "Sales"}), [])
+
+    def test_duplicate_insert_rejected(self):
+        """Test that inserting an existing key raises KeyError"""
+        with self.assertRaises(KeyError):
+            self.store.insert({"id": "B", "v": 5})
+
+
+class DerivedIndexTestCase(unittest.TestCase):
+    """Test cases for incrementally maintained counters and date indexes"""
+
+    def test_predicate_counter_tracks_mutations(self):
+        """Test counter follows inserts, updates and deletes"""
+        store = KeyedStore("id", [{"id": "A", "v": 90}, {"id": "B", "v": 10}])
+        counter = PredicateCounter(store, lambda r: r["v"] > 85)
+        self.assertEqual(counter.count, 1)
+        store.update("B", {"v": 95})
+        self.assertEqual(counter.count, 2)
+        store.update("A", {"v": 50})
+        self.assertEqual(counter.count, 1)
+        store.delete("B")
+        self.assertEqual(counter.count, 0)
+
+    def test_sorted_date_index_range_count(self):
+        """Test counting dates on or before a threshold"""
+        store = KeyedStore("id", [{"id": "A", "d": "2024-01-10"}, {"id": "B", "d": "2024-03-01"},
+                                  {"id": "C", "d": None}])
+        index = SortedDateIndex(store, "d")
+        self.assertEqual(index.count_until(date(2024, 2, 1)), 1)
+        store.update("B", {"d": "2024-01-20"})
+        self.assertEqual(index.count_until(date(2024, 2, 1)), 2)
+        store.delete("A")
+        self.assertEqual(index.count_until(date(2024, 2, 1)), 1)
+
+    def test_dashboard_metrics_match_full_scan(self):
+        """Test incremental metrics equal a from-scratch recomputation"""
+        from server import calculate_dashboard_metrics
+        threshold = date.today() + timedelta(days=90)
+        expected = {
+            "totalAssets": len(ASSET_DB),
+            "licensesExpiringSoon": sum(1 for lic in LICENSE_DB
+                                        if lic["expiryDate"] and lic["expiryDate"] <= threshold.isoformat()),
+            "hardwareHealthAlerts": sum(1 for d in HEALTH_DB if d["cpuLoad"] > 85 or d["isOverheating"]),
+            "backupFailures": sum(1 for j in BACKUP_DB if j["status"] in ["Failure", "Missed"]),
+            "networkEvents": sum(1 for n in NETWORK_DB if n["isDowntime"] or n["abnormalTraffic"])
+        }
+        self.assertEqual(calculate_dashboard_metrics(), expected)
+
+
+class CompactRecordTestCase(unittest.TestCase):
+    """Test cases for the slotted record classes backing the in-memory tables"""
+
+    ASSET = {"assetId": "AST-9", "assetType": "Laptop", "assignedUser": "Zoe", "purchaseDate": "2023-01-15",
+             "warrantyExpiryDate": None, "status": "Active", "department": "IT"}
+
+    def test_behaves_like_the_dict(self):
+        """Test reads, iteration order, equality and conversion match the source dict"""
+        record = AssetRecord(self.ASSET)
+        self.assertEqual(record, self.ASSET)
+        self.assertEqual(list(record), list(self.ASSET))
+        self.assertEqual(dict(record), self.ASSET)
+        self.assertEqual(record.as_dict(), self.ASSET)
+        self.assertEqual(record["purchaseDate"], "2023-01-15")
+        self.assertIsNone(record.get("missing"))
+        self.assertNotIn("missing", record)
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_compact_encodings(self):
+        """Test dates are held as ordinals and enum values are interned"""
+        record = AssetRecord(self.ASSET)
+        self.assertEqual(record.purchaseDate, date(2023, 1, 15).toordinal())
+        other = AssetRecord(dict(self.ASSET, status="".join(["Act", "ive"])))
+        self.assertIs(other.status, record.status)
+        health = HealthRecord({"deviceId": "D", "lastCheck": "2024-03-01 12:30:05"})
+        self.assertIsInstance(health.lastCheck, int)
+        self.assertEqual(health["lastCheck"], "2024-03-01 12:30:05")
+
+    def test_unparseable_and_unknown_values_round_trip(self):
+        """Test values that cannot be compacted and fields outside the schema are kept verbatim"""
+        record = AssetRecord(self.ASSET)
+        record.update({"purchaseDate": "15/01/2023", "notes": "spare"})
+        self.assertEqual(record["purchaseDate"], "15/01/2023")
+        self.assertEqual(record["notes"], "spare")
+        record["purchaseDate"] = "2024-02-29"
+        self.assertEqual(record.as_dict()["purchaseDate"], "2024-02-29")
+        del record["notes"]
+        self.assertEqual(len(record), len(self.ASSET))
+        self.assertEqual(json.loads(json.dumps([record], default=json_default)), [record.as_dict()])
+
+    def test_store_converts_rows_and_snapshots_updates(self):
+        """Test a typed store keeps compact rows and listeners see the pre-update values"""
+        store = KeyedStore("assetId", [self.ASSET], indexes=("status",), record_type=AssetRecord)
+        seen = []
+        store.subscribe(lambda old, new: seen.append((old and old["status"], new and new["status"])))
+        self.assertIsInstance(store.get("AST-9"), AssetRecord)
+        store.update("AST-9", {"status": "Retired"})
+        self.assertEqual(seen[-1], ("Active", "Retired"))
+        self.assertEqual([r["assetId"] for r in store.find({"status": "Retired"})], ["AST-9"])
+
+    @unittest.skipIf(STORAGE_ENGINE == "sqlite", "SQLite tables hold JSON documents, not compact records")
+    def test_tables_use_compact_records(self):
+        """Test the seeded tables store compact rows and still serialize to plain JSON"""
+        self.assertIsInstance(ASSET_DB.all()[0], AssetRecord)
+        client = app.test_client()
+        data = json.loads(client.get('/api/monitoring/hardware').data)
+        self.assertEqual(data[0]["lastCheck"], HEALTH_DB.all()[0]["lastCheck"])
+
+
+class KeyedStoreEndpointTestCase(unittest.TestCase):
+    """Endpoint behaviour backed by the keyed stores"""
+
+    def setUp(self):
+        """Set up test client logged in as IT Staff"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+
+    def test_duplicate_asset_conflict(self):
+        """Test creating an asset with an existing ID returns 409"""
+        asset_id = ASSET_DB.all()[0]['assetId']
+        response = self.app.post('/api/assets', json={'action': 'create', 'assetId': asset_id})
+        self.assertEqual(response.status_code, 409)
+
+    def test_list_order_matches_store(self):
+        """Test that GET /api/assets returns records in store order"""
+        response = self.app.get('/api/assets')
+        data = json.loads(response.data)
+        self.assertEqual([a['assetId'] for a in data], [a['assetId'] for a in ASSET_DB])
+
+    def test_asset_query_filters(self):
+        """Test ?department= and ?status= filters on /api/assets"""
+        response = self.app.get('/api/assets?department=Engineering&status=Active')
+        data = json.loads(response.data)
+        expected = [a['assetId'] for a in ASSET_DB if a['department'] == 'Engineering' and a['status'] == 'Active']
+        self.assertEqual([a['assetId'] for a in data], expected)
+
+    def test_department_analytics_matches_store(self):
+        """Test department counts come from the maintained index"""
+        data = json.loads(self.app.get('/api/analytics/assets-by-department').data)
+        self.assertEqual(sum(data.values()), len(ASSET_DB))
+
+    def test_license_create_updates_expiring_count(self):
+        """Test that creating and deleting a license moves the expiring-soon counter"""
+        before = json.loads(self.app.get('/api/dashboard/metrics').data)['licensesExpiringSoon']
+        soon = (date.today() + timedelta(days=10)).isoformat()
+        self.app.post('/api/licenses', json={'action': 'create', 'licenseId': 'LIC-SOON-001',
+                                             'softwareName': 'Soon', 'totalSeats': 1, 'expiryDate': soon})
+        after = json.loads(self.app.get('/api/dashboard/metrics').data)['licensesExpiringSoon']
+        self.assertEqual(after, before + 1)
+        self.app.post('/api/licenses', json={'action': 'delete', 'licenseId': 'LIC-SOON-001'})
+        final = json.loads(self.app.get('/api/dashboard/metrics').data)['licensesExpiringSoon']
+        self.assertEqual(final, before)
+
+    def test_delete_missing_license(self):
+        """Test deleting a non-existent license returns 404"""
+        response = self.app.post('/api/licenses', json={'action': 'delete', 'licenseId': 'NOPE-001'})
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+import json
+import threading
+import time
+from server import app, EwmaDetector, KeyedStore, TelemetryBuffer, HEALTH_DB, NETWORK_DB, TELEMETRY_BUFFERS
+
+class TelemetryBufferTestCase(unittest.TestCase):
+    """Test cases for the coalescing write-behind buffer"""
+
+    def setUp(self):
+        """Create a small device store"""
+        self.store = KeyedStore("deviceId", [{"deviceId": "D1", "cpuLoad": 10, "memoryUtil": 20}])
+        self.buffer = TelemetryBuffer(self.store, interval=60)
+
+    def test_samples_coalesce_per_device(self):
+        """Test only the latest state per device is written on flush"""
+        self.buffer.add([{"deviceId": "D1", "cpuLoad": 50}, {"deviceId": "D2", "cpuLoad": 5, "memoryUtil": 1},
+                         {"deviceId": "D1", "cpuLoad": 70}])
+        self.assertEqual(len(self.buffer), 2)
+        self.assertEqual(self.store.get("D1")["cpuLoad"], 10)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.store.get("D1"), {"deviceId": "D1", "cpuLoad": 70, "memoryUtil": 20})
+        self.assertEqual(self.store.get("D2")["memoryUtil"], 1)
+        self.assertEqual((self.buffer.samples, self.buffer.flushed), (3, 2))
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_background_flush(self):
+        """Test the flusher thread writes pending samples without an explicit flush"""
+        buffer = TelemetryBuffer(self.store, interval=0.01)
+        buffer.add([{"deviceId": "D1", "cpuLoad": 99}])
+        deadline = time.time() + 2
+        while self.store.get("D1")["cpuLoad"] != 99 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.store.get("D1")["cpuLoad"], 99)
+
+    def test_failed_flush_keeps_samples(self):
+        """Test a failing store write leaves the batch pending"""
+        class FailingStore(KeyedStore):
+            def upsert_many(self, records):
+                raise OSError("disk full")
+        buffer = TelemetryBuffer(FailingStore("deviceId"), interval=60)
+        buffer.add([{"deviceId": "D1", "cpuLoad": 1}])
+        with self.assertRaises(OSError):
+            buffer.flush()
+        self.assertEqual(len(buffer), 1)
+
+
+class EwmaDetectorTestCase(unittest.TestCase):
+    """Test cases for the streaming bandwidth anomaly detector"""
+
+    def test_spike_flagged_after_warmup(self):
+        """Test a spike is flagged only once the baseline is established"""
+        detector = EwmaDetector(alpha=0.1, threshold=3.0, warmup=10)
+        self.assertFalse(detector.observe("N1", 100))
+        self.assertFalse(detector.observe("N1", 1000))
+        detector = EwmaDetector(alpha=0.1, threshold=3.0, warmup=10)
+        flags = [detector.observe("N1", 100 + (i % 5)) for i in range(50)]
+        self.assertFalse(any(flags))
+        self.assertTrue(detector.observe("N1", 400))
+        self.assertFalse(detector.observe("N2", 400))
+        self.assertEqual(len(detector), 2)
+
+    def test_constant_signal_never_flags(self):
+        """Test zero variance does not divide by zero or flag identical readings"""
+        detector = EwmaDetector(warmup=2)
+        self.assertFalse(any(detector.observe("N1", 50) for _ in range(10)))
+
+    def test_observe_waits_for_concurrent_update(self):
+        """Test a sample is not folded into a device's statistics while another update holds them"""
+        detector = EwmaDetector()
+        detector.observe("N1", 50)
+        done = threading.Event()
+        with detector._lock:
+            threading.Thread(target=lambda: (detector.observe("N1", 60), done.set())).start()
+            self.assertFalse(done.wait(0.1))
+            self.assertEqual(detector._state["N1"][2], 1)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(detector._state["N1"][2], 2)
+
+
+class TelemetryIngestTestCase(unittest.TestCase):
+    """Test cases for POST /api/telemetry/ingest"""
+
+    def setUp(self):
+        """Set up test client logged in as IT Staff, restoring the monitoring tables afterwards"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        self.app.post('/api/auth/login', json={'username': 'itstaff', 'password': 'it123'})
+        for store in (HEALTH_DB, NETWORK_DB):
+            snapshot = [dict(record) for record in store]
+            self.addCleanup(self.restore, store, snapshot)
+
+    def restore(self, store, snapshot):
+        for buffer in TELEMETRY_BUFFERS.values():
+            buffer.flush()
+        keys = {record["deviceId"] for record in snapshot}
+        for record in store.all():
+            if record["deviceId"] not in keys:
+                store.delete(record["deviceId"])
+        store.upsert_many(snapshot)
+
+    def test_ingest_upserts_latest_state(self):
+        """Test accepted samples reach the stores and dashboard counters after a flush"""
+        before = json.loads(self.app.get('/api/dashboard/metrics').data)['hardwareHealthAlerts']
+        response = self.app.post('/api/telemetry/ingest', json={
+            "hardware": [{"deviceId": "DEV-900", "cpuLoad": 40, "memoryUtil": 30, "isOverheating": False},
+                         {"deviceId": "DEV-900", "cpuLoad": 97, "memoryUtil": 31, "isOverheating": False,
+                          "lastCheck": "2024-05-01 10:00:00"}],
+            "network": [{"deviceId": "NET-002", "bandwidthMB": 130, "isDowntime": False, "abnormalTraffic": False}]
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.data), {"accepted": {"hardware": 2, "network": 1},
+                                                     "rejected": 0, "errors": []})
+        for buffer in TELEMETRY_BUFFERS.values():
+            buffer.flush()
+        self.assertEqual(HEALTH_DB.get("DEV-900")["cpuLoad"], 97)
+        self.assertEqual(HEALTH_DB.get("DEV-900")["lastCheck"], "2024-05-01 10:00:00")
+        self.assertEqual(NETWORK_DB.get("NET-002")["bandwidthMB"], 130)
+        after = json.loads(self.app.get('/api/dashboard/metrics').data)['hardwareHealthAlerts']
+        self.assertEqual(after, before + 1)
+
+    def test_invalid_samples_rejected(self):
+        """Test malformed samples are reported by position and valid ones still accepted"""
+        response = self.app.post('/api/telemetry/ingest', json={"network": [
+            {"deviceId": "NET-001", "bandwidthMB": -1, "isDowntime": False, "abnormalTraffic": False},
+            {"bandwidthMB": 1, "isDowntime": False, "abnormalTraffic": False},
+            {"deviceId": "NET-001", "bandwidthMB": 5, "isDowntime": "no", "abnormalTraffic": False},
+            {"deviceId": "NET-001", "bandwidthMB": 5, "isDowntime": False, "abnormalTraffic": False}]})
+        data = json.loads(response.data)
+        self.assertEqual(data["accepted"], {"network": 1})
+        self.assertEqual([e["index"] for e in data["errors"]], [0, 1, 2])
+
+    def test_ingest_derives_abnormal_traffic(self):
+        """Test network samples without abnormalTraffic are flagged by the detector"""
+        import server
+        detector = EwmaDetector(alpha=0.1, threshold=3.0, warmup=10)
+        original = server.TRAFFIC_DETECTOR
+        server.TRAFFIC_DETECTOR = detector
+        self.addCleanup(setattr, server, 'TRAFFIC_DETECTOR', original)
+        baseline = [{"deviceId": "NET-900", "bandwidthMB": 100 + i % 7, "isDowntime": False} for i in range(40)]
+        self.app.post('/api/telemetry/ingest', json={"network": baseline})
+        TELEMETRY_BUFFERS["network"].flush()
+        self.assertFalse(NETWORK_DB.get("NET-900")["abnormalTraffic"])
+        self.app.post('/api/telemetry/ingest', json={"network": [
+            {"deviceId": "NET-900", "bandwidthMB": 900, "isDowntime": False}]})
+        TELEMETRY_BUFFERS["network"].flush()
+        self.assertTrue(NETWORK_DB.get("NET-900")["abnormalTraffic"])
+        self.app.post('/api/telemetry/ingest', json={"network": [
+            {"deviceId": "NET-900", "bandwidthMB": 0, "isDowntime": True}]})
+        TELEMETRY_BUFFERS["network"].flush()
+        self.assertFalse(NETWORK_DB.get("NET-900")["abnormalTraffic"])
+
+    def test_bad_body(self):
+        """Test unknown kinds and non-list values return 400"""
+        self.assertEqual(self.app.post('/api/telemetry/ingest', json={"disk": []}).status_code, 400)
+        self.assertEqual(self.app.post('/api/telemetry/ingest', json={"hardware": {}}).status_code, 400)
+
+    def test_requires_token_or_staff(self):
+        """Test ingestion is refused without a staff session or the agent token"""
+        import server
+        client = app.test_client()
+        self.assertEqual(client.post('/api/telemetry/ingest', json={}).status_code, 403)
+        original = server.TELEMETRY_TOKEN
+        server.TELEMETRY_TOKEN = "agent-secret"
+        self.addCleanup(setattr, server, 'TELEMETRY_TOKEN', original)
+        response = client.post('/api/telemetry/ingest', json={}, headers={'X-Telemetry-Token': 'agent-secret'})
+        self.assertEqual(response.status_code, 202)
+        response = client.post('/api/telemetry/ingest', json={}, headers={'X-Telemetry-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
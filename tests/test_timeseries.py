@@ -0,0 +1,114 @@
+import unittest
+import json
+from datetime import datetime
+from server import app, TimeSeriesStore, TimeSeriesTier, HEALTH_DB
+
+T0 = datetime(2024, 5, 1, 12, 0, 0).timestamp()
+
+class TimeSeriesStoreTestCase(unittest.TestCase):
+    """Test cases for the array-backed metric history"""
+
+    def setUp(self):
+        """Record one sample every 10 seconds for two hours"""
+        self.store = TimeSeriesStore(((0, 3600), (60, 86400), (3600, 30 * 86400)), chunk_size=64)
+        for i in range(720):
+            self.store.record("D1", T0 + i * 10, {"cpu": i % 60})
+
+    def test_rollup_min_max_avg(self):
+        """Test 1m buckets summarise their six raw samples"""
+        step, points = self.store.query("D1", "cpu", T0, T0 + 120, 60)
+        self.assertEqual(step, 60)
+        self.assertEqual(points[0], {"time": "2024-05-01 12:00:00", "min": 0.0, "max": 5.0, "avg": 2.5, "count": 6})
+        self.assertEqual(points[1]["min"], 6.0)
+
+    def test_raw_query_rebuckets_samples(self):
+        """Test sub-minute steps read raw samples"""
+        step, points = self.store.query("D1", "cpu", T0 + 7000, T0 + 7200, 20)
+        self.assertEqual(step, 20)
+        self.assertEqual([p["count"] for p in points], [2] * 10)
+
+    def test_old_ranges_use_coarser_tier(self):
+        """Test a range outside raw retention is answered from the 1m rollups"""
+        step, points = self.store.query("D1", "cpu", T0, T0 + 600, 10)
+        self.assertEqual(step, 60)
+        self.assertEqual(len(points), 10)
+        step, points = self.store.query("D1", "cpu", T0, T0 + 7200, 3600)
+        self.assertEqual(step, 3600)
+        self.assertEqual(sum(p["count"] for p in points), 720)
+        self.assertEqual(max(p["max"] for p in points), 59.0)
+
+    def test_chunked_retention(self):
+        """Test raw chunks older than the retention window are dropped"""
+        raw = TimeSeriesTier(0, 100, chunk_size=4)
+        for i in range(40):
+            raw.add(T0 + i * 10, i)
+        self.assertLess(len(raw), 40)
+        self.assertGreaterEqual(len(raw), 10)
+        self.assertEqual([row[1] for row in raw.rows(T0 + 300, T0 + 330)], [30.0, 31.0, 32.0])
+
+    def test_out_of_order_samples_dropped(self):
+        """Test a sample older than the series head is counted and ignored"""
+        self.store.record("D1", T0, {"cpu": 99})
+        self.assertEqual(self.store.dropped, 1)
+        self.assertIsNone(self.store.query("D2", "cpu", T0, T0 + 60, 60)[1])
+
+    def test_future_timestamps_clamped(self):
+        """Test a sample dated ahead of the server clock does not block later samples"""
+        store = TimeSeriesStore(((0, 3600),), clock=lambda: T0)
+        store.record("D1", T0 + 86400, {"cpu": 1})
+        store.record("D1", T0 + 10, {"cpu": 2})
+        self.assertEqual((store.clamped, store.dropped), (1, 0))
+        self.assertEqual([p["max"] for p in store.query("D1", "cpu", T0, T0 + 20, 10)[1]], [1.0, 2.0])
+
+    def test_forget_drops_device_series(self):
+        """Test forgetting a device removes all of its metrics and no other device's"""
+        self.store.record("D2", T0 + 7200, {"cpu": 1, "mem": 2})
+        self.store.forget("D2")
+        self.assertNotIn("D2", self.store)
+        self.assertIn("D1", self.store)
+        self.assertEqual(len(self.store), 1)
+
+
+class HistoryEndpointTestCase(unittest.TestCase):
+    """Test cases for /api/monitoring/<kind>/history"""
+
+    def setUp(self):
+        """Set up test client with a device whose updates are recorded"""
+        self.app = app.test_client()
+        self.app.testing = True
+        import server
+        server.SESSIONS.clear()
+        HEALTH_DB.insert({"deviceId": "DEV-HIST", "cpuLoad": 10, "memoryUtil": 50, "isOverheating": False,
+                          "lastCheck": "2024-05-01 12:00:00"})
+        self.addCleanup(HEALTH_DB.delete, "DEV-HIST")
+        for minute, load in ((0, 30), (1, 70), (1, 90)):
+            HEALTH_DB.update("DEV-HIST", {"cpuLoad": load, "lastCheck": f"2024-05-01 12:0{minute}:30"})
+
+    def test_store_updates_become_history(self):
+        """Test hardware updates are queryable as per-minute rollups"""
+        response = self.app.get('/api/monitoring/hardware/history?deviceId=DEV-HIST&metric=cpuLoad'
+                                '&from=2024-05-01T12:00:00&to=2024-05-01T12:02:00&step=60')
+        data = json.loads(response.data)
+        points = data["series"]["cpuLoad"]["points"]
+        self.assertEqual([(p["min"], p["max"], p["count"]) for p in points], [(10.0, 30.0, 2), (70.0, 90.0, 2)])
+        self.assertNotIn("memoryUtil", data["series"])
+
+    def test_validation(self):
+        """Test missing device, unknown kind/metric and bad ranges"""
+        self.assertEqual(self.app.get('/api/monitoring/hardware/history').status_code, 400)
+        self.assertEqual(self.app.get('/api/monitoring/disk/history?deviceId=X').status_code, 404)
+        self.assertEqual(self.app.get('/api/monitoring/hardware/history?deviceId=NOPE').status_code, 404)
+        self.assertEqual(self.app.get('/api/monitoring/hardware/history?deviceId=DEV-HIST&metric=x').status_code, 400)
+        self.assertEqual(self.app.get('/api/monitoring/hardware/history?deviceId=DEV-HIST&from=yesterday').status_code,
+                         400)
+
+    def test_deleted_device_history_removed(self):
+        """Test deleting a device drops its history"""
+        HEALTH_DB.delete("DEV-HIST")
+        self.addCleanup(HEALTH_DB.insert, {"deviceId": "DEV-HIST", "cpuLoad": 10, "memoryUtil": 50,
+                                           "isOverheating": False, "lastCheck": "2024-05-01 12:00:00"})
+        response = self.app.get('/api/monitoring/hardware/history?deviceId=DEV-HIST')
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()